@@ -0,0 +1,144 @@
+"""
+自动检测页面内容区域，生成裁剪边距
+
+两种检测方式：
+    raster  在渲染结果上按灰度阈值寻找非空白像素的外接矩形（适合扫描件，边距不一致时逐页裁剪）
+    vector  不渲染，直接合并 PyMuPDF 记录的文字 / 路径 / 图像绘制区域（适合电子文档，速度最快）
+
+检测结果既可在转换时逐页使用（ConversionJob 的 crop 传入 AutoCrop），
+也可以对整份文档抽样汇总为统一的裁剪建议（suggest_crop），填入界面的裁剪设置。
+"""
+import math
+from dataclasses import dataclass
+
+import fitz  # PyMuPDF
+
+AUTOCROP_METHODS = ("raster", "vector")
+# 栅格检测时先把图像缩小到长边不超过该像素数：按块取平均，既加快检测，也抹掉扫描噪点
+ANALYSIS_SIZE = 1200
+# 汇总建议时最多抽样的页数
+SUGGEST_SAMPLES = 20
+# 只用于检测的低分辨率渲染（超大页面分块渲染、汇总建议时使用）
+DETECT_DPI = 72
+# vector 模式下覆盖页面面积超过该比例的绘制视为背景（整页底色、整页扫描图）
+BACKGROUND_RATIO = 0.95
+
+
+@dataclass(frozen=True)
+class AutoCrop:
+    """
+    自动裁剪设置，可代替 (左, 上, 右, 下) 元组作为 crop 传入转换任务
+
+    threshold: 灰度低于该值（0-255）的像素视为内容
+    padding: 内容四周保留的留白，单位为点（1/72 英寸），与 DPI 无关
+    """
+    method: str = "raster"
+    threshold: int = 200
+    padding: float = 6.0
+
+    def __post_init__(self):
+        if self.method not in AUTOCROP_METHODS:
+            raise ValueError(f"不支持的自动裁剪方式: {self.method}")
+
+
+def raster_content_box(img, threshold=200):
+    """
+    图像中内容像素的外接矩形 (左, 上, 右, 下)，全白时返回 None
+    在 Pillow 的 C 实现中完成：转灰度、整数倍缩小、查表二值化、getbbox
+    """
+    if "A" in img.getbands():
+        # 透明背景视为白色
+        from PIL import Image
+
+        gray = Image.new("L", img.size, 255)
+        gray.paste(img.convert("L"), mask=img.getchannel("A"))
+    else:
+        gray = img.convert("L") if img.mode != "L" else img
+    k = max(1, math.ceil(max(gray.size) / ANALYSIS_SIZE))
+    small = gray.reduce(k) if k > 1 else gray
+    mask = small.point(lambda v: 255 if v < threshold else 0)
+    box = mask.getbbox()
+    if box is None:
+        return None
+    left, top, right, bottom = box
+    # 换算回原尺寸时向外取整，不会裁掉内容
+    return left * k, top * k, min(img.width, right * k), min(img.height, bottom * k)
+
+
+def vector_content_rect(page):
+    """
+    页面绘制内容的外接矩形（点，已计入页面旋转），没有可见内容时返回 None
+    忽略裁剪路径、不可见文字以及覆盖几乎整页的背景
+    """
+    page_area = abs(page.rect)
+    content = fitz.Rect()
+    for kind, bbox in page.get_bboxlog():
+        if not kind.startswith(("fill-", "stroke-")):
+            continue
+        rect = fitz.Rect(bbox)
+        if rect.is_empty or abs(rect) >= page_area * BACKGROUND_RATIO:
+            continue
+        content |= rect
+    if content.is_empty:
+        return None
+    return (content * page.rotation_matrix) & page.rect
+
+
+def margins_from_box(box, width, height, padding_px):
+    """由内容矩形得到 (左, 上, 右, 下) 裁剪边距；box 为 None（空白页）时不裁剪"""
+    if box is None:
+        return 0, 0, 0, 0
+    left, top, right, bottom = box
+    pad = int(round(padding_px))
+    return (max(0, int(left) - pad), max(0, int(top) - pad),
+            max(0, width - int(math.ceil(right)) - pad), max(0, height - int(math.ceil(bottom)) - pad))
+
+
+def detect_margins(page, zoom, auto_crop, img=None):
+    """
+    按 AutoCrop 设置检测一页在缩放比例 zoom 下的裁剪边距（像素）
+
+    img 为已按 zoom 渲染好的页面图像时直接在其上检测；
+    否则 raster 方式按 DETECT_DPI 另行渲染一张低分辨率图像检测后换算。
+    """
+    irect = (page.rect * fitz.Matrix(zoom, zoom)).irect
+    width, height = irect.width, irect.height
+    padding_px = auto_crop.padding * zoom
+
+    if auto_crop.method == "vector":
+        rect = vector_content_rect(page)
+        box = None if rect is None else tuple(v * zoom for v in rect)
+        return margins_from_box(box, width, height, padding_px)
+
+    if img is not None:
+        return margins_from_box(raster_content_box(img, auto_crop.threshold), width, height, padding_px)
+
+    detect_zoom = min(zoom, DETECT_DPI / 72)
+    pix = page.get_pixmap(matrix=fitz.Matrix(detect_zoom, detect_zoom), colorspace=fitz.csGRAY)
+    from PIL import Image
+
+    img = Image.frombuffer("L", (pix.width, pix.height), pix.samples_mv, "raw", "L", pix.stride, 1)
+    box = raster_content_box(img, auto_crop.threshold)
+    if box is not None:
+        scale = zoom / detect_zoom
+        # 低分辨率下的 1 像素对应目标分辨率的 scale 像素，向外扩展以免裁掉内容
+        box = (box[0] * scale - scale, box[1] * scale - scale, box[2] * scale + scale, box[3] * scale + scale)
+    return margins_from_box(box, width, height, padding_px)
+
+
+def suggest_crop(pdf_path, dpi, auto_crop=None, pages=None, samples=SUGGEST_SAMPLES):
+    """
+    对整份文档抽样检测，返回在 dpi 下适用于所有页面的统一裁剪边距（各页边距的最小值）
+
+    pages: 参与检测的页索引列表，默认全部页面中均匀抽取 samples 页
+    """
+    auto_crop = auto_crop or AutoCrop()
+    zoom = dpi / 72
+    with fitz.open(pdf_path) as doc:
+        if pages is None:
+            step = max(1, len(doc) // samples)
+            pages = range(0, len(doc), step)
+        margins = [detect_margins(doc.load_page(i), zoom, auto_crop) for i in pages]
+    if not margins:
+        return 0, 0, 0, 0
+    return tuple(min(m[side] for m in margins) for side in range(4))
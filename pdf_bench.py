@@ -0,0 +1,402 @@
+"""
+渲染流水线基准测试（离线运行，不依赖任何外部 PDF）
+
+用 PyMuPDF 生成几类典型的合成 PDF：
+    text     文字密集的排版页
+    vector   大量矢量线条与曲线（图纸、图表）
+    scanned  整页大尺寸扫描图像
+    huge     A0 超大页面（触发分块渲染）
+
+对每类文档在每个 DPI 下分别计时 打开 / 渲染 / 裁剪 / 编码 / 保存 各阶段（单进程），
+再在不同进程数下测量完整转换流水线的吞吐量。结果以 JSON 输出，便于在版本间比较：
+
+    python -m pdf_bench -o bench.json
+    python -m pdf_bench --quick --compare bench.json
+"""
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import statistics
+import multiprocessing
+from dataclasses import asdict
+
+import fitz  # PyMuPDF
+
+from pdf_engine import (EncoderSettings, RenderOptions, WorkerPool, convert_pdf, crop_box, needs_tiling,
+                        pixmap_to_image, render_page_tiled)
+from pdf_resources import usable_cpu_count
+
+BENCH_VERSION = 1
+# 与界面“输出质量”选项一致
+BENCH_DPIS = (72, 150, 300, 600)
+# 每类文档的默认页数；--quick 时统一减为 QUICK_PAGES
+DOCUMENT_PAGES = {"text": 20, "vector": 10, "scanned": 8, "huge": 1}
+QUICK_PAGES = 2
+QUICK_DPIS = (72, 150)
+# 阶段计时使用的裁剪边距（像素，按 72 DPI 给出，随 DPI 等比放大）
+BENCH_CROP_72 = (18, 18, 18, 18)
+STAGES = ("open", "render", "crop", "encode", "save")
+# --compare 时吞吐量下降超过该比例即视为回退
+REGRESSION_THRESHOLD = 0.10
+
+LOREM = ("PDF rendering benchmark line with mixed glyphs 0123456789 ABCDEFGHIJKLMNOPQRSTUVWXYZ "
+         "abcdefghijklmnopqrstuvwxyz, punctuation; quotes \"'\" and (brackets) [0] {1}.")
+
+
+# ---- 合成文档 ----
+
+def _make_text(doc, pages):
+    for p in range(pages):
+        page = doc.new_page(width=595, height=842)  # A4
+        lines = [f"{p + 1:03d}.{i:02d} {LOREM}" for i in range(64)]
+        page.insert_text((36, 40), lines, fontsize=7.5, lineheight=1.5)
+        page.insert_text((36, 820), f"- {p + 1} -", fontsize=10)
+
+
+def _make_vector(doc, pages):
+    for p in range(pages):
+        page = doc.new_page(width=842, height=595)  # A4 横向
+        shape = page.new_shape()
+        for i in range(1500):
+            # 确定性的伪随机坐标，保证各次生成的文档完全一致
+            x = (i * 37 + p * 11) % 800 + 20
+            y = (i * 53 + p * 7) % 560 + 15
+            shape.draw_line((x, y), (x + (i % 40), y + (i % 23)))
+            shape.draw_bezier((x, y), (x + 15, y - 20), (x + 30, y + 20), (x + 45, y))
+        shape.finish(color=(0.1, 0.2, 0.6), width=0.4)
+        for i in range(200):
+            x = (i * 29) % 780 + 20
+            y = (i * 41) % 540 + 20
+            shape.draw_rect(fitz.Rect(x, y, x + 18, y + 12))
+        shape.finish(color=(0, 0, 0), fill=(0.9, 0.5, 0.2), width=0.3, fill_opacity=0.5)
+        shape.commit()
+
+
+def _make_scanned(doc, pages):
+    from PIL import Image, ImageFilter
+
+    # A4 300 DPI 灰度噪声，模糊后接近扫描纸张的纹理，以 JPEG 嵌入
+    size = (2480, 3508)
+    img = Image.effect_noise(size, 48).filter(ImageFilter.GaussianBlur(1)).convert("RGB")
+    buf = io.BytesIO()
+    img.save(buf, format="JPEG", quality=85)
+    xref = 0
+    for _ in range(pages):
+        page = doc.new_page(width=595, height=842)
+        # 各页引用同一个图像对象，文件大小与页数无关，但每页渲染时都需完整解码
+        xref = page.insert_image(page.rect, stream=buf.getvalue(), xref=xref)
+
+
+def _make_huge(doc, pages):
+    for p in range(pages):
+        page = doc.new_page(width=2384, height=3370)  # A0
+        shape = page.new_shape()
+        for x in range(0, 2384, 24):
+            shape.draw_line((x, 0), (x, 3370))
+        for y in range(0, 3370, 24):
+            shape.draw_line((0, y), (2384, y))
+        shape.finish(color=(0.6, 0.6, 0.6), width=0.25)
+        shape.draw_circle((1192, 1685), 900)
+        shape.finish(color=(0.8, 0, 0), width=3)
+        shape.commit()
+        page.insert_text((100, 200), [f"A0 sheet {p + 1}", LOREM], fontsize=36)
+
+
+GENERATORS = {"text": _make_text, "vector": _make_vector, "scanned": _make_scanned, "huge": _make_huge}
+
+
+def make_document(kind, pages, work_dir):
+    """生成（或复用已生成的）指定类型的合成 PDF，返回路径"""
+    path = os.path.join(work_dir, f"bench_{kind}_{pages}p_v{BENCH_VERSION}.pdf")
+    if not os.path.exists(path):
+        doc = fitz.open()
+        GENERATORS[kind](doc, pages)
+        doc.save(path + ".part", garbage=3, deflate=True)
+        doc.close()
+        os.replace(path + ".part", path)
+    return path
+
+
+# ---- 计时 ----
+
+def summarize(samples):
+    """将以秒为单位的样本汇总为毫秒统计"""
+    if not samples:
+        return {"count": 0}
+    return {
+        "count": len(samples),
+        "total_ms": sum(samples) * 1000,
+        "mean_ms": statistics.fmean(samples) * 1000,
+        "median_ms": statistics.median(samples) * 1000,
+        "min_ms": min(samples) * 1000,
+        "max_ms": max(samples) * 1000,
+    }
+
+
+def bench_stages(pdf_path, dpi, encoder, out_dir, repeat=3, memory_budget=None):
+    """
+    单进程逐阶段计时
+
+    open 重复打开文档 repeat 次；其余阶段对每一页各执行一次，与 process_page_task 的整页路径相同。
+    超出内存预算的页面走分块渲染，渲染、编码与保存交织在一起，只记为一个 tiled 阶段。
+    """
+    memory_budget = RenderOptions().memory_budget if memory_budget is None else memory_budget
+    zoom = dpi / 72
+    mat = fitz.Matrix(zoom, zoom)
+    crop = tuple(round(v * zoom) for v in BENCH_CROP_72)
+    times = {stage: [] for stage in STAGES + ("tiled",)}
+    output_bytes = 0
+    pixels = 0
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fitz.open(pdf_path).close()
+        times["open"].append(time.perf_counter() - start)
+
+    doc = fitz.open(pdf_path)
+    try:
+        for i in range(len(doc)):
+            page = doc.load_page(i)
+            output_path = os.path.join(out_dir, f"stage{i + 1}.{encoder.extension}")
+
+            if needs_tiling(page, mat, memory_budget):
+                start = time.perf_counter()
+                render_page_tiled(page, mat, crop, output_path, encoder, memory_budget)
+                times["tiled"].append(time.perf_counter() - start)
+                output_bytes += os.path.getsize(output_path)
+                irect = (page.rect * mat).irect
+                pixels += irect.width * irect.height
+                continue
+
+            start = time.perf_counter()
+            pix = page.get_pixmap(matrix=mat)
+            t_render = time.perf_counter()
+            img = pixmap_to_image(pix)
+            box = crop_box(img.width, img.height, crop)
+            img = img.crop(box)
+            t_crop = time.perf_counter()
+            buf = io.BytesIO()
+            encoder.save(img, buf)
+            t_encode = time.perf_counter()
+            with open(output_path, "wb") as f:
+                f.write(buf.getbuffer())
+            t_save = time.perf_counter()
+
+            times["render"].append(t_render - start)
+            times["crop"].append(t_crop - t_render)
+            times["encode"].append(t_encode - t_crop)
+            times["save"].append(t_save - t_encode)
+            output_bytes += buf.tell()
+            pixels += pix.width * pix.height
+            img = pix = None
+    finally:
+        doc.close()
+
+    per_page = [sum(ts) for ts in zip(times["render"], times["crop"], times["encode"], times["save"])]
+    per_page += times["tiled"]
+    total = sum(per_page)
+    return {
+        "timings": {stage: summarize(ts) for stage, ts in times.items() if ts},
+        "pages": len(per_page),
+        "pages_per_sec": len(per_page) / total if total > 0 else 0.0,
+        "megapixels": pixels / 1e6,
+        "output_mb": output_bytes / 1e6,
+    }
+
+
+def bench_pipeline(pdf_path, dpi, workers, encoder, out_dir):
+    """完整转换流水线（进程池 + 分段调度）的吞吐量，包含进程启动开销"""
+    start = time.perf_counter()
+    with WorkerPool(workers) as pool:
+        result = convert_pdf(pdf_path, out_dir, dpi=dpi, encoder=encoder, resume=False, pool=pool)
+    wall = time.perf_counter() - start
+    page_times = [p.elapsed for p in result.pages]
+    return {
+        "workers": workers,
+        "pages": result.total_pages,
+        "completed": result.completed,
+        "wall_sec": wall,
+        "convert_sec": result.elapsed,
+        "pages_per_sec": result.completed / wall if wall > 0 else 0.0,
+        "time_to_first_page": result.time_to_first_page,
+        "page_time": summarize(page_times),
+        "errors": sorted({p.error for p in result.failed}),
+    }
+
+
+def bench_startup(pdf_path, dpi, workers, encoder, out_dir):
+    """
+    首页用时：新建进程池（子进程在第一次提交任务时才启动）与预先 warm_up 的进程池各转换一次第 1 页
+    两者之差即进程启动与导入的开销
+    """
+    timings = {}
+    for mode in ("cold", "warm"):
+        with WorkerPool(workers) as pool:
+            warm_up_sec = pool.warm_up() if mode == "warm" else None
+            result = convert_pdf(pdf_path, out_dir, dpi=dpi, encoder=encoder, pages="1", resume=False, pool=pool)
+        timings[mode] = {"time_to_first_page": result.time_to_first_page, "warm_up_sec": warm_up_sec}
+    return {"workers": workers, **timings}
+
+
+def environment_info():
+    from PIL import __version__ as pillow_version
+
+    return {
+        "bench_version": BENCH_VERSION,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "pymupdf": fitz.VersionBind,
+        "pillow": pillow_version,
+        "cpus": usable_cpu_count(),
+    }
+
+
+def run_benchmark(kinds=None, dpis=BENCH_DPIS, workers=None, encoder=None, pages=None, repeat=3,
+                  work_dir=None, skip_pipeline=False, on_case=None):
+    """
+    执行基准测试并返回可序列化为 JSON 的结果
+
+    pages: 覆盖各类文档的页数；workers: 流水线测试的进程数列表，默认 1、2 与可用 CPU 数。
+    on_case(case): 每完成一项测试回调一次。
+    """
+    kinds = kinds or list(GENERATORS)
+    encoder = encoder or EncoderSettings()
+    if workers is None:
+        workers = sorted({1, min(2, usable_cpu_count()), usable_cpu_count()})
+
+    own_dir = work_dir is None
+    work_dir = work_dir or tempfile.mkdtemp(prefix="pdf_bench_")
+    os.makedirs(work_dir, exist_ok=True)
+    report = {"environment": environment_info(), "encoder": asdict(encoder), "cases": []}
+    try:
+        for kind in kinds:
+            pdf_path = make_document(kind, pages or DOCUMENT_PAGES[kind], work_dir)
+            for dpi in dpis:
+                out_dir = tempfile.mkdtemp(prefix=f"{kind}_{dpi}_", dir=work_dir)
+                try:
+                    case = {"document": kind, "dpi": dpi, "file_mb": os.path.getsize(pdf_path) / 1e6,
+                            "stages": bench_stages(pdf_path, dpi, encoder, out_dir, repeat)}
+                    if not skip_pipeline:
+                        case["pipeline"] = [bench_pipeline(pdf_path, dpi, n, encoder, out_dir) for n in workers]
+                        case["startup"] = bench_startup(pdf_path, dpi, max(workers), encoder, out_dir)
+                finally:
+                    shutil.rmtree(out_dir, ignore_errors=True)
+                report["cases"].append(case)
+                if on_case:
+                    on_case(case)
+    finally:
+        if own_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+    return report
+
+
+# ---- 版本间比较 ----
+
+def _case_metrics(report):
+    """展开为 {(文档, DPI, 指标名): 页/秒}"""
+    metrics = {}
+    for case in report.get("cases", []):
+        key = (case["document"], case["dpi"])
+        metrics[key + ("stages",)] = case["stages"]["pages_per_sec"]
+        for run in case.get("pipeline", []):
+            metrics[key + (f"workers={run['workers']}",)] = run["pages_per_sec"]
+    return metrics
+
+
+def compare_reports(baseline, current, threshold=REGRESSION_THRESHOLD):
+    """
+    比较两份结果中共有的测试项，返回 [(文档, DPI, 指标, 基线, 当前, 变化比例, 是否回退)]
+    变化比例为 当前/基线 - 1，吞吐量下降超过 threshold 视为回退
+    """
+    old, new = _case_metrics(baseline), _case_metrics(current)
+    rows = []
+    for key in sorted(old.keys() & new.keys()):
+        before, after = old[key], new[key]
+        change = after / before - 1 if before > 0 else 0.0
+        rows.append(key + (before, after, change, change < -threshold))
+    return rows
+
+
+def format_case(case):
+    stages = case["stages"]
+    parts = [f"{name} {s['mean_ms']:.1f}ms" for name, s in stages["timings"].items()]
+    line = f"{case['document']:>8} @ {case['dpi']:>3} DPI  {stages['pages_per_sec']:7.2f} 页/秒  " + " / ".join(parts)
+    for run in case.get("pipeline", []):
+        line += f"\n{'':>18}{run['workers']} 进程 {run['pages_per_sec']:7.2f} 页/秒"
+        if run["errors"]:
+            line += f"  失败: {'; '.join(run['errors'])}"
+    startup = case.get("startup")
+    if startup and startup["cold"]["time_to_first_page"] is not None:
+        line += (f"\n{'':>18}首页用时 {startup['cold']['time_to_first_page'] * 1000:.0f}ms，"
+                 f"预热进程池后 {startup['warm']['time_to_first_page'] * 1000:.0f}ms")
+    return line
+
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(prog="python -m pdf_bench", description="PDF 渲染流水线基准测试")
+    parser.add_argument("-o", "--output", help="将 JSON 结果写入文件（默认输出到标准输出）")
+    parser.add_argument("--documents", nargs="+", choices=list(GENERATORS), help="测试的文档类型，默认全部")
+    parser.add_argument("--dpi", type=int, nargs="+", help=f"测试的 DPI，默认 {' '.join(map(str, BENCH_DPIS))}")
+    parser.add_argument("-j", "--workers", type=int, nargs="+", help="流水线测试的进程数，默认 1、2 与可用 CPU 数")
+    parser.add_argument("--pages", type=int, help="每份合成文档的页数，默认按类型自动选择")
+    parser.add_argument("--repeat", type=int, default=3, help="打开文档的重复次数，默认 3")
+    parser.add_argument("-f", "--format", default="png", help="输出格式，默认 png")
+    parser.add_argument("--quick", action="store_true",
+                        help=f"快速模式：每份文档 {QUICK_PAGES} 页，DPI 为 {' '.join(map(str, QUICK_DPIS))}")
+    parser.add_argument("--stages-only", action="store_true", help="只做单进程阶段计时，跳过进程池流水线测试")
+    parser.add_argument("--work-dir", help="合成文档与临时输出目录（指定后保留合成文档，下次复用）")
+    parser.add_argument("--compare", metavar="BASELINE", help="与之前保存的 JSON 结果比较，存在回退时返回 1")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD,
+                        help="判定回退的吞吐量下降比例，默认 %(default)s")
+    parser.add_argument("-q", "--quiet", action="store_true", help="不输出进度")
+    return parser
+
+
+def main(argv=None):
+    parser = build_arg_parser()
+    args = parser.parse_args(argv)
+    try:
+        encoder = EncoderSettings(args.format)
+    except ValueError as e:
+        parser.error(str(e))
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    def on_case(case):
+        if not args.quiet:
+            print(format_case(case), file=sys.stderr, flush=True)
+
+    report = run_benchmark(kinds=args.documents, dpis=args.dpi or (QUICK_DPIS if args.quick else BENCH_DPIS),
+                           workers=args.workers, encoder=encoder,
+                           pages=args.pages or (QUICK_PAGES if args.quick else None), repeat=args.repeat,
+                           work_dir=args.work_dir, skip_pipeline=args.stages_only, on_case=on_case)
+
+    data = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(data + "\n")
+    elif baseline is None:
+        print(data)
+
+    if baseline is None:
+        return 0
+    rows = compare_reports(baseline, report, args.threshold)
+    for document, dpi, metric, before, after, change, regressed in rows:
+        mark = "  <-- 回退" if regressed else ""
+        print(f"{document:>8} @ {dpi:>3} DPI {metric:<12} {before:8.2f} -> {after:8.2f} 页/秒 ({change:+.1%}){mark}")
+    return 1 if any(row[-1] for row in rows) else 0
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
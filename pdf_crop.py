@@ -0,0 +1,77 @@
+"""
+与分辨率无关的裁剪边距
+
+像素裁剪只对某一 DPI 有效：在 150 DPI 预览上框选的区域，按 300 DPI 导出时会变成一半大小。
+CropMargins 以 PDF 点（1/72 英寸）或页面宽高的比例记录四边边距，渲染时按实际缩放比例换算为像素，
+并作为 clip 矩形传给渲染器，被裁掉的区域不会被光栅化。
+"""
+import re
+from dataclasses import dataclass
+
+CROP_UNITS = ("px", "pt", "fraction")
+
+
+@dataclass(frozen=True)
+class CropMargins:
+    """
+    (左, 上, 右, 下) 裁剪边距
+
+    unit 为 "pt" 时单位为点，为 "fraction" 时为页面宽 / 高的比例（0-1）。
+    像素裁剪仍用 (左, 上, 右, 下) 整数元组表示。
+    """
+    left: float = 0.0
+    top: float = 0.0
+    right: float = 0.0
+    bottom: float = 0.0
+    unit: str = "pt"
+
+    def __post_init__(self):
+        if self.unit not in ("pt", "fraction"):
+            raise ValueError(f"不支持的裁剪单位: {self.unit}")
+        if min(self.values) < 0:
+            raise ValueError("裁剪边距不能为负数")
+        if self.unit == "fraction" and (self.left + self.right >= 1 or self.top + self.bottom >= 1):
+            raise ValueError("按比例裁剪时左右 / 上下之和必须小于 1")
+
+    @property
+    def values(self):
+        return self.left, self.top, self.right, self.bottom
+
+    def to_pixels(self, zoom, width, height):
+        """换算为缩放比例 zoom 下的像素边距；width / height 为该缩放下整页的像素尺寸"""
+        if self.unit == "pt":
+            return tuple(int(round(v * zoom)) for v in self.values)
+        return (int(round(self.left * width)), int(round(self.top * height)),
+                int(round(self.right * width)), int(round(self.bottom * height)))
+
+
+def make_crop(values, unit="px"):
+    """由四个数值与单位构造裁剪参数：px 返回整数元组，pt / fraction 返回 CropMargins"""
+    if unit not in CROP_UNITS:
+        raise ValueError(f"不支持的裁剪单位: {unit}（可用: {', '.join(CROP_UNITS)}）")
+    values = tuple(float(v) for v in values)
+    if len(values) != 4:
+        raise ValueError("裁剪需要 左 上 右 下 四个数值")
+    if unit == "px":
+        if min(values) < 0:
+            raise ValueError("裁剪边距不能为负数")
+        return tuple(int(round(v)) for v in values)
+    return CropMargins(*values, unit=unit)
+
+
+def parse_crop(text):
+    """
+    解析 “左/上/右/下[单位]” 形式的裁剪，如 0/50/0/50（像素）、0/24/0/24pt、0/5/0/5%（页面比例）
+    无效时抛出 ValueError
+    """
+    text = text.strip().lower()
+    unit = "px"
+    if text.endswith("%"):
+        text, unit, scale = text[:-1], "fraction", 0.01
+    else:
+        scale = 1.0
+        m = re.search(r"(px|pt)$", text)
+        if m:
+            text, unit = text[:m.start()], m.group(1)
+    values = [float(v) * scale for v in re.split(r"[/\s]+", text.strip()) if v]
+    return make_crop(values, unit)
@@ -0,0 +1,1750 @@
+"""
+PDF 转图片的无界面转换引擎
+
+不依赖 customtkinter / windnd，可在无显示器的服务器、脚本或基准测试中直接调用：
+
+    from pdf_engine import convert_pdf
+    result = convert_pdf("a.pdf", "out", dpi=300)
+
+也可以作为命令行工具使用：
+
+    python -m pdf_engine a.pdf -o out --dpi 300
+"""
+import io
+import os
+import sys
+import time
+import json
+import hashlib
+import argparse
+import threading
+import multiprocessing
+from contextlib import contextmanager
+from dataclasses import dataclass, field, fields, asdict, replace
+from itertools import groupby, islice
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+import fitz  # PyMuPDF
+
+from pdf_tiles import PNGStreamWriter, TIFFStreamWriter, band_height, iter_bands
+from pdf_resources import ConcurrencyController, estimate_page_memory, usable_cpu_count
+from pdf_stats import PageProfiler, PageStats, build_report, format_report
+from pdf_manifest import MANIFEST_NAME, RunManifest
+from pdf_pages import check_page_ranges, parse_page_rule, parse_page_ranges
+from pdf_autocrop import AUTOCROP_METHODS, AutoCrop, detect_margins, suggest_crop
+from pdf_crop import CROP_UNITS, CropMargins, make_crop
+from pdf_extract import find_page_image, load_page_image, passthrough_bytes
+from pdf_shm import SharedImage, SharedImageWriter, allocate, discard
+from pdf_writer import (FSYNC_POLICIES, AsyncWriter, FileSink, MemorySink, archive_format, atomic_write,
+                        fsync_path, open_archive)
+
+DEFAULT_DPI = 150
+MAX_CHUNK_SIZE = 16
+DEFAULT_MEMORY_BUDGET = 256 * 1024 * 1024  # 单页整页渲染的内存上限，超过时分块渲染
+IN_FLIGHT_PER_WORKER = 2   # 每个进程最多排队的任务段数
+STOP_POLL_INTERVAL = 0.1   # 等待结果时检查停止请求的间隔（秒）
+
+
+# 子进程内的文档缓存：(绝对路径, mtime) -> fitz.Document
+# 同一进程处理同一文件的多页时只解析一次 xref 与页树；文档随子进程退出（进程池关闭）一起释放
+_doc_cache = OrderedDict()
+DOC_CACHE_SIZE = 4
+ACTIVE_DOCUMENTS = DOC_CACHE_SIZE  # 批量转换时同时推进的文档数，不超过子进程的文档缓存
+
+# 子进程内的停止标志（由 init_worker 注入的 multiprocessing.Event）
+_stop_event = None
+
+# 子进程内的输出写入器：(async_write, fsync) -> 写入器，后台写线程在各任务段之间复用
+_output_writers = {}
+
+
+def open_cached_document(pdf_path):
+    """打开（或复用）当前进程中已打开的文档，文件被修改后自动失效"""
+    path = os.path.abspath(pdf_path)
+    key = (path, os.path.getmtime(path))
+    doc = _doc_cache.get(key)
+    if doc is not None:
+        _doc_cache.move_to_end(key)
+        return doc
+
+    # 同一路径的旧版本已失效
+    for stale in [k for k in _doc_cache if k[0] == path]:
+        _doc_cache.pop(stale).close()
+
+    doc = fitz.open(path)
+    _doc_cache[key] = doc
+    while len(_doc_cache) > DOC_CACHE_SIZE:
+        _, old_doc = _doc_cache.popitem(last=False)
+        old_doc.close()
+    return doc
+
+
+def init_worker(stop_event=None):
+    """
+    进程池初始化函数：每个子进程启动时预先导入 Pillow 及常用编码插件，并记录共享的停止标志
+    进程池预热（WorkerPool.warm_up）时这些开销在用户开始转换之前就已完成
+    """
+    global _stop_event
+    _stop_event = stop_event
+    from PIL import Image
+
+    Image.preinit()
+
+
+def warm_worker():
+    """预热任务：什么也不做，只让进程池启动子进程并完成初始化，返回子进程 PID"""
+    return os.getpid()
+
+
+def pixmap_to_image(pix):
+    """
+    将 Pixmap 的像素直接解包为 PIL Image（不经过 PNG 编解码），返回不再引用 pix 的副本
+    （灰度图像若用 frombuffer 会直接映射 pix.samples，Pixmap 释放后即失效）
+    带透明通道的 Pixmap 为预乘 alpha，转换为 PIL 的非预乘 RGBA / LA
+    """
+    from PIL import Image
+
+    size = (pix.width, pix.height)
+    if pix.n == 2:
+        # Pillow 不能把预乘的灰度 + alpha 直接解包为 LA，先按 La 读入再转换
+        return Image.frombytes("La", size, pix.samples_mv, "raw", "La", pix.stride, 1).convert("LA")
+    mode, rawmode = {1: ("L", "L"), 3: ("RGB", "RGB"), 4: ("RGBA", "RGBa")}[pix.n]
+    return Image.frombytes(mode, size, pix.samples_mv, "raw", rawmode, pix.stride, 1)
+
+
+def flatten_alpha(img):
+    """把带透明通道的图像合成到白色背景上（RGBA -> RGB，LA -> L）"""
+    from PIL import Image
+
+    base = Image.new(img.mode[:-1], img.size, "white")
+    base.paste(img, mask=img.getchannel("A"))
+    return base
+
+
+def crop_box(width, height, crop_params):
+    """根据 (左, 上, 右, 下) 裁剪像素计算有效裁剪框，保证至少保留 1 像素"""
+    c_left, c_top, c_right, c_bottom = crop_params
+    left = min(c_left, width - 1)
+    top = min(c_top, height - 1)
+    right = max(left + 1, width - c_right)
+    bottom = max(top + 1, height - c_bottom)
+    return left, top, right, bottom
+
+
+def page_fingerprint(doc, page):
+    """
+    页面内容指纹：内容流以及页面对象、字体、图像、XObject、注释的对象定义的 SHA-1
+    用于增量转换时判断源文件修改后哪些页面需要重新渲染
+    """
+    h = hashlib.sha1(page.read_contents())
+    xrefs = [page.xref]
+    xrefs += [item[0] for item in page.get_images(full=True)]
+    xrefs += [item[0] for item in page.get_fonts(full=True)]
+    xrefs += [item[0] for item in page.get_xobjects()]
+    xrefs += [item[0] for item in page.annot_xrefs()]
+    for xref in xrefs:
+        if xref > 0:
+            h.update(doc.xref_object(xref, compressed=True).encode("utf-8"))
+    return h.hexdigest()
+
+
+# 输出格式 -> 文件扩展名
+IMAGE_EXTENSIONS = {"png": "png", "jpeg": "jpg", "webp": "webp", "tiff": "tif"}
+FORMAT_ALIASES = {"jpg": "jpeg", "tif": "tiff"}
+COLOR_MODES = ("rgb", "gray", "mono")
+RENDER_COLORSPACES = ("rgb", "gray", "auto")
+# RenderOptions 中影响输出内容的字段，变化时已有输出失效
+OUTPUT_RENDER_OPTIONS = ("extract_images", "colorspace", "alpha", "antialias", "annotations")
+
+
+@dataclass(frozen=True)
+class EncoderSettings:
+    """
+    输出图片的格式与编码参数
+
+    format: png / jpeg / webp / tiff
+    color: rgb 彩色 / gray 灰度 / mono 1 位黑白（适合文字扫描件）
+    multipage: 仅 tiff，每个 PDF 合并为一个多页 TIFF
+    """
+    format: str = "png"
+    quality: int = 90          # jpeg / webp 有损压缩质量 (1-100)
+    lossless: bool = False     # webp 无损
+    compress_level: int = 6    # png zlib 压缩级别 (0-9)，越低编码越快、文件越大；6 为 PIL 默认值
+    optimize: bool = False     # png / jpeg 额外优化（更慢、更小）
+    color: str = "rgb"
+    mono_threshold: int = 128  # mono 模式下的二值化阈值
+    multipage: bool = False
+
+    def __post_init__(self):
+        fmt = FORMAT_ALIASES.get(self.format.lower(), self.format.lower())
+        object.__setattr__(self, "format", fmt)
+        if fmt not in IMAGE_EXTENSIONS:
+            raise ValueError(f"不支持的输出格式: {self.format}")
+        if self.color not in COLOR_MODES:
+            raise ValueError(f"不支持的色彩模式: {self.color}")
+        if self.multipage and fmt != "tiff":
+            raise ValueError("仅 TIFF 格式支持多页合并")
+        if not 1 <= self.quality <= 100:
+            raise ValueError("quality 须在 1-100 之间")
+        if not 0 <= self.compress_level <= 9:
+            raise ValueError("compress_level 须在 0-9 之间")
+
+    @property
+    def extension(self):
+        return IMAGE_EXTENSIONS[self.format]
+
+    @property
+    def tiff_compression(self):
+        return "group4" if self.color == "mono" else "tiff_deflate"
+
+    def convert_image(self, img):
+        """按色彩模式转换图像；rgb 模式原样返回，透明通道只在 rgb 模式的 png / webp / tiff 中保留"""
+        if "A" in img.getbands() and (self.color != "rgb" or self.format == "jpeg"):
+            img = flatten_alpha(img)
+        if self.color == "gray" or (self.color == "mono" and self.format == "jpeg"):
+            return img.convert("L") if img.mode != "L" else img
+        if self.color == "mono":
+            gray = img.convert("L") if img.mode != "L" else img
+            threshold = self.mono_threshold
+            return gray.point(lambda v: 255 if v >= threshold else 0, mode="1")
+        return img
+
+    def save_kwargs(self):
+        if self.format == "png":
+            return {"compress_level": self.compress_level, "optimize": self.optimize}
+        if self.format == "jpeg":
+            return {"quality": self.quality, "optimize": self.optimize}
+        if self.format == "webp":
+            return {"quality": self.quality, "lossless": self.lossless}
+        return {"compression": self.tiff_compression}
+
+    def encode(self, img, fp):
+        """编码已转换好色彩模式的图像，fp 为路径或文件对象"""
+        img.save(fp, format=self.format.upper(), **self.save_kwargs())
+
+    def save(self, img, output_path):
+        self.encode(self.convert_image(img), output_path)
+
+    def open_stream(self, output_path, width, height, mode, rows_per_strip):
+        """
+        分块渲染时使用的流式编码器；png / tiff 支持逐条带写入，
+        其余格式返回 None，由调用方拼接整图后再调用 save
+        """
+        if self.format == "png":
+            return PNGStreamWriter(output_path, width, height, mode, self.compress_level)
+        if self.format == "tiff":
+            return TIFFStreamWriter(output_path, width, height, mode, rows_per_strip,
+                                    compression=self.tiff_compression)
+        return None
+
+
+DEFAULT_ENCODER = EncoderSettings()
+
+
+@dataclass(frozen=True)
+class RenderOptions:
+    """
+    与输出编码无关的渲染参数
+
+    memory_budget: 单页渲染的内存预算（字节）。整页 Pixmap 超过预算时改为分块渲染，
+    按水平条带逐段渲染并流式写入，0 表示始终整页渲染。
+    profile_dir: 诊断用，非空时每页在子进程中用 cProfile 采样，
+    耗时不低于 profile_threshold 秒的页面保存为该目录下的 .prof 文件。
+    async_write: 子进程把编码结果交给后台写线程后立即渲染下一页，每个任务段结束时等待写完。
+    fsync: 写入的持久化策略，none / file（每个文件）/ batch（每个任务段结束时），见 pdf_writer。
+    return_output: 不写入磁盘，编码结果随 PageResult 交回父进程（写入归档时使用）。
+    extract_images: 只含一张整页图像的扫描页直接提取原图（见 pdf_extract），按图像原始分辨率输出，
+    不经过渲染；其他页面照常渲染。
+    colorspace: 渲染的色彩空间，rgb / gray / auto。gray 直接渲染灰度 Pixmap，只有 RGB 的三分之一大小，
+    适合黑白文档（输出格式的 color 为 rgb 时也按灰度保存）；auto 按每页实际使用的输出色彩模式选择，
+    gray / mono 的页面渲染灰度，其余渲染 RGB（见 for_encoder）。
+    alpha: 渲染带透明通道的 Pixmap（页面背景透明），rgb 模式的 png / webp / tiff 保留透明，其他输出合成到白色背景。
+    antialias: 抗锯齿级别 0-8（0 关闭，8 为 MuPDF 默认），级别越低渲染越快，文字与线条边缘越粗糙。
+    annotations: 是否渲染注释与表单控件。
+    fingerprint: 计算每页的内容指纹（供运行清单记录，见 page_fingerprint）；由 ConversionJob 在使用清单时开启，
+    归档、内存模式等不写清单的任务不必为每页额外计算哈希。
+    """
+    memory_budget: int = DEFAULT_MEMORY_BUDGET
+    profile_dir: str = None
+    profile_threshold: float = 0.0
+    async_write: bool = True
+    fsync: str = "none"
+    return_output: bool = False
+    extract_images: bool = False
+    colorspace: str = "rgb"
+    alpha: bool = False
+    antialias: int = 8
+    annotations: bool = True
+    fingerprint: bool = False
+
+    def __post_init__(self):
+        if self.colorspace not in RENDER_COLORSPACES:
+            raise ValueError(f"不支持的渲染色彩空间: {self.colorspace}")
+        if not 0 <= self.antialias <= 8:
+            raise ValueError("抗锯齿级别须在 0-8 之间")
+
+    def for_encoder(self, encoder):
+        """按该页的编码设置确定 auto 色彩空间后的渲染参数"""
+        if self.colorspace != "auto":
+            return self
+        return replace(self, colorspace="gray" if encoder.color in ("gray", "mono") else "rgb")
+
+    @property
+    def channels(self):
+        """渲染结果每像素的字节数（auto 未确定时按 RGB 计算）"""
+        return (1 if self.colorspace == "gray" else 3) + (1 if self.alpha else 0)
+
+    def pixmap_args(self, source):
+        """source.get_pixmap 的渲染参数；source 为页面时还包括是否渲染注释（DisplayList 在创建时决定）"""
+        args = {"colorspace": fitz.csGRAY if self.colorspace == "gray" else fitz.csRGB, "alpha": self.alpha}
+        if isinstance(source, fitz.Page):
+            args["annots"] = self.annotations
+        return args
+
+    def output_params(self):
+        """影响输出内容、与默认值不同的选项，记入运行清单的参数（均为默认值时与旧清单一致）"""
+        return {name: getattr(self, name) for name in OUTPUT_RENDER_OPTIONS
+                if getattr(self, name) != getattr(DEFAULT_RENDER_OPTIONS, name)}
+
+
+DEFAULT_RENDER_OPTIONS = RenderOptions()
+
+
+def get_output_writer(options):
+    """当前进程按 options 使用的输出写入器；return_output 时每次返回新的 MemorySink"""
+    if options.return_output:
+        return MemorySink()
+    key = (options.async_write, options.fsync)
+    writer = _output_writers.get(key)
+    if writer is None:
+        sink = FileSink(options.fsync)
+        writer = _output_writers[key] = AsyncWriter(sink) if options.async_write else sink
+    return writer
+
+
+def merge_tiff_pages(page_paths, output_path, compression="tiff_deflate", fsync="none"):
+    """
+    将单页 TIFF 依次追加为一个多页 TIFF，逐页读取，内存占用与页数无关
+    fsync 不为 none 时（file / batch 对这唯一的输出相同），重命名前后同步文件与所在目录
+    返回 True 或错误信息
+    """
+    try:
+        from PIL import Image, TiffImagePlugin
+
+        tmp_path = output_path + ".part"
+        with TiffImagePlugin.AppendingTiffWriter(tmp_path, new=True) as tf:
+            for path in page_paths:
+                with Image.open(path) as im:
+                    im.save(tf, format="TIFF", compression=compression)
+                tf.newFrame()
+        if fsync != "none":
+            fsync_path(tmp_path)
+        os.replace(tmp_path, output_path)
+        if fsync != "none":
+            fsync_path(os.path.dirname(os.path.abspath(output_path)))
+        return True
+    except Exception as e:
+        return str(e)
+
+
+def render_band(source, mat, page_irect, box, options=DEFAULT_RENDER_OPTIONS):
+    """
+    用 clip 矩形只渲染设备坐标 box=(左, 上, 右, 下) 内的像素，返回与之等大的 Image
+    source 为页面或其 DisplayList；clip 向外多取 1 像素，避免坐标换算的舍入误差导致边缘缺行
+    """
+    left, top, right, bottom = box
+    ox, oy = page_irect.x0, page_irect.y0
+    device = fitz.Rect(left + ox - 1, top + oy - 1, right + ox + 1, bottom + oy + 1)
+    pix = source.get_pixmap(matrix=mat, clip=device * ~mat, **options.pixmap_args(source))
+    x = left + ox - pix.x
+    y = top + oy - pix.y
+    return pixmap_to_image(pix).crop((x, y, x + right - left, y + bottom - top))
+
+
+def render_page_tiled(page, mat, crop_params, output_path, encoder, memory_budget, stats=None, writer=None,
+                      options=DEFAULT_RENDER_OPTIONS):
+    """
+    分块渲染：按内存预算划分水平条带，逐条带渲染裁剪区域并写入流式编码器
+    返回条带数。stats 的 encode 阶段包含流式写入磁盘的时间。
+    writer: 输出写入器（见 pdf_writer），决定流式写入的目标；None 时直接写入 output_path
+    options: 色彩空间、透明通道与注释等渲染参数（见 RenderOptions）
+    """
+    from PIL import Image
+
+    stats = stats or PageStats()
+    stream_path = writer.stream_path(output_path) if writer is not None else output_path
+    page_irect = (page.rect * mat).irect
+    left, top, right, bottom = crop_box(page_irect.width, page_irect.height, crop_params)
+    width, height = right - left, bottom - top
+    rows = band_height(width, options.channels, memory_budget)
+    with stats.stage("render"):
+        display_list = page.get_displaylist(annots=options.annotations)  # 页面内容只解析一次，各条带共用
+
+    stream = None
+    canvas = None
+    bands = 0
+    try:
+        for y0, y1 in iter_bands(top, bottom, rows):
+            with stats.stage("render"):
+                band = render_band(display_list, mat, page_irect, (left, y0, right, y1), options)
+            with stats.stage("convert"):
+                band = encoder.convert_image(band)
+            with stats.stage("encode"):
+                if bands == 0:
+                    stream = encoder.open_stream(stream_path, width, height, band.mode, rows)
+                    if stream is None:
+                        # 不支持流式写入的格式：拼接到整图，省去整页 Pixmap 与裁剪副本
+                        canvas = Image.new(band.mode, (width, height))
+                if stream is not None:
+                    stream.write(band)
+                else:
+                    canvas.paste(band, (0, y0 - top))
+            bands += 1
+        with stats.stage("encode"):
+            if stream is not None:
+                stream.close()
+            else:
+                encoder.encode(canvas, stream_path)
+    except BaseException:
+        if stream is not None:
+            stream.abort()
+        if stream_path != output_path and os.path.exists(stream_path):
+            os.remove(stream_path)
+        raise
+
+    stats.pixels += width * height
+    stats.add_output(output_path, os.path.getsize(stream_path))
+    if writer is not None:
+        # 即使已直接写在 output_path，也交给写入器，按其 fsync 策略同步
+        with stats.stage("write"):
+            writer.submit_file(output_path, stream_path)
+    return bands
+
+
+def needs_tiling(page, mat, memory_budget, channels=3):
+    """整页 Pixmap（每像素 channels 字节）是否超出内存预算"""
+    if not memory_budget:
+        return False
+    irect = (page.rect * mat).irect
+    return irect.width * irect.height * channels > memory_budget
+
+
+def write_image(img, output_path, encoder, stats, writer=None):
+    """
+    按编码设置转换色彩、编码到内存后交给写入器；writer 为 None 时同步、原子地写入磁盘
+    后台写入时 write 阶段只包含队列已满时的等待时间
+    """
+    with stats.stage("convert"):
+        img = encoder.convert_image(img)
+    with stats.stage("encode"):
+        buf = io.BytesIO()
+        encoder.encode(img, buf)
+    with stats.stage("write"):
+        if writer is None:
+            atomic_write(output_path, buf.getbuffer())
+        else:
+            writer.submit(output_path, buf.getbuffer())
+    stats.add_output(output_path, buf.tell())
+
+
+def downscale(img, size):
+    """
+    缩小图像：整数倍时用 reduce（按块取平均，最快），
+    否则用 Lanczos 并允许先按整数倍预缩小（reducing_gap=1.0），速度约为直接 Lanczos 的 3 倍
+    """
+    from PIL import Image
+
+    k = round(img.width / size[0])
+    if k >= 2 and ((img.width + k - 1) // k, (img.height + k - 1) // k) == size:
+        return img.reduce(k)
+    return img.resize(size, Image.Resampling.LANCZOS, reducing_gap=1.0)
+
+
+def scale_crop(crop_params, factor):
+    """按比例换算裁剪像素；CropMargins 与 AutoCrop 在各分辨率下分别换算 / 检测，原样返回"""
+    if isinstance(crop_params, (CropMargins, AutoCrop)):
+        return crop_params
+    return tuple(int(round(v * factor)) for v in crop_params)
+
+
+def resolve_crop(page, zoom, crop_params, stats, img=None):
+    """
+    将裁剪参数换算为缩放比例 zoom 下的 (左, 上, 右, 下) 裁剪像素
+    CropMargins 按页面尺寸换算；AutoCrop 检测该页的内容区域（img 为已渲染的整页图像时在其上检测）
+    """
+    if isinstance(crop_params, CropMargins):
+        irect = (page.rect * fitz.Matrix(zoom, zoom)).irect
+        return crop_params.to_pixels(zoom, irect.width, irect.height)
+    if not isinstance(crop_params, AutoCrop):
+        return crop_params
+    with stats.stage("crop"):
+        return detect_margins(page, zoom, crop_params, img)
+
+
+def crop_to_json(crop_params):
+    """用于运行清单的裁剪参数"""
+    return asdict(crop_params) if isinstance(crop_params, (CropMargins, AutoCrop)) else crop_params
+
+
+def render_cropped(page, zoom, crop_params, stats, options=DEFAULT_RENDER_OPTIONS):
+    """
+    按缩放比例 zoom 渲染一页的裁剪区域，返回 Image
+
+    渲染前即可确定裁剪框时（像素、CropMargins、vector 自动裁剪）以 clip 矩形只光栅化保留的区域；
+    raster 自动裁剪需要先渲染整页再在像素上检测。
+    """
+    mat = fitz.Matrix(zoom, zoom)
+    if isinstance(crop_params, AutoCrop) and crop_params.method == "raster":
+        with stats.stage("render"):
+            pix = page.get_pixmap(matrix=mat, **options.pixmap_args(page))
+        stats.pixels += pix.width * pix.height
+        img = pixmap_to_image(pix)
+        crop_params = resolve_crop(page, zoom, crop_params, stats, img)
+        with stats.stage("crop"):
+            box = crop_box(img.width, img.height, crop_params)
+            return img if box == (0, 0, img.width, img.height) else img.crop(box)
+
+    page_irect = (page.rect * mat).irect
+    box = crop_box(page_irect.width, page_irect.height, resolve_crop(page, zoom, crop_params, stats))
+    with stats.stage("render"):
+        if box == (0, 0, page_irect.width, page_irect.height):
+            # 无需裁剪时直接编码 Pixmap 的像素
+            img = pixmap_to_image(page.get_pixmap(matrix=mat, **options.pixmap_args(page)))
+        else:
+            img = render_band(page, mat, page_irect, box, options)
+    stats.pixels += img.width * img.height
+    return img
+
+
+def render_page(page, zoom, crop_params, output_path, encoder, options, stats, writer=None):
+    """以单一分辨率渲染并保存一页，超出内存预算时分块渲染"""
+    mat = fitz.Matrix(zoom, zoom)
+    if needs_tiling(page, mat, options.memory_budget, options.channels):
+        # 分块渲染前没有整页位图，自动裁剪改用矢量信息或低分辨率渲染检测
+        crop_params = resolve_crop(page, zoom, crop_params, stats)
+        render_page_tiled(page, mat, crop_params, output_path, encoder, options.memory_budget, stats, writer,
+                          options)
+        return
+    write_image(render_cropped(page, zoom, crop_params, stats, options), output_path, encoder, stats, writer)
+
+
+def render_page_variants(page, zoom, crop_params, output_path, variants, encoder, options, stats, writer=None):
+    """
+    多分辨率输出：按最高的 DPI 渲染一次，较小的尺寸在同一进程中由上一级结果缩小得到
+
+    variants 为 [(缩放比例, 输出路径)]；像素形式的 crop_params 以 zoom 对应的像素给出，其他尺寸按比例换算，
+    各尺寸裁剪的是同一块页面区域。最高分辨率超出内存预算时退化为逐个尺寸单独渲染。
+    """
+    outputs = sorted([(zoom, output_path)] + list(variants), key=lambda item: item[0], reverse=True)
+    top_zoom = outputs[0][0]
+    if needs_tiling(page, fitz.Matrix(top_zoom, top_zoom), options.memory_budget, options.channels):
+        for z, path in outputs:
+            render_page(page, z, scale_crop(crop_params, z / zoom), path, encoder, options, stats, writer)
+        return
+
+    base = render_cropped(page, top_zoom, scale_crop(crop_params, top_zoom / zoom), stats, options)
+    current = base
+    for z, path in outputs:
+        if z != top_zoom:
+            # 目标尺寸按最高分辨率的裁剪结果换算，避免逐级缩小累积舍入误差
+            size = (max(1, round(base.width * z / top_zoom)), max(1, round(base.height * z / top_zoom)))
+            with stats.stage("resize"):
+                if size != current.size:
+                    current = downscale(current, size)
+        write_image(current, path, encoder, stats, writer)
+
+
+def extract_page(page, zoom, crop_params, output_path, variants, encoder, options, stats, writer=None):
+    """
+    扫描页直接提取原图：按图像原始分辨率输出主图，variants 的各尺寸由原图缩小得到
+    像素形式的 crop_params 以 zoom 对应的像素给出，按原始分辨率换算；未裁剪的 JPEG 输出 JPEG 时原样写出。
+    页面不适合提取（见 find_page_image）或原图超出内存预算时返回 False，由调用方正常渲染。
+    """
+    doc = page.parent
+    with stats.stage("extract"):
+        image = find_page_image(page)
+        if image is None:
+            return False
+        if options.memory_budget and image.width * image.height * 3 > options.memory_budget:
+            return False
+        # 按灰度渲染时提取结果同样转为灰度
+        color = "gray" if options.colorspace == "gray" else encoder.color
+        data = None
+        if not variants and encoder.format == "jpeg" and not isinstance(crop_params, AutoCrop) \
+                and not any(resolve_crop(page, image.zoom, scale_crop(crop_params, image.zoom / zoom), stats)):
+            data = passthrough_bytes(doc, image, color)
+        img = None if data is not None else load_page_image(doc, image)
+        if data is None and img is None:
+            return False
+        if img is not None and options.colorspace == "gray" and img.mode != "L":
+            img = img.convert("L")
+    stats.extracted = True
+    stats.pixels += image.width * image.height
+
+    if data is not None:
+        with stats.stage("write"):
+            if writer is None:
+                atomic_write(output_path, data)
+            else:
+                writer.submit(output_path, data)
+        stats.add_output(output_path, len(data))
+        return True
+
+    crop_params = resolve_crop(page, image.zoom, scale_crop(crop_params, image.zoom / zoom), stats, img)
+    with stats.stage("crop"):
+        box = crop_box(img.width, img.height, crop_params)
+        base = img if box == (0, 0, img.width, img.height) else img.crop(box)
+    write_image(base, output_path, encoder, stats, writer)
+
+    current = base
+    for z, path in sorted(variants, key=lambda item: item[0], reverse=True):
+        size = (max(1, round(base.width * z / image.zoom)), max(1, round(base.height * z / image.zoom)))
+        with stats.stage("resize"):
+            if size != current.size:
+                current = downscale(current, size)
+        write_image(current, path, encoder, stats, writer)
+    return True
+
+
+def render_page_shared(page, zoom, crop_params, shared_name, encoder, options, stats):
+    """
+    渲染到父进程分配的共享内存（见 pdf_shm），不编码、不写磁盘，(模式, 宽, 高) 记入 stats.shared
+    超出内存预算时按条带渲染并逐条带复制，子进程的峰值内存与页面尺寸无关
+    """
+    mat = fitz.Matrix(zoom, zoom)
+    with SharedImageWriter(shared_name) as out:
+        if needs_tiling(page, mat, options.memory_budget, options.channels):
+            crop_params = resolve_crop(page, zoom, crop_params, stats)
+            page_irect = (page.rect * mat).irect
+            left, top, right, bottom = crop_box(page_irect.width, page_irect.height, crop_params)
+            with stats.stage("render"):
+                display_list = page.get_displaylist(annots=options.annotations)
+            rows = band_height(right - left, options.channels, options.memory_budget)
+            for y0, y1 in iter_bands(top, bottom, rows):
+                with stats.stage("render"):
+                    band = render_band(display_list, mat, page_irect, (left, y0, right, y1), options)
+                with stats.stage("convert"):
+                    band = encoder.convert_image(band)
+                with stats.stage("write"):
+                    out.write(band)
+            stats.pixels += (right - left) * (bottom - top)
+        else:
+            img = render_cropped(page, zoom, crop_params, stats, options)
+            with stats.stage("convert"):
+                img = encoder.convert_image(img)
+            with stats.stage("write"):
+                out.write(img)
+        stats.shared = out.descriptor
+
+
+def process_page_task(pdf_path, page_index, zoom, crop_params, output_path, encoder=DEFAULT_ENCODER,
+                      options=DEFAULT_RENDER_OPTIONS, stats=None, variants=(), writer=None, shared_name=None):
+    """
+    独立进程执行的单页处理函数
+    stats: 可选的 PageStats，记录 open / load / extract / render / crop / resize / convert / encode / write 各阶段耗时
+    variants: 额外输出的 [(缩放比例, 输出路径)]，与主输出共用一次渲染
+    writer: 输出写入器（见 pdf_writer），None 时同步写入
+    shared_name: 非空时渲染到该名称的共享内存，不写入 output_path
+    """
+    stats = stats or PageStats()
+    # 抗锯齿级别是 MuPDF 的全局设置：按本任务的选项设置，结束后恢复，不影响同一进程中的其他渲染（如预览）
+    previous_aa = fitz.TOOLS.show_aa_level()["graphics"]
+    try:
+        if options.antialias != previous_aa:
+            fitz.TOOLS.set_aa_level(options.antialias)
+        # 复用本进程已打开的文档
+        with stats.stage("open"):
+            doc = open_cached_document(pdf_path)
+        with stats.stage("load"):
+            page = doc.load_page(page_index)
+            if options.fingerprint:
+                stats.fingerprint = page_fingerprint(doc, page)
+
+        if shared_name:
+            render_page_shared(page, zoom, crop_params, shared_name, encoder, options, stats)
+        elif options.extract_images and extract_page(page, zoom, crop_params, output_path, variants, encoder,
+                                                     options, stats, writer):
+            pass  # 已直接提取原图
+        elif variants:
+            render_page_variants(page, zoom, crop_params, output_path, variants, encoder, options, stats, writer)
+        else:
+            render_page(page, zoom, crop_params, output_path, encoder, options, stats, writer)
+        return True
+    except Exception as e:
+        return str(e)
+    finally:
+        if options.antialias != previous_aa:
+            fitz.TOOLS.set_aa_level(previous_aa)
+
+
+@dataclass
+class PageResult:
+    """单页转换结果"""
+    page_index: int
+    output_path: str
+    ok: bool
+    error: str = None
+    elapsed: float = 0.0  # 子进程内的处理耗时（秒）
+    stages: dict = field(default_factory=dict)  # 阶段名 -> 耗时（秒）
+    pixels: int = 0
+    bytes_written: int = 0
+    error_stage: str = None  # 失败时所在的阶段
+    profile: str = None      # cProfile 采样文件路径
+    fingerprint: str = None  # 页面内容指纹，见 page_fingerprint
+    outputs: dict = field(default_factory=dict)  # 写入的文件路径 -> 字节数（含多分辨率输出）
+    skipped: bool = False    # 增量转换时输出已存在且有效，未重新渲染
+    payloads: dict = field(default_factory=dict)  # return_output 时交回父进程的 路径 -> bytes 或临时文件路径
+    shared: tuple = None     # 渲染到共享内存时的 (模式, 宽, 高)
+    image: object = None     # 内存模式下父进程中的 SharedImage（见 pdf_shm），使用后需 release()
+    extracted: bool = False  # 直接提取了原图，未经渲染（见 pdf_extract）
+
+    def to_dict(self):
+        return {f.name: getattr(self, f.name) for f in fields(self) if f.name not in ("payloads", "image")}
+
+
+@dataclass
+class ConversionResult:
+    """整份文档的转换结果"""
+    pdf_path: str
+    output_dir: str
+    total_pages: int
+    pages: list = field(default_factory=list)
+    elapsed: float = 0.0
+    time_to_first_page: float = None  # 从开始处理到第一页结果返回的时间（秒），含子进程启动
+    stopped: bool = False
+    error: str = None  # 文档无法打开等导致整份文档失败时的错误信息
+    merged_output: str = None  # 多页合并输出（如多页 TIFF）的路径
+
+    @property
+    def completed(self):
+        return sum(1 for p in self.pages if p.ok)
+
+    @property
+    def failed(self):
+        return [p for p in self.pages if not p.ok]
+
+    @property
+    def skipped(self):
+        return sum(1 for p in self.pages if p.skipped)
+
+    @property
+    def done(self):
+        return len(self.pages) >= self.total_pages
+
+    @property
+    def pages_per_sec(self):
+        """实际渲染的页数 / 用时，不含跳过的页"""
+        return (len(self.pages) - self.skipped) / self.elapsed if self.elapsed > 0 else 0.0
+
+    def report(self):
+        """分阶段运行报告，见 pdf_stats.build_report"""
+        return build_report([self], self.elapsed, self.time_to_first_page)
+
+    def to_dict(self):
+        data = asdict(replace(self, pages=[]))
+        data["pages"] = [p.to_dict() for p in self.pages]
+        data.update(completed=self.completed, skipped=self.skipped, pages_per_sec=self.pages_per_sec)
+        return data
+
+
+@dataclass
+class BatchResult:
+    """多文档批量转换结果，documents 与输入顺序一致"""
+    documents: list = field(default_factory=list)
+    elapsed: float = 0.0
+    time_to_first_page: float = None  # 从调用 run_jobs 到第一页结果返回的时间（秒），含子进程启动
+    stopped: bool = False
+    concurrency: list = field(default_factory=list)  # 同时处理页数的变化记录（首项为初始值）
+
+    @property
+    def total_pages(self):
+        return sum(d.total_pages for d in self.documents)
+
+    @property
+    def processed_pages(self):
+        return sum(len(d.pages) for d in self.documents)
+
+    @property
+    def completed(self):
+        return sum(d.completed for d in self.documents)
+
+    @property
+    def skipped(self):
+        return sum(d.skipped for d in self.documents)
+
+    @property
+    def failed_documents(self):
+        return [d for d in self.documents if d.error or d.failed]
+
+    @property
+    def pages_per_sec(self):
+        return (self.processed_pages - self.skipped) / self.elapsed if self.elapsed > 0 else 0.0
+
+    def report(self):
+        """分阶段运行报告，见 pdf_stats.build_report"""
+        return build_report(self.documents, self.elapsed, self.time_to_first_page)
+
+    def to_dict(self):
+        return {
+            "documents": [d.to_dict() for d in self.documents],
+            "elapsed": self.elapsed,
+            "time_to_first_page": self.time_to_first_page,
+            "stopped": self.stopped,
+            "concurrency": self.concurrency,
+            "total_pages": self.total_pages,
+            "completed": self.completed,
+            "skipped": self.skipped,
+            "pages_per_sec": self.pages_per_sec,
+        }
+
+
+def run_page_task(pdf_path, page_index, zoom, crop_params, output_path, encoder=DEFAULT_ENCODER,
+                  options=DEFAULT_RENDER_OPTIONS, variants=(), writer=None, shared_name=None):
+    """在子进程中执行单页任务并计时，返回附带分阶段统计的 PageResult"""
+    stats = PageStats()
+    args = (pdf_path, page_index, zoom, crop_params, output_path, encoder, options, stats, variants, writer,
+            shared_name)
+    profile = None
+    start = time.perf_counter()
+    if options.profile_dir:
+        profiler = PageProfiler(options.profile_dir, options.profile_threshold)
+        result, profile = profiler.run(pdf_path, page_index, process_page_task, *args)
+    else:
+        result = process_page_task(*args)
+    elapsed = time.perf_counter() - start
+
+    page_result = PageResult(page_index, output_path, result is True, elapsed=elapsed, stages=stats.stages,
+                             pixels=stats.pixels, bytes_written=stats.bytes_written, profile=profile,
+                             fingerprint=stats.fingerprint, outputs=stats.outputs, shared=stats.shared,
+                             extracted=stats.extracted)
+    if result is not True:
+        page_result.error = result
+        page_result.error_stage = stats.current
+    if isinstance(writer, MemorySink):
+        page_result.payloads = writer.take()
+    return page_result
+
+
+def run_page_chunk(pdf_path, page_indices, zoom, crop_params, output_dir, encoder=DEFAULT_ENCODER,
+                   options=DEFAULT_RENDER_OPTIONS, variant_dirs=(), shared_names=None):
+    """
+    在子进程中顺序处理一段连续页码，文档只打开一次
+    每页开始前检查停止标志，停止时只返回已完成的页
+    variant_dirs: 多分辨率输出的 [(缩放比例, 输出目录)]
+    shared_names: 内存模式下 页码 -> 父进程分配的共享内存名称
+    """
+    writer = get_output_writer(options)
+    results = []
+    for i in page_indices:
+        if _stop_event is not None and _stop_event.is_set():
+            break
+        output_path = page_output_path(output_dir, i, encoder.extension)
+        variants = [(z, page_output_path(d, i, encoder.extension)) for z, d in variant_dirs]
+        shared_name = shared_names[i] if shared_names else None
+        results.append(run_page_task(pdf_path, i, zoom, crop_params, output_path, encoder, options, variants,
+                                     writer, shared_name))
+
+    # 返回前等待后台写入完成，父进程收到结果时文件均已落盘；写入失败的页标记为失败
+    errors = writer.flush()
+    for page_result in results:
+        error = next((errors[p] for p in page_result.outputs if p in errors), errors.get(None))
+        if error is not None and page_result.ok:
+            page_result.ok = False
+            page_result.error = error
+            page_result.error_stage = "write"
+    return results
+
+
+def default_max_workers():
+    return usable_cpu_count()
+
+
+def default_chunk_size(total_pages, max_workers):
+    """每个进程约分到 4 段，兼顾负载均衡与进度刷新频率"""
+    return max(1, min(MAX_CHUNK_SIZE, total_pages // (max_workers * 4)))
+
+
+def iter_chunks(page_indices, chunk_size):
+    """将待处理页码（升序）按 chunk_size 页一段切分"""
+    for start in range(0, len(page_indices), chunk_size):
+        yield page_indices[start:start + chunk_size]
+
+
+def page_output_path(output_dir, page_index, extension="png"):
+    return os.path.join(output_dir, f"page{page_index + 1}.{extension}")
+
+
+def collect_pdf_sources(paths, recursive=False):
+    """
+    将文件与目录混合的输入展开为 [(PDF 路径, 相对目录)]（保持输入顺序，目录内按文件名排序，去重）
+    相对目录为 PDF 所在目录相对于输入目录的路径（直接给出的文件为 ""），指定统一的输出目录时据此保留目录结构
+    """
+    sources = {}
+    for path in paths:
+        path = os.path.normpath(path)
+        if os.path.isdir(path):
+            if recursive:
+                found = [os.path.join(root, name) for root, _, names in os.walk(path) for name in names]
+            else:
+                found = [os.path.join(path, name) for name in os.listdir(path)]
+            for f in sorted(f for f in found if f.lower().endswith(".pdf") and os.path.isfile(f)):
+                relative = os.path.relpath(os.path.dirname(f), path)
+                sources.setdefault(f, "" if relative == os.curdir else relative)
+        elif path.lower().endswith(".pdf"):
+            sources.setdefault(path, "")
+    return list(sources.items())
+
+
+def collect_pdfs(paths, recursive=False):
+    """
+    将文件与目录混合的输入展开为 PDF 文件列表（保持输入顺序，目录内按文件名排序，去重）
+    """
+    return [pdf for pdf, _ in collect_pdf_sources(paths, recursive)]
+
+
+def file_identity(pdf_path):
+    """文件身份：(绝对路径, 修改时间, 大小)，文件被修改后即视为另一个文件"""
+    path = os.path.abspath(pdf_path)
+    st = os.stat(path)
+    return path, st.st_mtime_ns, st.st_size
+
+
+class DocumentSession:
+    """
+    文档元数据会话
+
+    文件只打开一次，缓存页数、各页尺寸（点，已计入旋转）与旋转角度；
+    每次访问时比对文件的 mtime 与大小，变化后自动重新打开。
+    线程安全，GUI 主线程与转换线程可共用同一会话。
+    """
+
+    def __init__(self, pdf_path):
+        self.pdf_path = os.path.abspath(pdf_path)
+        self._lock = threading.RLock()
+        self._doc = None
+        self._identity = None
+        self._page_count = 0
+        self._pages = {}  # 页码 -> (宽, 高, 旋转角度)
+
+    def _ensure_open(self):
+        identity = file_identity(self.pdf_path)
+        if identity != self._identity:
+            self._close_doc()
+            self._doc = fitz.open(self.pdf_path)
+            self._identity = identity
+            self._page_count = len(self._doc)
+            self._pages = {}
+        return self._doc
+
+    def _page_info(self, page_index):
+        with self._lock:
+            doc = self._ensure_open()
+            info = self._pages.get(page_index)
+            if info is None:
+                page = doc.load_page(page_index)
+                info = (page.rect.width, page.rect.height, page.rotation)
+                self._pages[page_index] = info
+            return info
+
+    @property
+    def identity(self):
+        with self._lock:
+            self._ensure_open()
+            return self._identity
+
+    @property
+    def page_count(self):
+        with self._lock:
+            self._ensure_open()
+            return self._page_count
+
+    def page_size(self, page_index):
+        """页面显示尺寸 (宽, 高)，单位为点（1/72 英寸）"""
+        width, height, _ = self._page_info(page_index)
+        return width, height
+
+    def page_rotation(self, page_index):
+        return self._page_info(page_index)[2]
+
+    def page_fingerprint(self, page_index):
+        """页面内容指纹（不缓存，源文件变化后需与旧指纹比较时才调用）"""
+        with self._lock:
+            doc = self._ensure_open()
+            return page_fingerprint(doc, doc.load_page(page_index))
+
+    def _close_doc(self):
+        if self._doc is not None:
+            self._doc.close()
+            self._doc = None
+            self._identity = None
+
+    def close(self):
+        with self._lock:
+            self._close_doc()
+
+
+# 父进程内的文档会话缓存：绝对路径 -> DocumentSession
+_sessions = OrderedDict()
+_sessions_lock = threading.Lock()
+SESSION_CACHE_SIZE = 16
+
+
+def get_document_session(pdf_path):
+    """获取（或创建）指定文件的 DocumentSession，最近使用的若干个会话保持打开"""
+    path = os.path.abspath(pdf_path)
+    with _sessions_lock:
+        session = _sessions.get(path)
+        if session is None:
+            session = DocumentSession(path)
+            _sessions[path] = session
+        _sessions.move_to_end(path)
+        while len(_sessions) > SESSION_CACHE_SIZE:
+            _, old = _sessions.popitem(last=False)
+            old.close()
+        return session
+
+
+class WorkerPool:
+    """
+    可长期复用的进程池
+
+    多次转换、多个文档共享同一批子进程，避免每次转换都重新启动进程；
+    子进程首次提交任务时才真正启动。同一时间只应有一个 run_jobs 使用它。
+    未指定 max_workers 时为自适应模式：进程数取可用 CPU 数，
+    实际同时处理的页数再由 run_jobs 根据页面内存估算与可用内存动态限制。
+    """
+
+    def __init__(self, max_workers=None):
+        self.adaptive = max_workers is None
+        self.max_workers = max_workers or default_max_workers()
+        self.stop_event = multiprocessing.Event()
+        self._executor = None
+        self._lock = threading.Lock()  # 预热线程与转换线程可能同时创建进程池
+
+    @property
+    def executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                     initializer=init_worker, initargs=(self.stop_event,))
+            return self._executor
+
+    def submit(self, fn, *args):
+        return self.executor.submit(fn, *args)
+
+    def warm_up(self):
+        """
+        立即启动全部子进程并等待其完成初始化（导入 PyMuPDF / Pillow），返回用时（秒）
+        可在程序启动后于后台线程中调用，第一次转换时无需再等待进程启动；
+        进程池被关闭或子进程启动失败时返回 None，之后使用时会照常重新创建
+        """
+        start = time.perf_counter()
+        try:
+            # 同时提交 max_workers 个任务：没有空闲子进程时进程池每次提交都会启动一个新进程
+            futures = [self.submit(warm_worker) for _ in range(self.max_workers)]
+            for future in futures:
+                future.result()
+        except Exception:
+            return None
+        return time.perf_counter() - start
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            self.stop_event.set()
+            executor.shutdown(wait=wait, cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+
+
+class ConversionJob:
+    """
+    一次 PDF 转换任务
+
+    输出目录为 output_dir/<PDF 文件名>/，每页保存为 pageN.<扩展名>（格式由 encoder 决定）；
+    多页 TIFF 模式下各页先写入其中的 .pages/ 子目录，全部完成后合并为 <PDF 文件名>.tif。
+    crop 为 (左, 上, 右, 下) 像素；或 CropMargins，以点或页面比例给出，与 DPI 无关（见 pdf_crop）；
+    也可以是 AutoCrop，逐页检测内容区域后裁剪（见 pdf_autocrop）。裁剪区域以外的部分不会被渲染。
+    render_options 控制渲染方式（如超大页面分块渲染的内存预算）。
+    pages 为页码范围表达式（如 "1-10,25,40-"，见 pdf_pages），None 表示全部页面，未选中的页不会渲染；
+    page_rules 为 PageRule 序列，对部分页面覆盖 DPI / 裁剪 / 格式，后面的规则优先。
+    extra_dpis 为同时输出的其他分辨率（如缩略图），保存到 <DPI>dpi/ 子目录；每页只按最高 DPI 渲染一次，
+    其余尺寸由子进程直接缩小得到，裁剪区域与主输出相同（crop 以主输出 DPI 的像素给出）。
+    页面按 chunk_size 页一段的连续区间分发给子进程，每个子进程只打开一次文档。
+    同时在途的任务段不超过 max_workers * IN_FLIGHT_PER_WORKER，内存占用与总页数无关。
+
+    输出目录中的运行清单（见 pdf_manifest）记录源文件、参数与已完成的页面；
+    resume 为 True 时跳过参数相同、输出仍然有效且内容未变的页面，中断后重新运行只处理剩余部分。
+
+    archive 为 open_archive 返回的归档写入器时，所有输出以 <PDF 文件名>/pageN.<扩展名> 写入该归档：
+    子进程只编码并把数据交回父进程，由父进程的写线程顺序写入，不创建逐页文件，也不使用运行清单。
+    归档内的名称为相对于 archive_root（默认为 output_dir）的路径。
+
+    in_memory 为 True 时不编码、不写磁盘：父进程为每页分配共享内存，子进程把像素直接写入其中，
+    完成的页面以 PageResult.image（SharedImage，见 pdf_shm）提供，使用方用完后调用 release() 释放。
+    """
+
+    def __init__(self, pdf_path, output_dir, dpi=DEFAULT_DPI, crop=(0, 0, 0, 0), max_workers=None,
+                 chunk_size=None, encoder=None, render_options=None, resume=True, pages=None, page_rules=(),
+                 extra_dpis=(), archive=None, in_memory=False, archive_root=None):
+        self.pdf_path = pdf_path
+        self.output_dir = output_dir
+        self.archive_root = archive_root or output_dir
+        self.dpi = dpi
+        self.crop = crop if isinstance(crop, (CropMargins, AutoCrop)) else tuple(int(v) for v in crop)
+        self.max_workers = max_workers  # None 表示根据 CPU 与内存自适应
+        self.chunk_size = chunk_size
+        self.encoder = encoder or DEFAULT_ENCODER
+        self.render_options = render_options or DEFAULT_RENDER_OPTIONS
+        self.resume = resume
+        self.pages = pages
+        self.page_rules = tuple(page_rules)
+        self.extra_dpis = tuple(sorted({int(d) for d in extra_dpis}, reverse=True))
+        if dpi <= 0 or any(d <= 0 for d in self.extra_dpis):
+            raise ValueError("DPI 必须为正数")
+        if self.extra_dpis and self.encoder.multipage:
+            raise ValueError("多页 TIFF 模式不支持多分辨率输出")
+        self.archive = archive
+        if archive is not None:
+            if self.encoder.multipage:
+                raise ValueError("多页 TIFF 模式不支持写入归档")
+            self.render_options = replace(self.render_options, return_output=True)
+            self.resume = False
+        self.in_memory = in_memory
+        if in_memory:
+            if self.encoder.multipage or self.extra_dpis or archive is not None:
+                raise ValueError("内存模式不支持多页 TIFF、多分辨率输出或归档")
+            self.resume = False
+        self._buffers = {}  # 内存模式下已分配、尚未交给使用方的 页码 -> SharedMemory
+        self.manifest = None
+        self.selected = []  # 本次输出的页码（prepare 后有效）
+        self._rule_pages = []  # [(页码集合, PageRule)]
+
+    @property
+    def zoom(self):
+        return self.dpi / 72
+
+    @property
+    def pdf_name(self):
+        return os.path.splitext(os.path.basename(self.pdf_path))[0]
+
+    @property
+    def final_output_dir(self):
+        return os.path.join(self.output_dir, self.pdf_name)
+
+    @property
+    def pages_dir(self):
+        """逐页图片的写入目录"""
+        if self.encoder.multipage:
+            return os.path.join(self.final_output_dir, ".pages")
+        return self.final_output_dir
+
+    @property
+    def variant_dirs(self):
+        """多分辨率输出的 [(DPI, 目录)]"""
+        return [(dpi, os.path.join(self.final_output_dir, f"{dpi}dpi")) for dpi in self.extra_dpis]
+
+    @property
+    def merged_output_path(self):
+        return os.path.join(self.final_output_dir, f"{self.pdf_name}.{self.encoder.extension}")
+
+    def page_settings(self, page_index):
+        """第 page_index 页实际使用的 (dpi, crop, encoder)"""
+        dpi, crop, encoder = self.dpi, self.crop, self.encoder
+        for pages, rule in self._rule_pages:
+            if page_index in pages:
+                dpi = rule.dpi if rule.dpi is not None else dpi
+                crop = rule.crop or crop
+                encoder = rule.apply_encoder(encoder)
+        return dpi, crop, encoder
+
+    def page_params(self, page_index):
+        """决定该页输出内容的参数，任一项变化时已有输出失效"""
+        dpi, crop, encoder = self.page_settings(page_index)
+        params = {"dpi": dpi, "crop": crop_to_json(crop), "encoder": asdict(encoder), "extra_dpis": self.extra_dpis}
+        params.update(self.render_options.output_params())
+        return params
+
+    def prepare(self):
+        """
+        创建输出目录、读取页数并展开页码范围，返回 ConversionResult（total_pages 为本次输出的页数）
+        增量转换时，可跳过的页面已作为 skipped 的 PageResult 填入 pages
+        """
+        session = get_document_session(self.pdf_path)
+        page_count = session.page_count
+        self.selected = parse_page_ranges(self.pages, page_count)
+        self._rule_pages = [(set(parse_page_ranges(rule.pages, page_count)), rule) for rule in self.page_rules]
+        for _, rule in self._rule_pages:
+            if self.encoder.multipage and rule.apply_encoder(self.encoder).format != "tiff":
+                raise ValueError("多页 TIFF 模式下不能为部分页面指定其他格式")
+        if self.archive is not None:
+            return ConversionResult(self.pdf_path, self.archive.sink.path, len(self.selected))
+        if self.in_memory:
+            return ConversionResult(self.pdf_path, None, len(self.selected))
+
+        os.makedirs(self.final_output_dir, exist_ok=True)
+        for _, path in self.variant_dirs:
+            os.makedirs(path, exist_ok=True)
+        result = ConversionResult(self.pdf_path, self.final_output_dir, len(self.selected))
+
+        previous = RunManifest.load(os.path.join(self.final_output_dir, MANIFEST_NAME)) if self.resume else None
+        defaults = {"dpi": self.dpi, "crop": crop_to_json(self.crop), "encoder": asdict(self.encoder)}
+        self.manifest = RunManifest.create(self.final_output_dir, self.pdf_path, defaults, previous)
+        reused = self.manifest.adopt(previous, self.selected, self.page_path, self.page_params,
+                                     self.merged_output_path, session.page_fingerprint)
+        result.pages = [PageResult(i, self.page_path(i), True, skipped=True) for i in reused]
+        if self.manifest.merged is not None:
+            result.merged_output = self.merged_output_path
+        else:
+            os.makedirs(self.pages_dir, exist_ok=True)
+        # 立即写入，使参数变化后旧记录马上失效
+        self.manifest.save(force=True)
+        return result
+
+    @property
+    def output_key(self):
+        """判断输出是否冲突的键：归档内的目录名，或磁盘上的输出目录；内存模式不写输出，为 None"""
+        if self.in_memory:
+            return None
+        if self.archive is not None:
+            return "archive", os.path.relpath(self.final_output_dir, self.archive_root).replace(os.sep, "/")
+        return "dir", os.path.normcase(os.path.abspath(self.final_output_dir))
+
+    def page_path(self, page_index):
+        encoder = self.page_settings(page_index)[2]
+        return page_output_path(self.pages_dir, page_index, encoder.extension)
+
+    def iter_tasks(self, result, max_workers):
+        """
+        生成提交给进程池的 (函数, 参数...) 元组：跳过已有有效输出的页，
+        参数相同的连续页合为一组，组内再按 chunk_size 切分
+        """
+        done = {p.page_index for p in result.pages}
+        pending = [i for i in self.selected if i not in done]
+        chunk_size = self.chunk_size or default_chunk_size(len(pending), max_workers)
+        variant_dirs = tuple((dpi / 72, path) for dpi, path in self.variant_dirs)
+        # 只有写入运行清单时才需要页面指纹
+        options = replace(self.render_options, fingerprint=self.manifest is not None)
+        for (dpi, crop, encoder), group in groupby(pending, key=self.page_settings):
+            for pages in iter_chunks(list(group), chunk_size):
+                # 内存模式下提交时才分配，同时存在的未完成缓冲区受在途任务窗口限制
+                shared_names = {i: self.allocate_buffer(i).name for i in pages} if self.in_memory else None
+                yield (run_page_chunk, self.pdf_path, pages, dpi / 72, crop, self.pages_dir, encoder,
+                       options.for_encoder(encoder), variant_dirs, shared_names)
+
+    def allocate_buffer(self, page_index):
+        """按整页尺寸（裁剪前）分配该页的共享内存，实际图像不会超过该大小"""
+        width, height = get_document_session(self.pdf_path).page_size(page_index)
+        dpi, _, encoder = self.page_settings(page_index)
+        zoom = dpi / 72
+        channels = 1 if encoder.color in ("gray", "mono") else self.render_options.for_encoder(encoder).channels
+        shm = allocate((int(width * zoom) + 2) * (int(height * zoom) + 2) * channels)
+        self._buffers[page_index] = shm
+        return shm
+
+    def release_buffers(self):
+        """释放尚未交给使用方的共享内存（任务被取消或停止时）"""
+        while self._buffers:
+            discard(self._buffers.popitem()[1])
+
+    def estimate_page_memory(self, result, samples=16):
+        """按抽样页面中峰值内存最大的一页估算（各页按其实际 DPI 与格式计算）"""
+        session = get_document_session(self.pdf_path)
+        step = max(1, len(self.selected) // samples)
+        sampled = set(self.selected[::step])
+        # 覆盖了 DPI 或格式的页面各取一页，避免抽样遗漏少数高 DPI 页面
+        for pages, _ in self._rule_pages:
+            sampled.update(sorted(pages & set(self.selected))[:1])
+
+        def page_memory(i):
+            width, height = session.page_size(i)
+            dpi, _, encoder = self.page_settings(i)
+            dpi = max((dpi,) + self.extra_dpis)
+            return estimate_page_memory(width, height, dpi / 72, self.render_options.memory_budget,
+                                        encoder.format in ("png", "tiff"),
+                                        self.render_options.for_encoder(encoder).channels)
+
+        return max(page_memory(i) for i in sampled)
+
+    def record(self, page_result):
+        if self.manifest is not None:
+            self.manifest.record(page_result, self.page_params(page_result.page_index))
+
+    def store(self, page_result):
+        """
+        内存模式下把该页的共享内存交给 page_result.image；
+        归档模式下把子进程交回的输出提交给归档写线程，归档内的名称为相对于 archive_root 的路径
+        """
+        if self.in_memory:
+            shm = self._buffers.pop(page_result.page_index)
+            page_result.output_path = None
+            if page_result.ok and page_result.shared:
+                page_result.image = SharedImage(shm, *page_result.shared)
+            else:
+                discard(shm)
+            return
+        if self.archive is None:
+            return
+        for path, data in page_result.payloads.items():
+            name = os.path.relpath(path, self.archive_root).replace(os.sep, "/")
+            if isinstance(data, str):
+                self.archive.submit_file(name, data)
+            else:
+                self.archive.submit(name, data)
+        page_result.payloads = {}
+
+    def save_manifest(self, force=False):
+        if self.manifest is not None:
+            self.manifest.save(force)
+
+    def finalize_task(self, result):
+        """所有页完成后需要在进程池中执行的收尾任务（如合并多页 TIFF），没有则返回 None"""
+        if not self.encoder.multipage or result.merged_output:
+            return None
+        page_paths = [p.output_path for p in sorted(result.pages, key=lambda p: p.page_index) if p.ok]
+        return (merge_tiff_pages, page_paths, self.merged_output_path, self.encoder.tiff_compression,
+                self.render_options.fsync)
+
+    def cleanup(self, result):
+        """收尾任务成功后记录合并输出并删除中间文件"""
+        if self.encoder.multipage:
+            self.manifest.record_merged(self.merged_output_path, self.selected)
+            for page in result.pages:
+                if page.ok and os.path.exists(page.output_path):
+                    os.remove(page.output_path)
+            try:
+                os.rmdir(self.pages_dir)
+            except OSError:
+                pass
+
+    def run(self, on_progress=None, should_stop=None, pool=None):
+        """
+        执行转换，阻塞直到完成或被停止
+
+        on_progress(completed, total, page_result): 每完成一页回调一次（按完成顺序，非页码顺序）
+        should_stop(): 返回 True 时停止分发并取消剩余任务，正在处理的页完成后返回
+        pool: 可选的共享 WorkerPool，未提供时临时创建
+        """
+        def on_page(doc_result, page_result, *_):
+            if on_progress:
+                on_progress(len(doc_result.pages), doc_result.total_pages, page_result)
+
+        if pool is None:
+            with WorkerPool(self.max_workers) as pool:
+                batch = run_jobs([self], pool, on_progress=on_page, should_stop=should_stop)
+        else:
+            batch = run_jobs([self], pool, on_progress=on_page, should_stop=should_stop)
+
+        result = batch.documents[0]
+        if result.error:
+            raise RuntimeError(result.error)
+        return result
+
+
+def _interleave(active_docs):
+    """
+    在多个文档的任务段之间轮转，最多同时推进 ACTIVE_DOCUMENTS 个文档，
+    使小文件尽早完成，同时不超出子进程的文档缓存
+    """
+    queue = deque(active_docs)
+    active = deque()
+    while queue or active:
+        while queue and len(active) < ACTIVE_DOCUMENTS:
+            active.append(queue.popleft())
+        result, tasks = active.popleft()
+        task = next(tasks, None)
+        if task is None:
+            continue
+        yield result, task
+        active.append((result, tasks))
+
+
+def check_output_conflicts(jobs):
+    """两个不同 PDF 的输出目录（或归档内的目录）相同时会互相覆盖，开始转换前报错"""
+    owners = {}
+    for job in jobs:
+        key = job.output_key
+        if key is None:
+            continue
+        owner = owners.setdefault(key, job.pdf_path)
+        if owner != job.pdf_path:
+            raise ValueError(f"{owner} 与 {job.pdf_path} 的输出目录相同（{job.final_output_dir}），请分别转换或改名")
+
+
+def run_jobs(jobs, pool, on_progress=None, should_stop=None, on_document_done=None):
+    """
+    在共享进程池中执行多个转换任务，各文档的任务段交错分发，进程间无需等待单个文档结束
+
+    on_progress(doc_result, page_result, overall_done, overall_total): 每完成一页回调一次
+    on_document_done(doc_result): 某个文档全部页面及收尾任务处理完（或无法打开）时回调
+    should_stop(): 返回 True 时停止分发，正在处理的页完成后返回
+
+    自适应进程池下，同时处理的页数由 ConcurrencyController 按可用内存动态限制。
+    不同 PDF 的输出目录相同时抛出 ValueError（见 check_output_conflicts），不做任何转换。
+    """
+    check_output_conflicts(jobs)
+    start = time.perf_counter()
+    batch = BatchResult()
+    job_of = {}
+    started = {}
+    finished = set()
+
+    def finish(result):
+        result.pages.sort(key=lambda p: p.page_index)
+        if id(result) in started:
+            result.elapsed = time.perf_counter() - started[id(result)]
+        finished.add(id(result))
+        job_of[id(result)].save_manifest(force=True)
+        if on_document_done:
+            on_document_done(result)
+
+    runnable = []
+    finalizing = []  # 所有页均可跳过、只需执行收尾任务的文档
+    for job in jobs:
+        try:
+            result = job.prepare()
+        except Exception as e:
+            result = ConversionResult(job.pdf_path, job.final_output_dir, 0, error=str(e))
+        batch.documents.append(result)
+        job_of[id(result)] = job
+        if result.error or result.total_pages == 0:
+            finish(result)
+        elif result.done:
+            task = job.finalize_task(result)
+            if task is None:
+                finish(result)
+            else:
+                finalizing.append((result, task))
+        else:
+            runnable.append((result, job.iter_tasks(result, pool.max_workers)))
+
+    overall_total = batch.total_pages
+    overall_done = batch.processed_pages  # 跳过的页计为已完成
+    tasks = _interleave(runnable)
+    controller = None
+    if pool.adaptive and runnable:
+        page_memory = max(job_of[id(result)].estimate_page_memory(result) for result, _ in runnable)
+        controller = ConcurrencyController(pool.max_workers, page_memory)
+        batch.concurrency = controller.history
+    else:
+        batch.concurrency = [pool.max_workers]
+    pool.stop_event.clear()
+    pending = {}  # future -> (文档结果, 是否为收尾任务)
+    try:
+        for result, (fn, *args) in finalizing:
+            pending[pool.submit(fn, *args)] = (result, True)
+        while True:
+            if not batch.stopped and should_stop and should_stop():
+                # 通知子进程在当前页完成后退出，并取消尚未开始的任务段
+                batch.stopped = True
+                pool.stop_event.set()
+                for future in pending:
+                    future.cancel()
+
+            # 补充任务直到填满窗口；内存不足时窗口收缩到允许的并发数，不再额外排队
+            window = pool.max_workers * IN_FLIGHT_PER_WORKER
+            if controller is not None:
+                limit = controller.update(running=min(len(pending), pool.max_workers))
+                if limit < pool.max_workers:
+                    window = limit
+            if not batch.stopped:
+                for result, (fn, *args) in islice(tasks, max(0, window - len(pending))):
+                    started.setdefault(id(result), time.perf_counter())
+                    pending[pool.submit(fn, *args)] = (result, False)
+            if not pending:
+                break
+
+            # 按完成顺序消费结果，超时后回到循环顶部检查停止请求
+            done, _ = wait(pending, timeout=STOP_POLL_INTERVAL, return_when=FIRST_COMPLETED)
+            for future in done:
+                result, is_finalize = pending.pop(future)
+                if future.cancelled():
+                    continue
+                job = job_of[id(result)]
+                if is_finalize:
+                    outcome = future.result()
+                    if outcome is True:
+                        result.merged_output = job.merged_output_path
+                        job.cleanup(result)
+                    else:
+                        result.error = f"合并输出失败: {outcome}"
+                    finish(result)
+                    continue
+
+                for page_result in future.result():
+                    now = time.perf_counter()
+                    if batch.time_to_first_page is None:
+                        batch.time_to_first_page = now - start
+                    if result.time_to_first_page is None:
+                        result.time_to_first_page = now - started[id(result)]
+                    result.pages.append(page_result)
+                    job.store(page_result)
+                    job.record(page_result)
+                    overall_done += 1
+                    if on_progress:
+                        on_progress(result, page_result, overall_done, overall_total)
+                job.save_manifest()
+                if result.done:
+                    task = job.finalize_task(result)
+                    if task is None:
+                        finish(result)
+                    elif not batch.stopped:
+                        fn, *args = task
+                        pending[pool.submit(fn, *args)] = (result, True)
+    except BaseException:
+        # 异常时丢弃进程池（可能已损坏），下次使用时重新创建
+        pool.shutdown(wait=False)
+        raise
+    finally:
+        for result in batch.documents:
+            if id(result) not in finished:
+                result.stopped = True
+                result.pages.sort(key=lambda p: p.page_index)
+                if id(result) in started:
+                    result.elapsed = time.perf_counter() - started[id(result)]
+                try:
+                    job_of[id(result)].save_manifest(force=True)
+                except OSError:
+                    pass
+        for job in jobs:
+            job.release_buffers()
+        batch.elapsed = time.perf_counter() - start
+    return batch
+
+
+def convert_pdf(pdf_path, output_dir, dpi=DEFAULT_DPI, crop=(0, 0, 0, 0), max_workers=None,
+                chunk_size=None, encoder=None, render_options=None, resume=True, pages=None, page_rules=(),
+                extra_dpis=(), archive=None, on_progress=None, should_stop=None, pool=None):
+    """
+    转换单个 PDF 的便捷函数，参数含义同 ConversionJob
+    archive 为归档文件路径（.zip / .tar）时所有输出写入该归档
+    """
+    with archive_writer(archive, render_options) as writer:
+        job = ConversionJob(pdf_path, output_dir, dpi=dpi, crop=crop, max_workers=max_workers,
+                            chunk_size=chunk_size, encoder=encoder, render_options=render_options, resume=resume,
+                            pages=pages, page_rules=page_rules, extra_dpis=extra_dpis, archive=writer)
+        return job.run(on_progress=on_progress, should_stop=should_stop, pool=pool)
+
+
+@contextmanager
+def archive_writer(archive, render_options=None):
+    """archive 为归档路径时打开归档写入器（fsync 策略取自 render_options），否则为 None"""
+    if archive is None:
+        yield None
+        return
+    with open_archive(archive, (render_options or DEFAULT_RENDER_OPTIONS).fsync) as writer:
+        yield writer
+
+
+def render_to_memory(pdf_path, dpi=DEFAULT_DPI, crop=(0, 0, 0, 0), color="rgb", max_workers=None,
+                     chunk_size=None, render_options=None, pages=None, page_rules=(), on_progress=None,
+                     should_stop=None, pool=None):
+    """
+    渲染为内存中的图像而不写入磁盘，供 OCR / 机器学习等流水线直接使用
+
+    返回 ConversionResult，成功的页面通过 page.image（SharedImage）访问：
+    array() 得到直接引用共享内存的 NumPy 数组，image() 得到 PIL Image（灰度时同样不复制像素）。
+    使用方负责在用完后调用 page.image.release()；页数较多时可在 on_progress 中逐页处理并释放。
+    """
+    job = ConversionJob(pdf_path, "", dpi=dpi, crop=crop, max_workers=max_workers, chunk_size=chunk_size,
+                        encoder=EncoderSettings(color=color), render_options=render_options, pages=pages,
+                        page_rules=page_rules, in_memory=True)
+    return job.run(on_progress=on_progress, should_stop=should_stop, pool=pool)
+
+
+def convert_batch(paths, output_dir=None, dpi=DEFAULT_DPI, crop=(0, 0, 0, 0), max_workers=None,
+                  chunk_size=None, encoder=None, render_options=None, resume=True, pages=None, page_rules=(),
+                  extra_dpis=(), archive=None, recursive=False, on_progress=None, should_stop=None,
+                  on_document_done=None, pool=None):
+    """
+    批量转换多个 PDF（可混合传入文件与目录），所有文档共享同一个进程池
+
+    output_dir 为空时每个 PDF 输出到其所在目录；指定时保留 PDF 相对于输入目录的子目录结构，
+    不同子目录中的同名 PDF 不会互相覆盖。回调参数含义同 run_jobs。
+    archive 为归档文件路径（.zip / .tar）时所有文档的输出写入同一个归档，归档内同样保留相对目录。
+    """
+    with archive_writer(archive, render_options) as writer:
+        # 写入归档时输出目录只用于生成归档内的名称，未指定时同样按相对目录组织
+        root = output_dir or (os.curdir if writer is not None else None)
+        jobs = []
+        for p, relative in collect_pdf_sources(paths, recursive=recursive):
+            job_dir = os.path.join(root, relative) if root else os.path.dirname(os.path.abspath(p))
+            jobs.append(ConversionJob(p, os.path.normpath(job_dir), dpi=dpi, crop=crop, max_workers=max_workers,
+                                      chunk_size=chunk_size, encoder=encoder, render_options=render_options,
+                                      resume=resume, pages=pages, page_rules=page_rules, extra_dpis=extra_dpis,
+                                      archive=writer, archive_root=root))
+        if pool is None:
+            with WorkerPool(max_workers) as pool:
+                return run_jobs(jobs, pool, on_progress, should_stop, on_document_done)
+        return run_jobs(jobs, pool, on_progress, should_stop, on_document_done)
+
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(prog="python -m pdf_engine", description="PDF 转图片（无界面模式）")
+    parser.add_argument("pdf", nargs="+", help="输入 PDF 文件或包含 PDF 的目录，可指定多个")
+    parser.add_argument("-o", "--output", help="保存路径（默认与 PDF 同目录）")
+    parser.add_argument("-r", "--recursive", action="store_true", help="递归查找目录中的 PDF")
+    parser.add_argument("--dpi", type=int, default=DEFAULT_DPI, help=f"渲染分辨率，默认 {DEFAULT_DPI}")
+    parser.add_argument("--extra-dpi", type=int, nargs="+", default=[], metavar="DPI",
+                        help="同时输出的其他分辨率（如 72 作为缩略图），保存到 <DPI>dpi 子目录；每页只渲染一次")
+    parser.add_argument("--crop", type=float, nargs=4, default=(0, 0, 0, 0), metavar=("L", "T", "R", "B"),
+                        help="裁剪边距（左 上 右 下），单位由 --crop-unit 指定")
+    parser.add_argument("--crop-unit", default="px", choices=CROP_UNITS,
+                        help="裁剪单位：px 像素（随 DPI 变化）、pt 点（1/72 英寸）、fraction 页面宽高的比例；默认 px")
+    parser.add_argument("--auto-crop", choices=AUTOCROP_METHODS, metavar="METHOD",
+                        help="逐页自动检测内容区域并裁剪（代替 --crop）：raster 按渲染结果检测，vector 按矢量绘制区域检测")
+    parser.add_argument("--auto-crop-threshold", type=int, default=200, metavar="0-255",
+                        help="自动裁剪：灰度低于该值的像素视为内容，默认 %(default)s")
+    parser.add_argument("--auto-crop-padding", type=float, default=6.0, metavar="PT",
+                        help="自动裁剪：内容四周保留的留白（点，1/72 英寸），默认 %(default)s")
+    parser.add_argument("--suggest-crop", action="store_true",
+                        help="只检测并输出适用于整份文档的统一裁剪像素（左 上 右 下），不转换")
+    parser.add_argument("-p", "--pages", help="页码范围，如 1-10,25,40-（从 1 开始），默认全部页面")
+    parser.add_argument("--override", action="append", default=[], metavar="RULE",
+                        help="对部分页面覆盖参数，如 1-3:dpi=600 或 5:format=jpeg,quality=80,crop=0/50/0/50；"
+                             "可指定多次，后面的优先")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="进程数，默认根据可用 CPU 与内存自动选择并动态调整")
+    parser.add_argument("--chunk-size", type=int, default=None, help="每个任务处理的连续页数，默认自动")
+    parser.add_argument("-f", "--format", default="png", choices=sorted(IMAGE_EXTENSIONS) + sorted(FORMAT_ALIASES),
+                        help="输出格式，默认 png")
+    parser.add_argument("--quality", type=int, default=90, help="jpeg / webp 有损压缩质量 (1-100)，默认 90")
+    parser.add_argument("--lossless", action="store_true", help="webp 无损压缩")
+    parser.add_argument("--compress-level", type=int, default=6, help="png 压缩级别 (0-9)，越低越快，默认 6")
+    parser.add_argument("--optimize", action="store_true", help="png / jpeg 额外优化（更慢、更小）")
+    parser.add_argument("--color", default="rgb", choices=COLOR_MODES, help="色彩模式：rgb / gray / mono（1 位黑白）")
+    parser.add_argument("--multipage", action="store_true", help="tiff: 每个 PDF 合并为一个多页 TIFF")
+    parser.add_argument("--memory-budget", type=int, default=DEFAULT_MEMORY_BUDGET // (1024 * 1024), metavar="MB",
+                        help="单页渲染内存预算 (MB)，超过时分块渲染，0 表示不分块；默认 %(default)s")
+    parser.add_argument("--extract-images", action="store_true",
+                        help="扫描页（只含一张整页图像）直接提取原图，按图像原始分辨率输出、不经渲染；其他页面照常渲染")
+    parser.add_argument("--render-colorspace", default="rgb", choices=RENDER_COLORSPACES,
+                        help="渲染色彩空间：gray 直接渲染灰度（内存为 rgb 的三分之一，适合黑白文档），"
+                             "auto 按每页的输出色彩模式选择；默认 rgb")
+    parser.add_argument("--alpha", action="store_true",
+                        help="渲染透明背景（rgb 色彩模式的 png / webp / tiff 保留透明，其他输出合成到白色背景）")
+    parser.add_argument("--antialias", type=int, default=8, choices=range(9), metavar="0-8",
+                        help="抗锯齿级别，0 关闭，越低渲染越快；默认 %(default)s")
+    parser.add_argument("--no-annots", action="store_true", help="不渲染注释与表单控件")
+    parser.add_argument("--force", action="store_true", help="忽略已有输出与运行清单，全部重新渲染")
+    parser.add_argument("--archive", metavar="FILE",
+                        help="所有输出写入一个 .zip / .tar 归档（按 <PDF 文件名>/pageN 命名），代替逐页文件")
+    parser.add_argument("--fsync", default="none", choices=FSYNC_POLICIES,
+                        help="写入后 fsync：none 不主动同步，file 每个文件，batch 每个任务段结束时；默认 none")
+    parser.add_argument("--sync-write", action="store_true", help="在渲染进程中同步写入，不使用后台写线程")
+    parser.add_argument("--json", action="store_true", help="以 JSON 输出逐页结果、分阶段耗时与运行报告")
+    parser.add_argument("--report", action="store_true", help="输出分阶段耗时报告（p50 / p95、页/秒、MB/秒）")
+    parser.add_argument("--profile", metavar="DIR", help="逐页 cProfile 采样，结果保存到该目录")
+    parser.add_argument("--profile-threshold", type=float, default=0.0, metavar="SEC",
+                        help="只保存耗时不低于该秒数的页面采样，默认全部保存")
+    parser.add_argument("-q", "--quiet", action="store_true", help="不输出进度")
+    return parser
+
+
+def main(argv=None):
+    parser = build_arg_parser()
+    args = parser.parse_args(argv)
+    try:
+        encoder = EncoderSettings(args.format, quality=args.quality, lossless=args.lossless,
+                                  compress_level=args.compress_level, optimize=args.optimize,
+                                  color=args.color, multipage=args.multipage)
+        check_page_ranges(args.pages)
+        page_rules = [parse_page_rule(text) for text in args.override]
+        for rule in page_rules:
+            rule.apply_encoder(encoder)
+        if args.dpi <= 0 or any(d <= 0 for d in args.extra_dpi):
+            raise ValueError("DPI 必须为正数")
+        if args.extra_dpi and args.multipage:
+            raise ValueError("多页 TIFF 模式不支持多分辨率输出")
+        if args.archive:
+            archive_format(args.archive)
+            if args.multipage:
+                raise ValueError("多页 TIFF 模式不支持写入归档")
+        auto_crop = AutoCrop(args.auto_crop or "raster", threshold=args.auto_crop_threshold,
+                             padding=args.auto_crop_padding)
+        crop = auto_crop if args.auto_crop else make_crop(args.crop, args.crop_unit)
+    except ValueError as e:
+        parser.error(str(e))
+
+    if args.suggest_crop:
+        paths = collect_pdfs(args.pdf, recursive=args.recursive)
+        # --crop-unit pt 时按 72 DPI 检测，1 像素即 1 点，结果可用于任意 DPI
+        points = args.crop_unit == "pt"
+        for path in paths:
+            margins = suggest_crop(path, 72 if points else args.dpi, auto_crop)
+            unit = " --crop-unit pt" if points else ""
+            print(f"{path}: --crop {' '.join(str(v) for v in margins)}{unit}")
+        return 0 if paths else 2
+
+    def on_progress(doc_result, page_result, overall_done, overall_total):
+        if not page_result.ok:
+            print(f"{doc_result.pdf_path} 第 {page_result.page_index + 1} 页失败"
+                  f"（{page_result.error_stage or '未知阶段'}）: {page_result.error}",
+                  file=sys.stderr)
+        if not args.quiet:
+            print(f"\r正在处理第 {overall_done}/{overall_total} 页...", end="", file=sys.stderr, flush=True)
+
+    def on_document_done(doc_result):
+        if doc_result.error:
+            print(f"\n无法转换 {doc_result.pdf_path}: {doc_result.error}", file=sys.stderr)
+
+    try:
+        batch = convert_batch(args.pdf, args.output, dpi=args.dpi, crop=crop,
+                              max_workers=args.workers, chunk_size=args.chunk_size, encoder=encoder,
+                              render_options=RenderOptions(memory_budget=args.memory_budget * 1024 * 1024,
+                                                           profile_dir=args.profile,
+                                                           profile_threshold=args.profile_threshold,
+                                                           async_write=not args.sync_write, fsync=args.fsync,
+                                                           extract_images=args.extract_images,
+                                                           colorspace=args.render_colorspace, alpha=args.alpha,
+                                                           antialias=args.antialias,
+                                                           annotations=not args.no_annots),
+                              resume=not args.force, pages=args.pages, page_rules=page_rules,
+                              extra_dpis=args.extra_dpi, archive=args.archive,
+                              recursive=args.recursive, on_progress=on_progress,
+                              on_document_done=on_document_done)
+    except KeyboardInterrupt:
+        return 130
+    except ValueError as e:
+        # 输出目录冲突（见 check_output_conflicts）
+        parser.error(str(e))
+    except OSError as e:
+        # 归档无法完成（如磁盘已满）
+        print(f"\n写入失败: {e}", file=sys.stderr)
+        return 1
+    if not args.quiet:
+        print(file=sys.stderr)
+
+    if not batch.documents:
+        print("未找到 PDF 文件", file=sys.stderr)
+        return 2
+    if args.json:
+        data = batch.documents[0].to_dict() if len(batch.documents) == 1 else batch.to_dict()
+        data["report"] = batch.report()
+        print(json.dumps(data, ensure_ascii=False, indent=2))
+    else:
+        for result in batch.documents:
+            if result.error:
+                print(f"失败 {result.pdf_path}: {result.error}")
+                continue
+            skipped = f"（{result.skipped} 页未变化已跳过）" if result.skipped else ""
+            first = f"，首页 {result.time_to_first_page:.2f}s" if result.time_to_first_page is not None else ""
+            print(f"完成 {result.completed}/{result.total_pages} 页{skipped}，用时 {result.elapsed:.2f}s{first} "
+                  f"({result.pages_per_sec:.1f} 页/秒) -> {result.merged_output or result.output_dir}")
+        if len(batch.documents) > 1:
+            print(f"共 {len(batch.documents)} 个文件，{batch.completed}/{batch.total_pages} 页，"
+                  f"用时 {batch.elapsed:.2f}s ({batch.pages_per_sec:.1f} 页/秒)")
+        if args.report:
+            print(format_report(batch.report()))
+    return 0 if not batch.failed_documents else 1
+
+
+if __name__ == "__main__":
+    # 多进程打包必须调用 freeze_support
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -0,0 +1,100 @@
+"""
+扫描页的原图直接提取
+
+扫描仪输出的 PDF 通常每页只有一张铺满页面的图像（JPEG / JBIG2 / CCITT 等）。
+这类页面不必再经 get_pixmap 光栅化：直接解码页面引用的图像，按原始分辨率输出，
+像素与扫描结果一致，也省去了整页渲染与缩放；JPEG 在不裁剪且输出也是 JPEG 时原样写出字节流，不重新编码。
+
+只有确认页面渲染结果就是这张图像本身时才提取（见 find_page_image），
+含文字、矢量、注释、多张图像、透明蒙版、旋转或非整页放置的页面一律交回正常渲染。
+不可见文字（OCR 文字层）不影响渲染结果，不妨碍提取。
+"""
+from dataclasses import dataclass
+
+import fitz  # PyMuPDF
+
+# 图像边界与页面边界允许的误差（点）
+PAGE_TOLERANCE = 1.0
+# 横纵分辨率允许的相对差异，超过时像素不是正方形，直接输出会变形
+ASPECT_TOLERANCE = 0.01
+
+
+@dataclass
+class PageImage:
+    """页面中可直接提取的图像"""
+    xref: int
+    width: int   # 图像像素尺寸
+    height: int
+    zoom: float  # 图像原始分辨率对应的缩放比例（像素 / 点）
+
+
+def find_page_image(page):
+    """
+    页面可见内容恰为一张铺满页面、正向放置的不透明图像时返回 PageImage，否则返回 None
+    带注释或表单控件的页面不提取（get_bboxlog 中注释与页面内容无法区分）
+    """
+    if page.rotation or page.annot_xrefs():
+        return None
+    images = page.get_images(full=True)
+    if len(images) != 1:
+        return None
+    xref, smask = images[0][0], images[0][1]
+    if smask or page.parent.xref_get_key(xref, "ImageMask")[1] == "true":
+        return None
+
+    # 可见的绘制只有这一张图像（裁剪路径与不可见文字不影响结果）
+    kinds = [kind for kind, _ in page.get_bboxlog() if kind.startswith(("fill-", "stroke-"))]
+    if kinds != ["fill-image"]:
+        return None
+
+    infos = page.get_image_info(xrefs=True)
+    if len(infos) != 1 or infos[0]["xref"] != xref:
+        return None
+    info = infos[0]
+    a, b, c, d = info["transform"][:4]
+    if b or c or a <= 0 or d <= 0:
+        return None  # 旋转、镜像或倾斜放置
+    bbox, rect = fitz.Rect(info["bbox"]), page.rect
+    if any(abs(u - v) > PAGE_TOLERANCE for u, v in zip(bbox, rect)):
+        return None
+
+    width, height = info["width"], info["height"]
+    zoom_x, zoom_y = width / rect.width, height / rect.height
+    if abs(zoom_x - zoom_y) > ASPECT_TOLERANCE * zoom_x:
+        return None
+    return PageImage(xref, width, height, zoom_x)
+
+
+def passthrough_bytes(doc, image, color):
+    """
+    不裁剪、输出 JPEG 时可原样写出的图像字节流；需要重新编码时返回 None
+
+    只接受不带 /Decode 的 JPEG，且通道数与输出色彩模式一致（rgb 接受 RGB 与灰度，gray 只接受灰度）。
+    """
+    if doc.xref_get_key(image.xref, "Decode")[0] != "null":
+        return None
+    info = doc.extract_image(image.xref)
+    if not info or info["ext"] != "jpeg":
+        return None
+    allowed = {"rgb": (1, 3), "gray": (1,)}.get(color, ())
+    if info["colorspace"] not in allowed:
+        return None
+    return info["image"]
+
+
+def load_page_image(doc, image):
+    """
+    解码图像为 PIL Image（L 或 RGB），CMYK 转为 RGB；无法直接表示时返回 None 交回正常渲染
+    """
+    from PIL import Image
+
+    pix = fitz.Pixmap(doc, image.xref)
+    if pix.alpha or pix.colorspace is None:
+        return None
+    if pix.n == 4:
+        pix = fitz.Pixmap(fitz.csRGB, pix)
+    if pix.n not in (1, 3):
+        return None
+    mode = "L" if pix.n == 1 else "RGB"
+    # 复制像素，不再引用 Pixmap
+    return Image.frombytes(mode, (pix.width, pix.height), pix.samples)
@@ -0,0 +1,1117 @@
+"""
+图形界面（由 pdf_to_img.py 启动）
+
+启动时只导入 customtkinter 与标准库模块，窗口尽快显示；PyMuPDF、Pillow 与转换引擎
+在窗口显示后由后台线程导入并预热进程池（见 warm_up），windnd 与预览组件也在用到时才导入。
+因此用到引擎的方法在函数内导入。
+"""
+import customtkinter as ctk
+from tkinter import filedialog, messagebox, Canvas
+import os
+import threading
+import sys
+import tempfile
+from collections import Counter
+from pdf_pages import check_page_ranges, parse_page_rules
+from pdf_crop import CropMargins
+
+def resource_path(relative_path):
+    """ Get absolute path to resource, works for dev and for PyInstaller """
+    try:
+        # PyInstaller creates a temp folder and stores path in _MEIPASS
+        base_path = sys._MEIPASS
+    except Exception:
+        base_path = os.path.abspath(".")
+    return os.path.join(base_path, relative_path)
+
+# 设置外观
+ctk.set_appearance_mode("System")  # 模式: "System" (standard), "Dark", "Light"
+ctk.set_default_color_theme("blue")  # 主题: "blue" (standard), "green", "dark-blue"
+
+class PDFToImageConverter(ctk.CTk):
+    INPUT_SEPARATOR = "; "  # 输入框中多个路径之间的分隔符
+    PREVIEW_PREFETCH = 2    # 预览时预取当前页前后的页数
+    WARM_UP_DELAY_MS = 300  # 窗口显示后多久开始在后台预热进程池
+
+    def __init__(self):
+        super().__init__()
+
+        self.title("PDF 转图片工具 (v1.5.11稳定版)")
+        self.geometry("700x670")
+
+        # 设置窗口图标
+        try:
+            icon_path = resource_path("app.ico")
+            if os.path.exists(icon_path):
+                self.after(200, lambda: self.iconbitmap(icon_path))
+        except Exception:
+            pass
+
+        # 变量
+        self.pdf_path = ctk.StringVar()  # 单个 PDF、目录，或以 "; " 分隔的多个路径
+        self.output_dir = ctk.StringVar()
+        self.quality_var = ctk.StringVar(value="普通 (150 DPI)")
+        self.is_converting = False
+        self.stop_requested = False
+        self.closing = False
+        
+        self.quality_map = {
+            "普通 (150 DPI)": 150,
+            "高清 (300 DPI)": 300,
+            "超清 (600 DPI)": 600,
+            "原稿 (72 DPI)": 72
+        }
+        self.format_var = ctk.StringVar(value="PNG (无损)")
+        self.format_map = {
+            # EncoderSettings 的参数（引擎在后台导入，转换时再构造）
+            "PNG (无损)": dict(format="png"),
+            "PNG (快速压缩)": dict(format="png", compress_level=1),
+            "JPEG (高质量)": dict(format="jpeg", quality=95),
+            "JPEG (标准)": dict(format="jpeg", quality=85),
+            "WebP (有损)": dict(format="webp", quality=85),
+            "WebP (无损)": dict(format="webp", lossless=True),
+            "TIFF (单页)": dict(format="tiff"),
+            "TIFF (多页合并)": dict(format="tiff", multipage=True)
+        }
+        self.color_var = ctk.StringVar(value="彩色")
+        self.color_map = {
+            "彩色": "rgb",
+            "灰度": "gray",
+            "黑白 (文字扫描)": "mono"
+        }
+        # 裁剪边距以点（1/72 英寸）为单位，与预览和导出的 DPI 无关
+        self.crop_left = ctk.StringVar(value="0")
+        self.crop_top = ctk.StringVar(value="0")
+        self.crop_right = ctk.StringVar(value="0")
+        self.crop_bottom = ctk.StringVar(value="0")
+        self.crop_vars = (self.crop_left, self.crop_top, self.crop_right, self.crop_bottom)
+        # 裁剪边距的数值模型 (左, 上, 右, 下)；输入框只是它的显示，拖拽时直接修改数值
+        self.crop_values = (0.0, 0.0, 0.0, 0.0)
+        self.crop_input_error = None    # 输入框中无效内容的提示，有效时为 None
+        self._crop_vars_dirty = False   # 数值已变化、输入框尚未同步
+        self._syncing_crop_vars = False # 正在把数值写回输入框（忽略由此触发的变量追踪）
+        self._overlay_job = None        # 已安排的裁剪框重绘
+        self.auto_crop_var = ctk.BooleanVar(value=False)  # 逐页自动检测内容区域裁剪
+        self.extract_images_var = ctk.BooleanVar(value=False)  # 扫描页直接提取原图
+        self.preview_page = ctk.StringVar(value="1")
+        self.preview_window_obj = None  # 记录预览窗口对象
+        self.preview_canvas = None      # 预览画布
+        self.preview_rect_id = None     # 画布上的裁剪框ID
+        self.shade_ids = []             # 阴影遮罩ID列表
+        # 预览渲染缓存与后台渲染线程，第一次预览时创建（见 ensure_preview_renderer）
+        self.preview_cache = None
+        self.preview_renderer = None
+        self.preview_target = None      # 正在预览的 (PDF 路径, 页码)
+        self.preview_page_size = (0, 0) # 预览页的宽、高（点）
+        self.preview_page_px = (0, 0)   # 预览页在当前缩放下的像素尺寸
+        self.preview_zoom = 1.0         # 画布上每点对应的像素数（即渲染缩放比例）
+        self.preview_zoom_factor = 1.0  # 相对“适合窗口”的放大倍数，1 为整页显示
+        self.view_origin = (0, 0)       # 视口左上角在缩放后页面像素坐标中的位置
+        self.view_size = (0, 0)         # 视口（画布中页面区域）的像素尺寸
+        self.tile_items = {}            # (缩放比例, 图块) -> (画布图片ID, PhotoImage)
+        self.missing_tiles = set()      # 已请求、尚未显示的图块
+        self.pan_start = None           # 平移起始的 (鼠标坐标, 视口位置)
+        self._resize_job = None
+        self.is_dragging = False        # 是否正在拖拽裁剪框
+        self.drag_edge = None           # 正在拖拽哪个边缘
+        self.drag_start_pos = (0, 0)    # 拖拽起始坐标
+        self.initial_crops = (0, 0, 0, 0) # 拖拽起始裁剪值
+        self.canvas_offset = 5          # 画布边缘留白，防止线条被切断
+        
+        # 预览窗口预留空间常量 (必须与布局组件占用的空间一致)
+        # 包含：主容器边距、Canvas 边距、导航栏高度、画布 Offset
+        self.PREVIEW_PAD_X = 120 
+        self.PREVIEW_PAD_Y = 200
+        self.PREVIEW_ZOOM_STEP = 1.25   # 滚轮每格的缩放倍数
+        self.OVERLAY_FRAME_MS = 16      # 裁剪框重绘间隔：同一帧内的多次修改合并为一次重绘
+        
+        # 绑定变量追踪，实现实时更新
+        for var in self.crop_vars:
+            var.trace_add("write", self.on_crop_var_change)
+
+        # 长期复用的进程池：多次转换、批量转换共享同一批子进程（见 get_worker_pool）
+        self.worker_pool = None
+        self._pool_lock = threading.Lock()
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+
+        self.setup_ui()
+        
+        # 注册拖拽事件 (增加异常保护)
+        try:
+            import windnd
+            windnd.hook_dropfiles(self, self.on_file_drop)
+        except Exception as e:
+            print(f"拖拽功能注册失败: {e}")
+
+        # 窗口显示后在后台导入引擎并启动子进程，第一次转换时无需再等待
+        self.after(self.WARM_UP_DELAY_MS, lambda: threading.Thread(target=self.warm_up, daemon=True).start())
+
+    def get_worker_pool(self):
+        with self._pool_lock:
+            if self.worker_pool is None:
+                from pdf_engine import WorkerPool
+                self.worker_pool = WorkerPool()
+            return self.worker_pool
+
+    def warm_up(self):
+        """后台线程：导入 PyMuPDF / Pillow 与转换引擎，并启动、初始化进程池的全部子进程"""
+        if self.closing:
+            return
+        pool = self.get_worker_pool()
+        if not self.closing:
+            pool.warm_up()
+
+    def ensure_preview_renderer(self):
+        """创建预览缓存（内存 LRU + 临时目录中的磁盘层）与后台渲染线程"""
+        if self.preview_renderer is None:
+            from pdf_preview import PreviewCache, PreviewRenderer
+
+            self.preview_cache = PreviewCache(
+                disk_dir=os.path.join(tempfile.gettempdir(), "pdf2image_preview_cache"))
+            # 只渲染视口内的图块，翻页、缩放不阻塞界面，并预取前后各 PREVIEW_PREFETCH 页
+            self.preview_renderer = PreviewRenderer(self.preview_cache, prefetch=self.PREVIEW_PREFETCH)
+
+    def on_file_drop(self, files):
+        """
+        拖拽回调函数：仅负责接收数据，立即交由主线程处理
+        避免在系统钩子线程中直接操作 UI 导致闪退
+        """
+        self.after(10, lambda: self._process_dropped_files(files))
+
+    def _process_dropped_files(self, files):
+        try:
+            if not files:
+                return
+            
+            valid_paths = []
+            for raw_path in files:
+                # 健壮的解码逻辑
+                if isinstance(raw_path, bytes):
+                    try:
+                        file_path = raw_path.decode('utf-8')
+                    except UnicodeDecodeError:
+                        try:
+                            file_path = raw_path.decode('gbk')
+                        except UnicodeDecodeError:
+                            file_path = raw_path.decode('gbk', errors='ignore')
+                else:
+                    file_path = raw_path
+
+                # 标准化路径
+                file_path = os.path.normpath(file_path.strip())
+                if os.path.isdir(file_path) or (os.path.isfile(file_path) and file_path.lower().endswith('.pdf')):
+                    valid_paths.append(file_path)
+
+            from pdf_engine import collect_pdfs
+
+            pdfs = collect_pdfs(valid_paths)
+            if pdfs:
+                self.set_input_paths(valid_paths)
+                if len(pdfs) == 1:
+                    self.status_label.configure(text=f"已加载: {os.path.basename(pdfs[0])}")
+                else:
+                    self.status_label.configure(text=f"已加载 {len(pdfs)} 个 PDF 文件（批量转换）")
+            else:
+                messagebox.showwarning("格式错误", "请拖拽有效的 PDF 文件或包含 PDF 的文件夹！")
+        except Exception as e:
+            messagebox.showerror("拖拽失败", f"处理拖拽文件时出错: {str(e)}")
+
+    def set_input_paths(self, paths):
+        """设置输入（文件或目录，可多个），并在未指定保存路径时默认使用第一个输入所在目录"""
+        self.pdf_path.set(self.INPUT_SEPARATOR.join(paths))
+        if not self.output_dir.get():
+            first = paths[0]
+            self.output_dir.set(first if os.path.isdir(first) else os.path.dirname(first))
+
+    def get_input_sources(self):
+        """
+        将输入框内容展开为 [(PDF 路径, 相对输出目录)]
+        目录内的 PDF 保留子目录结构（同 convert_batch）；仍有同名 PDF 时，改放到以其所在文件夹命名的子目录中，避免输出互相覆盖
+        """
+        from pdf_engine import collect_pdf_sources
+
+        paths = [p.strip() for p in self.pdf_path.get().split(self.INPUT_SEPARATOR.strip()) if p.strip()]
+        sources = collect_pdf_sources(paths)
+
+        def output_name(pdf, relative):
+            return relative, os.path.splitext(os.path.basename(pdf))[0].lower()
+
+        counts = Counter(output_name(p, relative) for p, relative in sources)
+        result = []
+        for p, relative in sources:
+            if counts[output_name(p, relative)] > 1:
+                relative = os.path.join(relative, os.path.basename(os.path.dirname(os.path.abspath(p))))
+            result.append((p, relative))
+        return result
+
+    def get_input_pdfs(self):
+        """将输入框内容展开为 PDF 文件列表"""
+        return [p for p, _ in self.get_input_sources()]
+
+    def get_preview_pdf(self):
+        """预览使用输入中的第一个 PDF"""
+        pdfs = self.get_input_pdfs()
+        return pdfs[0] if pdfs else ""
+
+    def on_close(self):
+        self.closing = True
+        self.stop_requested = True
+        with self._pool_lock:
+            pool, self.worker_pool = self.worker_pool, None
+        if pool is not None:
+            pool.shutdown(wait=False)
+        if self.preview_renderer is not None:
+            self.preview_renderer.close()
+        self.destroy()
+
+    def setup_ui(self):
+        # 配置网格
+        self.grid_columnconfigure(0, weight=1)
+        
+        # 标题
+        self.label_title = ctk.CTkLabel(self, text="PDF 转图片工具 (支持拖拽)", font=ctk.CTkFont(size=24, weight="bold"))
+        self.label_title.grid(row=0, column=0, padx=20, pady=(20, 10))
+
+        # 拖拽提示
+        self.drop_label = ctk.CTkLabel(self, text="💡 提示：支持直接将 PDF 文件（可多选）或文件夹拖拽到此处", font=ctk.CTkFont(size=12), text_color="gray")
+        self.drop_label.grid(row=1, column=0, padx=20, pady=(0, 10))
+
+        # 文件选择区域
+        file_frame = ctk.CTkFrame(self)
+        file_frame.grid(row=2, column=0, padx=20, pady=10, sticky="ew")
+        file_frame.grid_columnconfigure(1, weight=1)
+
+        ctk.CTkLabel(file_frame, text="PDF 文件:").grid(row=0, column=0, padx=10, pady=10)
+        self.entry_pdf = ctk.CTkEntry(file_frame, textvariable=self.pdf_path)
+        self.entry_pdf.grid(row=0, column=1, padx=10, pady=10, sticky="ew")
+        ctk.CTkButton(file_frame, text="选择文件", width=100, command=self.browse_pdf).grid(row=0, column=2, padx=10, pady=10)
+
+        ctk.CTkLabel(file_frame, text="保存路径:").grid(row=1, column=0, padx=10, pady=10)
+        self.entry_out = ctk.CTkEntry(file_frame, textvariable=self.output_dir)
+        self.entry_out.grid(row=1, column=1, padx=10, pady=10, sticky="ew")
+        ctk.CTkButton(file_frame, text="选择目录", width=100, command=self.browse_output).grid(row=1, column=2, padx=10, pady=10)
+
+        # 设置区域
+        settings_frame = ctk.CTkFrame(self)
+        settings_frame.grid(row=3, column=0, padx=20, pady=10, sticky="ew")
+        settings_frame.grid_columnconfigure((1, 3), weight=1)
+
+        ctk.CTkLabel(settings_frame, text="图片清晰度:", font=ctk.CTkFont(weight="bold")).grid(row=0, column=0, padx=10, pady=10)
+        self.quality_combo = ctk.CTkComboBox(settings_frame, values=list(self.quality_map.keys()), variable=self.quality_var, width=200)
+        self.quality_combo.grid(row=0, column=1, padx=10, pady=10, sticky="w")
+
+        ctk.CTkLabel(settings_frame, text="输出格式:", font=ctk.CTkFont(weight="bold")).grid(row=0, column=2, padx=10, pady=10)
+        self.format_combo = ctk.CTkComboBox(settings_frame, values=list(self.format_map.keys()), variable=self.format_var, width=160)
+        self.format_combo.grid(row=0, column=3, padx=10, pady=10, sticky="w")
+
+        ctk.CTkLabel(settings_frame, text="色彩模式:", font=ctk.CTkFont(weight="bold")).grid(row=1, column=0, padx=10, pady=(0, 10))
+        self.color_combo = ctk.CTkComboBox(settings_frame, values=list(self.color_map.keys()), variable=self.color_var, width=200)
+        self.color_combo.grid(row=1, column=1, padx=10, pady=(0, 10), sticky="w")
+
+        ctk.CTkLabel(settings_frame, text="页码范围:", font=ctk.CTkFont(weight="bold")).grid(row=1, column=2, padx=10, pady=(0, 10))
+        # 页码范围与按页覆盖规则（不绑定变量，以便显示占位提示；为空时 get() 返回空字符串）
+        self.page_range_entry = ctk.CTkEntry(settings_frame, width=160, placeholder_text="全部，如 1-10,25,40-")
+        self.page_range_entry.grid(row=1, column=3, padx=10, pady=(0, 10), sticky="w")
+
+        ctk.CTkLabel(settings_frame, text="单独设置:", font=ctk.CTkFont(weight="bold")).grid(row=2, column=0, padx=10, pady=(0, 10))
+        self.page_rules_entry = ctk.CTkEntry(
+            settings_frame, placeholder_text="可选，如 1-3:dpi=600; 5:format=jpeg,quality=80; 10-:crop=0/24/0/24pt")
+        self.page_rules_entry.grid(row=2, column=1, columnspan=3, padx=10, pady=(0, 10), sticky="ew")
+
+        ctk.CTkCheckBox(settings_frame, text="扫描页直接提取原图（按扫描分辨率输出，不重新渲染）",
+                        variable=self.extract_images_var).grid(row=3, column=1, columnspan=3, padx=10, pady=(0, 10),
+                                                               sticky="w")
+
+        # 裁剪区域
+        crop_frame = ctk.CTkFrame(self)
+        crop_frame.grid(row=4, column=0, padx=20, pady=10, sticky="ew")
+        for i in range(4): crop_frame.grid_columnconfigure(i*2+1, weight=1)
+
+        ctk.CTkLabel(crop_frame, text="裁剪设置 (点, 1/72 英寸):", font=ctk.CTkFont(weight="bold")).grid(row=0, column=0, columnspan=2, padx=10, pady=5, sticky="w")
+        self.detect_crop_btn = ctk.CTkButton(crop_frame, text="自动检测", width=90, command=self.detect_crop)
+        self.detect_crop_btn.grid(row=0, column=4, columnspan=2, padx=10, pady=5, sticky="e")
+        ctk.CTkCheckBox(crop_frame, text="逐页自动裁剪", variable=self.auto_crop_var).grid(
+            row=0, column=6, columnspan=2, padx=10, pady=5, sticky="w")
+        
+        # 封装一个带步进器的输入框
+        def create_stepper(label_text, var, row, col):
+            ctk.CTkLabel(crop_frame, text=label_text).grid(row=row, column=col, padx=(10, 2), pady=10)
+            f = ctk.CTkFrame(crop_frame, fg_color="transparent")
+            f.grid(row=row, column=col+1, padx=2, pady=10)
+            ctk.CTkButton(f, text="-", width=28, command=lambda: self.adjust_val(var, -10)).pack(side="left")
+            ctk.CTkEntry(f, textvariable=var, width=50).pack(side="left", padx=2)
+            ctk.CTkButton(f, text="+", width=28, command=lambda: self.adjust_val(var, 10)).pack(side="left")
+
+        create_stepper("左:", self.crop_left, 1, 0)
+        create_stepper("上:", self.crop_top, 1, 2)
+        create_stepper("右:", self.crop_right, 1, 4)
+        create_stepper("下:", self.crop_bottom, 1, 6)
+
+        # 预览控制
+        preview_ctrl_frame = ctk.CTkFrame(self)
+        preview_ctrl_frame.grid(row=5, column=0, padx=20, pady=5, sticky="ew")
+        
+        ctk.CTkLabel(preview_ctrl_frame, text="预览页码:").grid(row=0, column=0, padx=10, pady=10)
+        ctk.CTkEntry(preview_ctrl_frame, textvariable=self.preview_page, width=60).grid(row=0, column=1, padx=5, pady=10)
+        ctk.CTkButton(preview_ctrl_frame, text="交互式裁剪预览", width=140, command=self.show_preview).grid(row=0, column=2, padx=10, pady=10)
+
+        # 进度条
+        self.progress_bar = ctk.CTkProgressBar(self)
+        self.progress_bar.grid(row=6, column=0, padx=20, pady=10, sticky="ew")
+        self.progress_bar.set(0)
+
+        # 按钮和状态
+        button_frame = ctk.CTkFrame(self, fg_color="transparent")
+        button_frame.grid(row=7, column=0, padx=20, pady=10)
+
+        self.convert_btn = ctk.CTkButton(button_frame, text="开始转换", height=40, width=120, font=ctk.CTkFont(size=16, weight="bold"), command=self.start_conversion)
+        self.convert_btn.grid(row=0, column=0, padx=10)
+
+        self.stop_btn = ctk.CTkButton(button_frame, text="停止", height=40, width=100, fg_color="#E74C3C", hover_color="#C0392B", font=ctk.CTkFont(size=16, weight="bold"), command=self.request_stop, state="disabled")
+        self.stop_btn.grid(row=0, column=1, padx=10)
+
+        self.status_label = ctk.CTkLabel(self, text="准备就绪", font=ctk.CTkFont(size=12))
+        self.status_label.grid(row=8, column=0, padx=20, pady=(0, 20))
+
+    def browse_pdf(self):
+        filenames = filedialog.askopenfilenames(filetypes=[("PDF files", "*.pdf")])
+        if filenames:
+            self.set_input_paths([os.path.normpath(f) for f in filenames])
+
+    def browse_output(self):
+        directory = filedialog.askdirectory()
+        if directory:
+            self.output_dir.set(directory)
+
+    def adjust_val(self, var, delta):
+        try:
+            val = float(var.get() or 0)
+            new_val = max(0, int(round(val + delta)))
+            var.set(str(new_val))
+        except ValueError:
+            var.set("0")
+
+    def on_crop_var_change(self, *args):
+        """输入框内容变化时更新数值模型并安排重绘；内容无效时保留上一次的有效数值"""
+        if self._syncing_crop_vars:
+            return
+        try:
+            values = tuple(float(var.get() or 0) for var in self.crop_vars)
+        except ValueError:
+            self.crop_input_error = "请输入有效的裁剪数值！"
+            return
+        self.crop_input_error = None
+        self.crop_values = values
+        self.schedule_overlay_redraw()
+
+    def set_crop_values(self, values):
+        """直接修改裁剪数值（拖拽、自动检测），输入框与裁剪框在下一帧统一更新"""
+        self.crop_values = tuple(float(v) for v in values)
+        self.crop_input_error = None
+        self._crop_vars_dirty = True
+        self.schedule_overlay_redraw()
+
+    def schedule_overlay_redraw(self):
+        """每帧最多重绘一次：一次拖拽事件修改多个边距，或一帧内收到多次事件时只更新一次"""
+        if self._overlay_job is None:
+            self._overlay_job = self.after(self.OVERLAY_FRAME_MS, self.redraw_overlay)
+
+    def redraw_overlay(self):
+        self._overlay_job = None
+        if self._crop_vars_dirty:
+            self._crop_vars_dirty = False
+            self._syncing_crop_vars = True
+            try:
+                for var, value in zip(self.crop_vars, self.crop_values):
+                    text = f"{value:g}"
+                    if var.get() != text:
+                        var.set(text)
+            finally:
+                self._syncing_crop_vars = False
+        if self.preview_window_obj and self.preview_window_obj.winfo_exists():
+            self.update_preview_rect()
+
+    def detect_crop(self):
+        """后台检测整份文档的内容区域，把统一的裁剪建议填入裁剪设置"""
+        pdf_path = self.get_preview_pdf()
+        if not pdf_path:
+            messagebox.showwarning("警告", "请先选择 PDF 文件！")
+            return
+        self.detect_crop_btn.configure(state="disabled")
+        self.status_label.configure(text="正在检测内容区域...")
+
+        def work():
+            from pdf_autocrop import AutoCrop, suggest_crop
+
+            try:
+                # 按 72 DPI 检测，1 像素即 1 点
+                margins, error = suggest_crop(pdf_path, 72, AutoCrop()), None
+            except Exception as e:
+                margins, error = None, e
+            self.after(0, lambda: self.apply_detected_crop(margins, error))
+
+        threading.Thread(target=work, daemon=True).start()
+
+    def apply_detected_crop(self, margins, error):
+        self.detect_crop_btn.configure(state="normal")
+        if error is not None:
+            self.status_label.configure(text="准备就绪")
+            messagebox.showerror("错误", f"检测失败: {str(error)}")
+            return
+        self.set_crop_values(margins)
+        self.status_label.configure(text=f"已填入检测到的裁剪: 左 {margins[0]} 上 {margins[1]} 右 {margins[2]} 下 {margins[3]}")
+
+    def get_crop_values(self):
+        """裁剪设置的 (左, 上, 右, 下)，单位为点；输入框内容无效时抛出 ValueError"""
+        if self.crop_input_error:
+            raise ValueError(self.crop_input_error)
+        return self.crop_values
+
+    def preview_geometry(self):
+        """预览页的宽、高（点）以及画布上每点对应的像素数"""
+        page_w, page_h = self.preview_page_size
+        return page_w, page_h, self.preview_zoom
+
+    def request_stop(self):
+        if self.is_converting:
+            self.stop_requested = True
+            self.status_label.configure(text="正在停止...")
+            self.stop_btn.configure(state="disabled")
+
+    def show_preview(self):
+        pdf_path = self.get_preview_pdf()
+        if not pdf_path:
+            messagebox.showwarning("警告", "请先选择 PDF 文件！")
+            return
+        
+        try:
+            page_num = int(self.preview_page.get()) - 1
+        except ValueError:
+            messagebox.showerror("错误", "请输入有效的页码！")
+            return
+
+        try:
+            from pdf_engine import get_document_session
+
+            session = get_document_session(pdf_path)
+            total = session.page_count
+            if page_num < 0 or page_num >= total:
+                messagebox.showerror("错误", f"页码超出范围 (1-{total})")
+                return
+            
+            # 翻页时回到整页显示；画布按显示尺寸直接渲染，不再缩放位图
+            self.ensure_preview_renderer()
+            self.preview_target = (pdf_path, page_num)
+            self.preview_page_size = session.page_size(page_num)
+            self.preview_zoom_factor = 1.0
+            self.view_origin = (0, 0)
+            self.open_preview_window()
+        except Exception as e:
+            messagebox.showerror("错误", f"预览生成失败: {str(e)}")
+
+    def preview_available_size(self):
+        """预览窗口中可用于显示页面的空间（像素）"""
+        if self.preview_window_obj and self.preview_window_obj.winfo_exists():
+            current_win_w = self.preview_window_obj.winfo_width()
+            current_win_h = self.preview_window_obj.winfo_height()
+            if current_win_w > 200 and current_win_h > 200:
+                return max(100, current_win_w - self.PREVIEW_PAD_X), max(100, current_win_h - self.PREVIEW_PAD_Y)
+        return (self.winfo_screenwidth() * 0.85 - self.PREVIEW_PAD_X,
+                self.winfo_screenheight() * 0.8 - self.PREVIEW_PAD_Y)
+
+    def fit_zoom(self, available_w, available_h):
+        page_w, page_h = self.preview_page_size
+        return min(available_w / page_w, available_h / page_h)
+
+    def open_preview_window(self):
+        if self.preview_window_obj and self.preview_window_obj.winfo_exists():
+            self.preview_window_obj.lift()
+            self.layout_preview()
+            return
+
+        # 1. 按屏幕可用空间决定初始缩放与窗口尺寸
+        screen_w = self.winfo_screenwidth()
+        screen_h = self.winfo_screenheight()
+        from pdf_preview import page_pixel_size
+
+        zoom = self.fit_zoom(*self.preview_available_size())
+        display_w, display_h = page_pixel_size(*self.preview_page_size, zoom)
+
+        self.preview_window_obj = ctk.CTkToplevel(self)
+        self.preview_window_obj.title("裁剪区域预览 (拖拽边框或四个角调整，滚轮缩放，右键拖动平移)")
+        self.preview_window_obj.attributes("-topmost", True)
+        
+        # 重置缩放状态变量，防止二次打开时受旧数据干扰
+        self._last_resize_size = None
+        self.tile_items = {}
+        self.missing_tiles = set()
+        
+        # 设置初始窗口几何尺寸并居中
+        win_w = display_w + self.PREVIEW_PAD_X
+        win_h = display_h + self.PREVIEW_PAD_Y
+        x = (screen_w - win_w) // 2
+        y = (screen_h - win_h) // 2
+        self.preview_window_obj.geometry(f"{win_w}x{win_h}+{x}+{y}")
+        
+        # 绑定 Resize 事件
+        self.preview_window_obj.bind("<Configure>", self.on_preview_resize)
+        
+        # 绑定关闭事件，清理状态
+        self.preview_window_obj.protocol("WM_DELETE_WINDOW", self.close_preview_window)
+        
+        # 主容器
+        main_container = ctk.CTkFrame(self.preview_window_obj)
+        main_container.pack(fill="both", expand=True, padx=10, pady=10)
+        
+        # 顶部工具栏 (翻页、缩放和信息)
+        nav_frame = ctk.CTkFrame(main_container, fg_color="transparent")
+        nav_frame.pack(fill="x", pady=(0, 5))
+        
+        ctk.CTkButton(nav_frame, text="上一页", width=80, command=self.prev_preview_page).pack(side="left", padx=5)
+        ctk.CTkButton(nav_frame, text="适合窗口", width=80, command=self.reset_preview_zoom).pack(side="left", padx=5)
+        self.page_info_label = ctk.CTkLabel(nav_frame, text="", font=ctk.CTkFont(weight="bold"))
+        self.page_info_label.pack(side="left", expand=True)
+        ctk.CTkButton(nav_frame, text="下一页", width=80, command=self.next_preview_page).pack(side="right", padx=5)
+        
+        # 画布容器 (居中)
+        canvas_container = ctk.CTkFrame(main_container, fg_color="transparent")
+        canvas_container.pack(fill="both", expand=True)
+        
+        self.preview_canvas = Canvas(
+            canvas_container, 
+            highlightthickness=0, 
+            bg="#2b2b2b",
+            width=display_w + self.canvas_offset * 2,
+            height=display_h + self.canvas_offset * 2
+        )
+        self.preview_canvas.place(relx=0.5, rely=0.5, anchor="center")
+        
+        # 创建阴影遮罩 (上, 下, 左, 右)；页面图块位于其下方，遮罩与裁剪框统一标记为 overlay
+        self.shade_ids = []
+        for _ in range(4):
+            sid = self.preview_canvas.create_rectangle(0, 0, 0, 0, fill="black", stipple="gray50", outline="",
+                                                       tags=("overlay",))
+            self.shade_ids.append(sid)
+        
+        # 裁剪框 (红色虚线，加粗)
+        self.preview_rect_id = self.preview_canvas.create_rectangle(
+            0, 0, 0, 0, 
+            outline="red", 
+            width=3, 
+            dash=(4, 4),
+            tags=("overlay",)
+        )
+        
+        # 底部尺寸信息
+        self.size_info_label = ctk.CTkLabel(main_container, text="裁剪尺寸: 0 x 0", text_color="gray")
+        self.size_info_label.pack(side="bottom", pady=5)
+        
+        # 确保裁剪框在阴影之上
+        self.preview_canvas.tag_raise(self.preview_rect_id)
+        
+        # 事件绑定：左键调整裁剪框，右键 / 中键拖动平移，滚轮缩放（Linux 下为 Button-4/5）
+        self.preview_canvas.bind("<Button-1>", self.on_canvas_click)
+        self.preview_canvas.bind("<B1-Motion>", self.on_canvas_drag)
+        self.preview_canvas.bind("<ButtonRelease-1>", self.on_canvas_release)
+        self.preview_canvas.bind("<Motion>", self.on_canvas_hover)
+        for button in (2, 3):
+            self.preview_canvas.bind(f"<Button-{button}>", self.on_pan_start)
+            self.preview_canvas.bind(f"<B{button}-Motion>", self.on_pan_drag)
+            self.preview_canvas.bind(f"<ButtonRelease-{button}>", self.on_pan_end)
+        self.preview_canvas.bind("<MouseWheel>", self.on_preview_wheel)
+        self.preview_canvas.bind("<Button-4>", self.on_preview_wheel)
+        self.preview_canvas.bind("<Button-5>", self.on_preview_wheel)
+        
+        self.layout_preview(zoom)
+        
+        # 强制更新一次布局，确保渲染完成
+        self.preview_window_obj.update_idletasks()
+        
+        # 二次确认同步：延迟一小段时间强制校准比例，解决部分系统下二次打开尺寸不准的问题
+        self.preview_window_obj.after(200, lambda: self.on_preview_resize(None, force=True))
+
+    def close_preview_window(self):
+        """关闭预览窗口并清理状态"""
+        if self.preview_window_obj:
+            self._last_resize_size = None
+            if self._resize_job is not None:
+                self.preview_window_obj.after_cancel(self._resize_job)
+                self._resize_job = None
+            self.preview_window_obj.destroy()
+            self.preview_window_obj = None
+            self.preview_canvas = None
+            self.tile_items = {}
+            self.missing_tiles = set()
+
+    def on_preview_resize(self, event, force=False):
+        """处理预览窗口缩放事件：合并连续的尺寸变化，停下后按新尺寸直接渲染"""
+        if event and event.widget != self.preview_window_obj:
+            return
+
+        if event:
+            new_size = (event.width, event.height)
+            # 增加保护：忽略窗口初始化时可能出现的极小尺寸事件
+            if new_size[0] < 200 or new_size[1] < 200:
+                return
+            if getattr(self, '_last_resize_size', None) == new_size:
+                return
+            self._last_resize_size = new_size
+        elif not (self.preview_window_obj and self.preview_window_obj.winfo_exists()):
+            return
+
+        if self._resize_job is not None:
+            self.preview_window_obj.after_cancel(self._resize_job)
+            self._resize_job = None
+        if force:
+            self.layout_preview()
+        else:
+            self._resize_job = self.preview_window_obj.after(100, self._apply_resize)
+
+    def _apply_resize(self):
+        self._resize_job = None
+        if self.preview_window_obj and self.preview_window_obj.winfo_exists():
+            self.layout_preview()
+
+    def layout_preview(self, fit=None, anchor=None):
+        """
+        按窗口可用空间与放大倍数确定缩放比例和视口，并请求视口内的图块
+        整页显示时画布与页面等大；放大后画布占满可用空间，只渲染其中可见的部分
+        缩放比例变化时，画布坐标 anchor（默认为视口左上角）处的页面内容保持不动
+        """
+        if not self.preview_canvas or self.preview_target is None:
+            return
+        from pdf_preview import MAX_PREVIEW_ZOOM, page_pixel_size
+
+        available_w, available_h = self.preview_available_size()
+        if fit is None:
+            fit = self.fit_zoom(available_w, available_h)
+        zoom = min(fit * self.preview_zoom_factor, MAX_PREVIEW_ZOOM)
+        self.preview_zoom_factor = max(1.0, zoom / fit)
+
+        ax, ay = (0, 0) if anchor is None else (anchor[0] - self.canvas_offset, anchor[1] - self.canvas_offset)
+        ratio = zoom / self.preview_zoom
+        self.view_origin = ((self.view_origin[0] + ax) * ratio - ax, (self.view_origin[1] + ay) * ratio - ay)
+        self.preview_zoom = zoom
+
+        page_px = self.preview_page_px = page_pixel_size(*self.preview_page_size, zoom)
+        view_w = min(page_px[0], int(available_w))
+        view_h = min(page_px[1], int(available_h))
+        self.view_size = (view_w, view_h)
+        self.preview_canvas.config(width=view_w + self.canvas_offset * 2, height=view_h + self.canvas_offset * 2)
+        self.set_view_origin(*self.view_origin, redraw=False)
+        self.refresh_preview_tiles()
+        self.update_page_label()
+        self.update_preview_rect()
+
+    def set_view_origin(self, x, y, redraw=True):
+        """移动视口（限制在页面范围内），已显示的图块随之平移，再补齐新露出的图块"""
+        page_px = self.preview_page_px
+        x = int(round(max(0, min(x, page_px[0] - self.view_size[0]))))
+        y = int(round(max(0, min(y, page_px[1] - self.view_size[1]))))
+        old_x, old_y = self.view_origin
+        self.view_origin = (x, y)
+        if redraw and (x, y) != (old_x, old_y):
+            self.preview_canvas.move("tile", old_x - x, old_y - y)
+            self.refresh_preview_tiles()
+            self.update_preview_rect()
+
+    def refresh_preview_tiles(self):
+        """显示视口内已缓存的图块，其余交给后台线程按离视口中心由近到远渲染"""
+        from pdf_preview import visible_tiles
+
+        pdf_path, page_num = self.preview_target
+        zoom = round(self.preview_zoom, 4)
+        page_px = self.preview_page_px
+        ox, oy = self.view_origin
+        needed = visible_tiles(page_px, (ox, oy, ox + self.view_size[0], oy + self.view_size[1]))
+        wanted = {(zoom, tile) for tile in needed}
+
+        # 移出视口或缩放比例已变化的图块直接删除（图块按屏幕尺寸渲染，补齐很快）
+        for key in list(self.tile_items):
+            if key not in wanted:
+                self.preview_canvas.delete(self.tile_items.pop(key)[0])
+
+        missing = []
+        for tile in needed:
+            if (zoom, tile) in self.tile_items:
+                continue
+            img = self.preview_cache.get(self.preview_cache.key(pdf_path, page_num, zoom, tile))
+            if img is not None:
+                self.draw_preview_tile(zoom, tile, img)
+            else:
+                missing.append(tile)
+        self.missing_tiles = {(zoom, tile) for tile in missing}
+
+        # 整页显示时写入磁盘缓存并预取前后页；放大查看的图块只放内存
+        whole_page = self.preview_zoom_factor <= 1.0
+        self.preview_renderer.request(
+            pdf_path, page_num, zoom, missing,
+            lambda p, tile, img, err, path=pdf_path: self.after(
+                0, lambda: self.apply_rendered_tile(path, p, zoom, tile, img, err)),
+            persist=whole_page, prefetch=whole_page)
+
+    def draw_preview_tile(self, zoom, tile, img):
+        from PIL import ImageTk
+        from pdf_preview import tile_box
+
+        left, top, _, _ = tile_box(tile, self.preview_page_px)
+        photo = ImageTk.PhotoImage(img)
+        item = self.preview_canvas.create_image(
+            left - self.view_origin[0] + self.canvas_offset, top - self.view_origin[1] + self.canvas_offset,
+            anchor="nw", image=photo, tags=("tile",))
+        self.tile_items[(zoom, tile)] = (item, photo)
+        self.preview_canvas.tag_raise("overlay")
+        self.preview_canvas.tag_raise(self.preview_rect_id)
+
+    def apply_rendered_tile(self, pdf_path, page_num, zoom, tile, img, error):
+        """在主线程中显示后台渲染完成的图块；用户已翻页、缩放或平移使其不再需要时丢弃"""
+        if not self.preview_canvas or self.preview_target != (pdf_path, page_num):
+            return
+        if (zoom, tile) not in self.missing_tiles:
+            return
+        if error is not None:
+            self.missing_tiles = set()
+            self.update_page_label()
+            messagebox.showerror("错误", f"预览生成失败: {str(error)}")
+            return
+        self.missing_tiles.discard((zoom, tile))
+        self.draw_preview_tile(zoom, tile, img)
+        if not self.missing_tiles:
+            self.update_page_label()
+
+    def zoom_preview(self, factor, x=None, y=None):
+        """以画布坐标 (x, y) 为中心缩放（默认为视口中心），该点下的页面内容保持不动"""
+        if not self.preview_canvas or self.preview_target is None:
+            return
+        if x is None:
+            x = self.canvas_offset + self.view_size[0] / 2
+            y = self.canvas_offset + self.view_size[1] / 2
+        self.preview_zoom_factor = max(1.0, self.preview_zoom_factor * factor)
+        self.layout_preview(anchor=(x, y))
+
+    def reset_preview_zoom(self):
+        self.preview_zoom_factor = 1.0
+        self.view_origin = (0, 0)
+        self.layout_preview()
+
+    def on_preview_wheel(self, event):
+        if event.num == 4 or getattr(event, "delta", 0) > 0:
+            factor = self.PREVIEW_ZOOM_STEP
+        else:
+            factor = 1 / self.PREVIEW_ZOOM_STEP
+        self.zoom_preview(factor, event.x, event.y)
+
+    def on_pan_start(self, event):
+        self.pan_start = ((event.x, event.y), self.view_origin)
+        self.preview_canvas.config(cursor="fleur")
+
+    def on_pan_drag(self, event):
+        if self.pan_start is None:
+            return
+        (x0, y0), (ox, oy) = self.pan_start
+        self.set_view_origin(ox - (event.x - x0), oy - (event.y - y0))
+
+    def on_pan_end(self, event):
+        self.pan_start = None
+        self.preview_canvas.config(cursor="")
+
+    def update_page_label(self):
+        if hasattr(self, 'page_info_label') and self.page_info_label.winfo_exists():
+            current = self.preview_page.get()
+            # 以等效 DPI 表示当前缩放
+            status = f"  ({self.preview_zoom * 72:.0f} DPI)"
+            if self.missing_tiles:
+                status += " 渲染中..."
+            try:
+                from pdf_engine import get_document_session
+
+                total = get_document_session(self.get_preview_pdf()).page_count
+                self.page_info_label.configure(text=f"第 {current} / {total} 页{status}")
+            except:
+                self.page_info_label.configure(text=f"第 {current} 页{status}")
+
+    def prev_preview_page(self):
+        try:
+            current = int(self.preview_page.get())
+            if current > 1:
+                self.preview_page.set(str(current - 1))
+                self.show_preview()
+        except ValueError:
+            pass
+
+    def next_preview_page(self):
+        try:
+            from pdf_engine import get_document_session
+
+            current = int(self.preview_page.get())
+            total = get_document_session(self.get_preview_pdf()).page_count
+            if current < total:
+                self.preview_page.set(str(current + 1))
+                self.show_preview()
+        except Exception:
+            pass
+
+    def crop_rect_on_canvas(self):
+        """裁剪框与整页在画布上的坐标：((左, 上, 右, 下), (页左, 页上, 页右, 页下))"""
+        page_w, page_h, scale = self.preview_geometry()
+        l_val, t_val, r_val, b_val = self.crop_values
+        ox = self.canvas_offset - self.view_origin[0]
+        oy = self.canvas_offset - self.view_origin[1]
+        rect = (int(round(l_val * scale)) + ox, int(round(t_val * scale)) + oy,
+                int(round((page_w - r_val) * scale)) + ox, int(round((page_h - b_val) * scale)) + oy)
+        page = (ox, oy, int(round(page_w * scale)) + ox, int(round(page_h * scale)) + oy)
+        return rect, page
+
+    def update_preview_rect(self):
+        if not self.preview_canvas or not self.preview_window_obj.winfo_exists():
+            return
+            
+        try:
+            page_w, page_h, _ = self.preview_geometry()
+            l_val, t_val, r_val, b_val = self.crop_values
+            (l, t, r, b), (pl, pt, pr, pb) = self.crop_rect_on_canvas()
+            
+            # 更新主裁剪框
+            self.preview_canvas.coords(self.preview_rect_id, l, t, r, b)
+            
+            # 更新阴影遮罩 (上, 下, 左, 右)
+            self.preview_canvas.coords(self.shade_ids[0], pl, pt, pr, t) # Top
+            self.preview_canvas.coords(self.shade_ids[1], pl, b, pr, pb) # Bottom
+            self.preview_canvas.coords(self.shade_ids[2], pl, t, l, b) # Left
+            self.preview_canvas.coords(self.shade_ids[3], r, t, pr, b) # Right
+            
+            # 确保裁剪框在阴影之上
+            self.preview_canvas.tag_raise(self.preview_rect_id)
+            
+            # 更新尺寸信息
+            cw = max(0, page_w - l_val - r_val)
+            ch = max(0, page_h - t_val - b_val)
+            dpi_val = self.quality_map.get(self.quality_var.get(), 150)
+            text = (f"裁剪尺寸: {cw:.0f} x {ch:.0f} 点，{dpi_val} DPI 下约 "
+                    f"{cw * dpi_val / 72:.0f} x {ch * dpi_val / 72:.0f} 像素 (宽x高)")
+            # 文字未变时不重新配置标签（CTkLabel 每次配置都会重新布局）
+            if hasattr(self, 'size_info_label') and self.size_info_label.cget("text") != text:
+                self.size_info_label.configure(text=text)
+        except Exception as e:
+            print(f"Update rect error: {e}")
+
+    def on_canvas_hover(self, event):
+        if self.is_dragging: return
+        
+        edge = self.get_edge_at(event.x, event.y)
+        cursor_map = {
+            "nw": "size_nw_se", "se": "size_nw_se",
+            "ne": "size_ne_sw", "sw": "size_ne_sw",
+            "left": "size_we", "right": "size_we",
+            "top": "size_ns", "bottom": "size_ns",
+            "move": "fleur"
+        }
+        if edge in cursor_map:
+            self.preview_canvas.config(cursor=cursor_map[edge])
+        else:
+            self.preview_canvas.config(cursor="")
+
+    def get_edge_at(self, x, y):
+        try:
+            (l, t, r, b), _ = self.crop_rect_on_canvas()
+            
+            margin = 20
+            # 优先检测角落
+            if abs(x - l) < margin and abs(y - t) < margin: return "nw"
+            if abs(x - r) < margin and abs(y - t) < margin: return "ne"
+            if abs(x - l) < margin and abs(y - b) < margin: return "sw"
+            if abs(x - r) < margin and abs(y - b) < margin: return "se"
+            
+            # 检测边缘
+            if abs(x - l) < margin and t < y < b: return "left"
+            if abs(x - r) < margin and t < y < b: return "right"
+            if abs(y - t) < margin and l < x < r: return "top"
+            if abs(y - b) < margin and l < x < r: return "bottom"
+            
+            # 检测中心移动
+            if l < x < r and t < y < b: return "move"
+        except Exception:
+            pass
+        return None
+
+    def on_canvas_click(self, event):
+        self.drag_edge = self.get_edge_at(event.x, event.y)
+        if self.drag_edge:
+            self.is_dragging = True
+            self.drag_start_pos = (event.x, event.y)
+            self.initial_crops = self.crop_values
+
+    def on_canvas_drag(self, event):
+        if not self.is_dragging or not self.drag_edge: return
+        
+        # 以点为单位计算，页面尺寸取整，使四个边距都保持为整数
+        page_w, page_h, scale = self.preview_geometry()
+        img_w, img_h = int(page_w), int(page_h)
+        dx = (event.x - self.drag_start_pos[0]) / scale
+        dy = (event.y - self.drag_start_pos[1]) / scale
+        
+        l, t, r, b = (int(round(v)) for v in self.initial_crops)
+        
+        if self.drag_edge == "move":
+            # 限制移动范围，保持宽高不变
+            curr_w = img_w - l - r
+            curr_h = img_h - t - b
+            
+            new_l = max(0, min(int(round(l + dx)), img_w - curr_w))
+            new_t = max(0, min(int(round(t + dy)), img_h - curr_h))
+            
+            self.set_crop_values((new_l, new_t, img_w - new_l - curr_w, img_h - new_t - curr_h))
+            return
+
+        # 边缘与角落拖拽：只修改拖动的边，其余保持原值；四个边距合并为一次更新
+        values = list(self.initial_crops)
+        min_size = 10
+        if "left" in self.drag_edge or "nw" in self.drag_edge or "sw" in self.drag_edge:
+            new_l = max(0, int(round(l + dx)))
+            # 确保不越过右边界 (保留最小宽度)
+            values[0] = min(new_l, img_w - r - min_size)
+            
+        if "right" in self.drag_edge or "ne" in self.drag_edge or "se" in self.drag_edge:
+            new_r = max(0, int(round(r - dx)))
+            # 确保不越过左边界 (保留最小宽度)
+            values[2] = min(new_r, img_w - l - min_size)
+            
+        if "top" in self.drag_edge or "nw" in self.drag_edge or "ne" in self.drag_edge:
+            new_t = max(0, int(round(t + dy)))
+            # 确保不越过下边界 (保留最小高度)
+            values[1] = min(new_t, img_h - b - min_size)
+            
+        if "bottom" in self.drag_edge or "sw" in self.drag_edge or "se" in self.drag_edge:
+            new_b = max(0, int(round(b - dy)))
+            # 确保不越过上边界 (保留最小高度)
+            values[3] = min(new_b, img_h - t - min_size)
+
+        self.set_crop_values(values)
+
+    def on_canvas_release(self, event):
+        self.is_dragging = False
+        self.drag_edge = None
+
+    def start_conversion(self):
+        if not self.get_input_pdfs():
+            messagebox.showwarning("警告", "请先选择 PDF 文件！")
+            return
+        
+        if not self.output_dir.get():
+            messagebox.showwarning("警告", "请选择保存路径！")
+            return
+        
+        self.is_converting = True
+        self.stop_requested = False
+        self.convert_btn.configure(state="disabled")
+        self.stop_btn.configure(state="normal")
+        self.status_label.configure(text="正在转换...")
+        threading.Thread(target=self.convert, daemon=True).start()
+
+    def convert(self):
+        from pdf_engine import ConversionJob, EncoderSettings, RenderOptions, run_jobs
+        from pdf_autocrop import AutoCrop
+
+        try:
+            sources = self.get_input_sources()
+            base_output_dir = self.output_dir.get()
+            
+            try:
+                dpi_val = self.quality_map.get(self.quality_var.get(), 150)
+                crop_params = CropMargins(*self.get_crop_values())
+            except ValueError:
+                self.after(0, lambda: messagebox.showerror("错误", "请输入有效的裁剪数值！"))
+                return
+            if self.auto_crop_var.get():
+                crop_params = AutoCrop()
+
+            encoder = EncoderSettings(**self.format_map.get(self.format_var.get(), {}),
+                                      color=self.color_map.get(self.color_var.get(), "rgb"))
+            page_range = self.page_range_entry.get().strip() or None
+            try:
+                check_page_ranges(page_range)
+                page_rules = parse_page_rules(self.page_rules_entry.get())
+                for rule in page_rules:
+                    rule.apply_encoder(encoder)
+            except ValueError as e:
+                self.after(0, lambda msg=str(e): messagebox.showerror("错误", f"页码设置无效：{msg}"))
+                return
+
+            # 按每页实际的输出色彩模式（含单独设置中的 color）选择，灰度 / 黑白页面直接渲染灰度 Pixmap
+            render_options = RenderOptions(extract_images=self.extract_images_var.get(), colorspace="auto")
+            jobs = [ConversionJob(p, os.path.normpath(os.path.join(base_output_dir, relative)), dpi=dpi_val,
+                                  crop=crop_params, encoder=encoder, render_options=render_options,
+                                  pages=page_range, page_rules=page_rules)
+                    for p, relative in sources]
+            doc_index = {job.pdf_path: i for i, job in enumerate(jobs)}
+
+            def on_progress(doc_result, page_result, overall_done, overall_total):
+                if not page_result.ok:
+                    print(f"Error in process ({page_result.error_stage}): {page_result.error}")
+                doc_no = doc_index.get(doc_result.pdf_path, 0) + 1
+                self.after(0, lambda d=doc_no, n=os.path.basename(doc_result.pdf_path),
+                           c=len(doc_result.pages), t=doc_result.total_pages,
+                           od=overall_done, ot=overall_total:
+                           self.update_progress(od / ot, c, t, d, len(jobs), n, od, ot))
+
+            def on_document_done(doc_result):
+                if doc_result.error:
+                    print(f"Error opening {doc_result.pdf_path}: {doc_result.error}")
+
+            batch = run_jobs(jobs, self.get_worker_pool(), on_progress=on_progress,
+                             should_stop=lambda: self.stop_requested, on_document_done=on_document_done)
+            
+            if batch.stopped:
+                self.after(0, lambda: messagebox.showinfo("提示", "转换已停止。"))
+            elif len(jobs) == 1:
+                result = batch.documents[0]
+                if result.error:
+                    self.after(0, lambda msg=result.error: messagebox.showerror("错误", f"转换过程中发生错误: {msg}"))
+                else:
+                    self.after(0, lambda: self.show_success_dialog(jobs[0].pdf_name, result.total_pages, result.output_dir,
+                                                                   self.timing_text(result)))
+            else:
+                self.after(0, lambda: self.show_batch_success_dialog(batch, base_output_dir))
+            
+        except Exception as e:
+            self.after(0, lambda msg=str(e): messagebox.showerror("错误", f"转换过程中发生错误: {msg}"))
+        finally:
+            self.after(0, self.reset_ui_state)
+
+    def update_progress(self, progress, completed, total, doc_no=1, doc_count=1, doc_name="",
+                        overall_done=0, overall_total=0):
+        self.progress_bar.set(progress)
+        if doc_count > 1:
+            self.status_label.configure(
+                text=f"[{doc_no}/{doc_count}] {doc_name}: 第 {completed}/{total} 页，总进度 {overall_done}/{overall_total} 页")
+        else:
+            self.status_label.configure(text=f"正在处理第 {completed}/{total} 页...")
+
+    @staticmethod
+    def timing_text(result):
+        """用时与首页用时（首页用时包含子进程启动，进程池预热后应明显缩短）"""
+        text = f"用时 {result.elapsed:.1f} 秒"
+        if result.time_to_first_page is not None:
+            text += f"（首页 {result.time_to_first_page:.2f} 秒）"
+        return text
+
+    def show_success_dialog(self, pdf_name, total_pages, final_output_dir, timing=""):
+        if messagebox.askyesno("成功", f"转换完成！\n文件夹：{pdf_name}\n共生成 {total_pages} 张图片。\n{timing}\n是否打开文件夹？"):
+            os.startfile(final_output_dir)
+
+    def show_batch_success_dialog(self, batch, base_output_dir):
+        msg = f"批量转换完成！\n共 {len(batch.documents)} 个文件，生成 {batch.completed} 张图片。\n{self.timing_text(batch)}"
+        failed = batch.failed_documents
+        if failed:
+            names = "\n".join(os.path.basename(d.pdf_path) for d in failed[:5])
+            msg += f"\n以下 {len(failed)} 个文件未完全成功：\n{names}"
+        if messagebox.askyesno("成功", msg + "\n是否打开文件夹？"):
+            os.startfile(base_output_dir)
+
+    def reset_ui_state(self):
+        self.is_converting = False
+        self.stop_requested = False
+        self.convert_btn.configure(state="normal")
+        self.stop_btn.configure(state="disabled")
+        self.status_label.configure(text="准备就绪")
+        self.progress_bar.set(0)
@@ -0,0 +1,170 @@
+"""
+增量 / 可续传转换的运行清单
+
+每个输出目录下保存一份 .pdf2image_manifest.json，记录源文件（路径、大小、修改时间、SHA-256）、
+任务的默认转换参数以及已完成的页面（文件名、字节数、该页参数摘要、页面内容指纹）。
+再次转换时，对每一页：
+    参数不同          重新渲染（页码范围规则只改变部分页面的参数时，其余页面仍可跳过）
+    源文件未变        输出文件仍然存在且大小一致则跳过
+    源文件已修改      比较内容指纹，只重新渲染内容变化或输出缺失的页面
+"""
+import os
+import json
+import time
+import hashlib
+
+MANIFEST_NAME = ".pdf2image_manifest.json"
+MANIFEST_VERSION = 2
+# 运行中保存清单的最短间隔（秒）；进程意外退出时最多丢失这段时间内的记录，对应页面下次重新渲染
+SAVE_INTERVAL = 2.0
+
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def params_digest(params):
+    """转换参数（可 JSON 序列化的字典）的摘要"""
+    return hashlib.sha1(json.dumps(params, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def _file_size(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return None
+
+
+class RunManifest:
+    """
+    单个文档的运行清单
+
+    pages: 页码（字符串）-> {"file": 文件名, "size": 字节数, "params": 参数摘要, "fingerprint": 页面内容指纹,
+                            "extra": {多分辨率输出相对于清单目录的路径: 字节数}}
+    merged: 多页合并输出 {"file", "size", "pages": 包含的页码列表}，没有则为 None
+    """
+
+    def __init__(self, path, source, params):
+        self.path = path
+        self.source = source
+        # 经 JSON 往返，使元组等与从文件读回的值可以直接比较
+        self.params = json.loads(json.dumps(params))
+        self.pages = {}
+        self.merged = None
+        self._dirty = False
+        self._last_save = 0.0
+
+    @classmethod
+    def load(cls, path):
+        """读取已有清单，不存在或已损坏时返回 None"""
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") != MANIFEST_VERSION:
+                return None
+            manifest = cls(path, data["source"], data["params"])
+            manifest.pages = dict(data["pages"])
+            manifest.merged = data.get("merged")
+            return manifest
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    @classmethod
+    def create(cls, output_dir, pdf_path, params, previous=None):
+        """
+        为本次运行创建清单；源文件大小与修改时间未变时沿用 previous 中的 SHA-256，避免重复读取整个文件
+        """
+        path = os.path.abspath(pdf_path)
+        st = os.stat(path)
+        old = previous.source if previous is not None else {}
+        if old.get("size") == st.st_size and old.get("mtime_ns") == st.st_mtime_ns and old.get("sha256"):
+            sha256 = old["sha256"]
+        else:
+            sha256 = file_sha256(path)
+        source = {"path": path, "size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": sha256}
+        return cls(os.path.join(output_dir, MANIFEST_NAME), source, params)
+
+    def adopt(self, previous, pages, page_path, page_params, merged_path, fingerprint):
+        """
+        从上次的清单中接收仍然有效的页面，返回可跳过的页码列表
+
+        pages: 本次需要输出的页码列表；page_path(i) / merged_path: 输出文件路径；
+        page_params(i): 第 i 页的转换参数；fingerprint(i): 当前源文件第 i 页的内容指纹，仅在源文件发生变化时调用。
+        多页合并输出仍然有效时整份文档均可跳过。
+        """
+        if previous is None:
+            return []
+        same_source = previous.source.get("sha256") == self.source["sha256"]
+
+        def valid(index, entry):
+            return (entry.get("params") == params_digest(page_params(index))
+                    and (same_source or entry.get("fingerprint") == fingerprint(index)))
+
+        entries = {i: previous.pages[str(i)] for i in pages if str(i) in previous.pages}
+        merged = previous.merged
+        if (merged and merged.get("pages") == list(pages) and len(entries) == len(pages)
+                and _file_size(merged_path) == merged.get("size")
+                and all(valid(i, entry) for i, entry in entries.items())):
+            self.pages = {str(i): entry for i, entry in entries.items()}
+            self.merged = merged
+            return sorted(entries)
+
+        base_dir = os.path.dirname(self.path)
+
+        def outputs_intact(index, entry):
+            extra = entry.get("extra") or {}
+            return (_file_size(page_path(index)) == entry.get("size")
+                    and all(_file_size(os.path.join(base_dir, rel)) == size for rel, size in extra.items()))
+
+        reused = []
+        for index, entry in sorted(entries.items()):
+            if outputs_intact(index, entry) and valid(index, entry):
+                self.pages[str(index)] = entry
+                reused.append(index)
+        if same_source:
+            # 本次未选中的页面保留原记录，之后再次选中时仍可跳过
+            selected = {str(i) for i in pages}
+            for key, entry in previous.pages.items():
+                if key not in selected:
+                    self.pages[key] = entry
+        return reused
+
+    def record(self, page_result, params):
+        """记录一页的转换结果及其参数（失败的页从清单中移除）"""
+        key = str(page_result.page_index)
+        if page_result.ok:
+            base_dir = os.path.dirname(self.path)
+            extra = {os.path.relpath(path, base_dir): size for path, size in page_result.outputs.items()
+                     if path != page_result.output_path}
+            self.pages[key] = {"file": os.path.basename(page_result.output_path),
+                               "size": page_result.outputs.get(page_result.output_path, page_result.bytes_written),
+                               "params": params_digest(params), "fingerprint": page_result.fingerprint,
+                               "extra": extra}
+        else:
+            self.pages.pop(key, None)
+        self._dirty = True
+
+    def record_merged(self, merged_path, pages):
+        self.merged = {"file": os.path.basename(merged_path), "size": _file_size(merged_path),
+                       "pages": list(pages)}
+        self._dirty = True
+
+    def to_dict(self):
+        return {"version": MANIFEST_VERSION, "source": self.source, "params": self.params,
+                "pages": self.pages, "merged": self.merged}
+
+    def save(self, force=False):
+        """原子写入清单；force 为 False 时距上次保存不足 SAVE_INTERVAL 秒则跳过"""
+        now = time.monotonic()
+        if not self._dirty or (not force and now - self._last_save < SAVE_INTERVAL):
+            return
+        tmp_path = self.path + ".part"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+        self._dirty = False
+        self._last_save = now
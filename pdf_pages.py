@@ -0,0 +1,123 @@
+"""
+页码范围表达式与按页覆盖的转换参数
+
+页码范围（从 1 开始，闭区间，逗号分隔）：
+    1-10,25,40-      第 1~10 页、第 25 页、第 40 页到最后一页
+    -5               第 1~5 页
+    空 / all         全部页面
+
+按页覆盖规则，格式为 “页码范围:键=值,键=值”，多条规则以分号分隔，后面的规则优先：
+    1-3:dpi=600
+    5,8:format=jpeg,quality=80
+    10-:crop=0/50/0/50       裁剪像素；也可写作 0/24/0/24pt（点）或 0/5/0/5%（页面比例），见 pdf_crop
+"""
+import re
+from dataclasses import dataclass, replace
+
+from pdf_crop import parse_crop
+
+_RANGE_RE = re.compile(r"^(\d*)\s*-\s*(\d*)$")
+ALL_PAGES = ("", "all", "全部")
+RULE_KEYS = ("dpi", "crop", "format", "quality", "color")
+
+
+def _parse_ranges(expr):
+    """解析为 [(起始页, 结束页或 None)]，页码从 1 开始；语法错误时抛出 ValueError"""
+    if expr is None or expr.strip().lower() in ALL_PAGES:
+        return [(1, None)]
+    ranges = []
+    for token in re.split(r"[,，]", expr):
+        token = token.strip()
+        if not token:
+            continue
+        m = _RANGE_RE.match(token)
+        if m:
+            start = int(m.group(1)) if m.group(1) else 1
+            end = int(m.group(2)) if m.group(2) else None
+        elif token.isdigit():
+            start = end = int(token)
+        else:
+            raise ValueError(f"无效的页码范围: {token}")
+        if start < 1 or (end is not None and end < start):
+            raise ValueError(f"无效的页码范围: {token}")
+        ranges.append((start, end))
+    if not ranges:
+        raise ValueError(f"无效的页码范围: {expr}")
+    return ranges
+
+
+def check_page_ranges(expr):
+    """只检查语法（不需要知道总页数），无效时抛出 ValueError"""
+    _parse_ranges(expr)
+
+
+def parse_page_ranges(expr, page_count):
+    """
+    将页码范围表达式展开为升序、去重的页索引列表（从 0 开始）
+    超出总页数的部分被忽略，批量转换时同一表达式可用于页数不同的文档
+    """
+    pages = set()
+    for start, end in _parse_ranges(expr):
+        end = page_count if end is None else min(end, page_count)
+        pages.update(range(start - 1, end))
+    return sorted(pages)
+
+
+@dataclass(frozen=True)
+class PageRule:
+    """对部分页面覆盖转换参数；为 None 的项沿用任务的默认值"""
+    pages: str
+    dpi: int = None
+    crop: tuple = None     # (左, 上, 右, 下) 像素，或 CropMargins
+    format: str = None
+    quality: int = None
+    color: str = None
+
+    def __post_init__(self):
+        if self.dpi is not None and self.dpi <= 0:
+            raise ValueError("dpi 必须为正数")
+        if self.quality is not None and not 1 <= self.quality <= 100:
+            raise ValueError("quality 须在 1-100 之间")
+
+    def apply_encoder(self, encoder):
+        """在任务的 EncoderSettings 上应用本规则的格式覆盖（经 EncoderSettings 校验）"""
+        changes = {key: getattr(self, key) for key in ("format", "quality", "color")
+                   if getattr(self, key) is not None}
+        return replace(encoder, **changes) if changes else encoder
+
+
+def parse_page_rule(text):
+    """解析单条规则 “页码范围:键=值,...”，无效时抛出 ValueError"""
+    pages, sep, body = text.partition(":")
+    if not sep:
+        raise ValueError(f"规则缺少冒号: {text}")
+    pages = pages.strip()
+    check_page_ranges(pages)
+    values = {}
+    for item in body.split(","):
+        if not item.strip():
+            continue
+        key, sep, value = item.partition("=")
+        key, value = key.strip().lower(), value.strip()
+        if not sep or key not in RULE_KEYS:
+            raise ValueError(f"无效的规则项: {item.strip()}（可用: {', '.join(RULE_KEYS)}）")
+        try:
+            if key in ("dpi", "quality"):
+                values[key] = int(value)
+            elif key == "crop":
+                values[key] = parse_crop(value)
+            else:
+                values[key] = value.lower()
+        except ValueError:
+            raise ValueError(f"无效的规则项: {item.strip()}") from None
+    if not values:
+        raise ValueError(f"规则未指定任何参数: {text}")
+    try:
+        return PageRule(pages, **values)
+    except ValueError as e:
+        raise ValueError(f"无效的规则 {text}: {e}") from None
+
+
+def parse_page_rules(text):
+    """解析以分号分隔的多条规则，空文本返回空元组"""
+    return tuple(parse_page_rule(part.strip()) for part in re.split(r"[;；]", text or "") if part.strip())
@@ -0,0 +1,354 @@
+"""
+预览渲染相关的无界面组件
+
+与 customtkinter 无关，GUI 与脚本均可使用。
+"""
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+
+import fitz  # PyMuPDF
+from PIL import Image
+
+from pdf_engine import file_identity, render_band
+
+# 图块边长（像素）：预览按缩放后页面像素坐标切分为图块，只渲染、缓存视口内的图块
+TILE_SIZE = 256
+# 放大查看的上限（相当于 1200 DPI）
+MAX_PREVIEW_ZOOM = 1200 / 72
+# 渲染线程保留的 DisplayList 数：同一页按不同缩放、不同区域反复渲染时不必重新解析页面内容
+DISPLAY_LIST_CACHE = 4
+DEFAULT_MEMORY_BYTES = 256 * 1024 * 1024
+DEFAULT_DISK_BYTES = 512 * 1024 * 1024
+
+
+def image_nbytes(img):
+    return img.width * img.height * len(img.getbands())
+
+
+def page_pixel_size(width, height, zoom):
+    """宽 width、高 height（点）的页面在缩放比例 zoom 下的像素尺寸，与渲染结果一致"""
+    irect = (fitz.Rect(0, 0, width, height) * fitz.Matrix(zoom, zoom)).irect
+    return irect.width, irect.height
+
+
+def tile_box(tile, page_px, tile_size=TILE_SIZE):
+    """图块 (列, 行) 在缩放后页面像素坐标中的 (左, 上, 右, 下)，页面边缘的图块按页面裁短"""
+    col, row = tile
+    width, height = page_px
+    left, top = col * tile_size, row * tile_size
+    return left, top, min(left + tile_size, width), min(top + tile_size, height)
+
+
+def visible_tiles(page_px, viewport, tile_size=TILE_SIZE):
+    """
+    与视口 (左, 上, 右, 下)（缩放后页面像素坐标）相交的图块 (列, 行)
+    按离视口中心由近到远排序，先渲染用户正在看的区域
+    """
+    width, height = page_px
+    left, top = max(0, viewport[0]), max(0, viewport[1])
+    right, bottom = min(width, viewport[2]), min(height, viewport[3])
+    if right <= left or bottom <= top:
+        return []
+    cols = range(left // tile_size, (right - 1) // tile_size + 1)
+    rows = range(top // tile_size, (bottom - 1) // tile_size + 1)
+    cx, cy = (left + right) / 2, (top + bottom) / 2
+
+    def distance(tile):
+        l, t, r, b = tile_box(tile, page_px, tile_size)
+        return ((l + r) / 2 - cx) ** 2 + ((t + b) / 2 - cy) ** 2
+
+    return sorted(((c, r) for r in rows for c in cols), key=distance)
+
+
+class PreviewCache:
+    """
+    预览渲染结果的 LRU 缓存
+
+    键为 (文件身份, 页码, 缩放比例, 图块)。内存层按图像字节数淘汰；
+    提供 disk_dir 时启用磁盘层，以原始像素保存，跨会话复用，同样按总字节数淘汰最久未用的文件。
+    put() 的 persist 为 False 时只放入内存层（放大查看时的图块数量多、复用少，不值得写盘）。
+    磁盘层的文件大小与使用顺序在启动时扫描一次后记在内存中，写入与淘汰不再遍历目录。
+    缓存中的图像为只读，调用方不应修改。
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MEMORY_BYTES, disk_dir=None, max_disk_bytes=DEFAULT_DISK_BYTES):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.max_disk_bytes = max_disk_bytes
+        self._items = OrderedDict()
+        self._bytes = 0
+        self._disk_entries = OrderedDict()  # 磁盘层文件名 -> 字节数，按最近使用排序
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+            self._disk_scan()
+
+    @staticmethod
+    def key(pdf_path, page_index, zoom, tile=None):
+        return file_identity(pdf_path), page_index, round(zoom, 4), tile
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._items or (self.disk_dir is not None and self._disk_name(key) in self._disk_entries)
+
+    def get(self, key):
+        with self._lock:
+            img = self._items.get(key)
+            if img is not None:
+                self._items.move_to_end(key)
+                return img
+
+        img = self._disk_get(key)
+        if img is not None:
+            self._memory_put(key, img)
+        return img
+
+    def put(self, key, img, persist=True):
+        self._memory_put(key, img)
+        if self.disk_dir and persist:
+            self._disk_put(key, img)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self._bytes = 0
+
+    def _memory_put(self, key, img):
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self._bytes -= image_nbytes(old)
+            self._items[key] = img
+            self._bytes += image_nbytes(img)
+            # 至少保留最新的一项
+            while self._bytes > self.max_bytes and len(self._items) > 1:
+                _, evicted = self._items.popitem(last=False)
+                self._bytes -= image_nbytes(evicted)
+
+    # ---- 磁盘层 ----
+
+    @staticmethod
+    def _disk_name(key):
+        return hashlib.sha1(repr(key).encode("utf-8")).hexdigest() + ".raw"
+
+    def _disk_scan(self):
+        """启动时读取磁盘层已有的文件，按修改时间（上次使用）排序"""
+        entries = []
+        for name in os.listdir(self.disk_dir):
+            if name.endswith(".raw"):
+                try:
+                    st = os.stat(os.path.join(self.disk_dir, name))
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, name, st.st_size))
+        for _, name, size in sorted(entries):
+            self._disk_entries[name] = size
+            self._disk_bytes += size
+        self._disk_evict()
+
+    def _disk_forget(self, name):
+        size = self._disk_entries.pop(name, None)
+        if size is not None:
+            self._disk_bytes -= size
+
+    def _disk_get(self, key):
+        if not self.disk_dir:
+            return None
+        name = self._disk_name(key)
+        with self._lock:
+            if name not in self._disk_entries:
+                return None
+            self._disk_entries.move_to_end(name)
+        path = os.path.join(self.disk_dir, name)
+        try:
+            with open(path, "rb") as f:
+                header = json.loads(f.readline())
+                img = Image.frombytes(header["mode"], tuple(header["size"]), f.read())
+            os.utime(path)  # 下次启动时按修改时间恢复使用顺序
+            return img
+        except (OSError, ValueError, KeyError):
+            # 文件已被删除（如另一个实例淘汰）或已损坏
+            with self._lock:
+                self._disk_forget(name)
+            return None
+
+    def _disk_put(self, key, img):
+        name = self._disk_name(key)
+        path = os.path.join(self.disk_dir, name)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(json.dumps({"mode": img.mode, "size": img.size}).encode("utf-8") + b"\n")
+                f.write(img.tobytes())
+                size = f.tell()
+            os.replace(tmp_path, path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+        with self._lock:
+            self._disk_forget(name)
+            self._disk_entries[name] = size
+            self._disk_bytes += size
+            self._disk_evict()
+
+    def _disk_evict(self):
+        """删除最久未用的文件直到总大小不超过上限，至少保留最新的一个；调用方持有锁（初始化时除外）"""
+        while self._disk_bytes > self.max_disk_bytes and len(self._disk_entries) > 1:
+            name, size = self._disk_entries.popitem(last=False)
+            self._disk_bytes -= size
+            try:
+                os.remove(os.path.join(self.disk_dir, name))
+            except OSError:
+                pass
+
+
+class PreviewRenderer:
+    """
+    后台预览渲染线程
+
+    request() 立即返回：按给定顺序渲染一页中的若干图块，每块只光栅化其 clip 矩形内的内容，
+    渲染完成后在后台线程中回调 callback(page_index, tile, img, error)；
+    prefetch 为 True 时随后按距离由近到远预取前后各 prefetch 页同一缩放下的全部图块写入缓存。
+    新请求会取代旧请求中尚未渲染的图块与预取任务。
+    所有渲染都在同一线程中进行，文档只在该线程内打开；最近用过的几页保留 DisplayList，
+    同一页缩放、平移时只需重新光栅化，不必重新解析页面内容。
+    """
+
+    def __init__(self, cache, prefetch=2):
+        self.cache = cache
+        self.prefetch = prefetch
+        self._cond = threading.Condition()
+        self._request = None   # (pdf_path, page_index, zoom, [图块], callback, persist, prefetch)
+        self._prefetch = []    # [(pdf_path, page_index, zoom, 图块)]
+        self._closed = False
+        self._doc = None
+        self._doc_identity = None
+        self._display_lists = OrderedDict()  # 页码 -> (DisplayList, 页面矩形)
+        self._thread = threading.Thread(target=self._run, name="preview-renderer", daemon=True)
+        self._thread.start()
+
+    def request(self, pdf_path, page_index, zoom, tiles, callback=None, persist=True, prefetch=True):
+        """渲染指定页的图块（tiles 为空时只预取其前后页）"""
+        with self._cond:
+            self._request = (pdf_path, page_index, zoom, list(tiles), callback, persist, prefetch)
+            self._prefetch = []
+            self._cond.notify()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+
+    def _open(self, pdf_path):
+        identity = file_identity(pdf_path)
+        if identity != self._doc_identity:
+            if self._doc is not None:
+                self._doc.close()
+            self._display_lists.clear()
+            self._doc = fitz.open(pdf_path)
+            self._doc_identity = identity
+        return self._doc
+
+    def _display_list(self, pdf_path, page_index):
+        doc = self._open(pdf_path)
+        entry = self._display_lists.get(page_index)
+        if entry is None:
+            page = doc.load_page(page_index)
+            entry = (page.get_displaylist(), page.rect)
+            self._display_lists[page_index] = entry
+            while len(self._display_lists) > DISPLAY_LIST_CACHE:
+                self._display_lists.popitem(last=False)
+        self._display_lists.move_to_end(page_index)
+        return entry
+
+    def _page_px(self, pdf_path, page_index, zoom):
+        rect = self._open(pdf_path).load_page(page_index).rect
+        return page_pixel_size(rect.width, rect.height, zoom)
+
+    def _render(self, pdf_path, page_index, zoom, tile, persist=True):
+        key = self.cache.key(pdf_path, page_index, zoom, tile)
+        img = self.cache.get(key)
+        if img is None:
+            dl, rect = self._display_list(pdf_path, page_index)
+            mat = fitz.Matrix(zoom, zoom)
+            page_irect = (rect * mat).irect
+            box = tile_box(tile, (page_irect.width, page_irect.height))
+            # render_band 返回的是裁剪出的副本，不再引用 Pixmap
+            img = render_band(dl, mat, page_irect, box)
+            self.cache.put(key, img, persist=persist)
+        return img
+
+    def _neighbours(self, page_index, page_count):
+        pages = []
+        for distance in range(1, self.prefetch + 1):
+            for candidate in (page_index + distance, page_index - distance):
+                if 0 <= candidate < page_count:
+                    pages.append(candidate)
+        return pages
+
+    def _prefetch_items(self, pdf_path, page_index, zoom):
+        items = []
+        for p in self._neighbours(page_index, len(self._open(pdf_path))):
+            page_px = self._page_px(pdf_path, p, zoom)
+            for tile in visible_tiles(page_px, (0, 0) + page_px):
+                if self.cache.key(pdf_path, p, zoom, tile) not in self.cache:
+                    items.append((pdf_path, p, zoom, tile))
+        return items
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._closed and self._request is None and not self._prefetch:
+                    self._cond.wait()
+                if self._closed:
+                    break
+                if self._request is not None:
+                    request = self._request
+                    tiles = request[3]
+                    tile = tiles.pop(0) if tiles else None
+                    if not tiles:
+                        self._request = None
+                    prefetch_item = None
+                else:
+                    request, prefetch_item = None, self._prefetch.pop(0)
+
+            if prefetch_item is not None:
+                try:
+                    self._render(*prefetch_item)
+                except Exception:
+                    pass  # 预取失败不影响前台
+                continue
+
+            pdf_path, page_index, zoom, tiles, callback, persist, prefetch = request
+            error = None
+            if tile is not None:
+                try:
+                    img, error = self._render(pdf_path, page_index, zoom, tile, persist), None
+                except Exception as e:
+                    img, error = None, e
+                    with self._cond:
+                        # 出错后放弃该请求中剩余的图块
+                        if self._request is request:
+                            self._request = None
+                        tiles.clear()
+                if callback is not None:
+                    callback(page_index, tile, img, error)
+            if tiles or error is not None or not prefetch:
+                continue
+
+            try:
+                neighbours = self._prefetch_items(pdf_path, page_index, zoom)
+            except Exception:
+                neighbours = []
+            with self._cond:
+                # 期间若已有新请求，则放弃本次预取
+                if self._request is None:
+                    self._prefetch = neighbours
+
+        if self._doc is not None:
+            self._doc.close()
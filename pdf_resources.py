@@ -0,0 +1,147 @@
+"""
+系统资源探测与自适应并发控制
+
+根据页面尺寸与 DPI 估算单页渲染的峰值内存，结合可用物理内存与 cgroup 限制
+决定同时处理的页数，并在运行过程中随可用内存变化调整。
+"""
+import os
+import sys
+import math
+import time
+
+# 每个工作进程本身（解释器 + PyMuPDF + Pillow）的常驻内存估算
+WORKER_BASE_MEMORY = 80 * 1024 * 1024
+# 整页渲染时的峰值倍数：Pixmap + 裁剪副本 + 色彩转换 / 编码缓冲
+PAGE_PEAK_FACTOR = 2.5
+# 只使用可用内存的这一比例，为系统与主进程留出余量
+MEMORY_HEADROOM = 0.8
+# 运行中重新评估并发数的间隔（秒）
+ADJUST_INTERVAL = 1.0
+
+
+def _read_int(path):
+    try:
+        with open(path) as f:
+            value = f.read().split()[0]
+        return None if value == "max" else int(value)
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _system_available_memory():
+    if sys.platform == "win32":
+        import ctypes
+
+        class MEMORYSTATUSEX(ctypes.Structure):
+            _fields_ = [
+                ("dwLength", ctypes.c_ulong),
+                ("dwMemoryLoad", ctypes.c_ulong),
+                ("ullTotalPhys", ctypes.c_ulonglong),
+                ("ullAvailPhys", ctypes.c_ulonglong),
+                ("ullTotalPageFile", ctypes.c_ulonglong),
+                ("ullAvailPageFile", ctypes.c_ulonglong),
+                ("ullTotalVirtual", ctypes.c_ulonglong),
+                ("ullAvailVirtual", ctypes.c_ulonglong),
+                ("ullAvailExtendedVirtual", ctypes.c_ulonglong),
+            ]
+
+        status = MEMORYSTATUSEX()
+        status.dwLength = ctypes.sizeof(MEMORYSTATUSEX)
+        if ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status)):
+            return status.ullAvailPhys
+        return None
+
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def _cgroup_available_memory():
+    # cgroup v2
+    limit = _read_int("/sys/fs/cgroup/memory.max")
+    usage = _read_int("/sys/fs/cgroup/memory.current")
+    if limit is None:
+        # cgroup v1；未限制时为一个接近 2^63 的值
+        limit = _read_int("/sys/fs/cgroup/memory/memory.limit_in_bytes")
+        usage = _read_int("/sys/fs/cgroup/memory/memory.usage_in_bytes")
+        if limit is not None and limit >= 1 << 60:
+            limit = None
+    if limit is None or usage is None:
+        return None
+    return max(0, limit - usage)
+
+
+def available_memory():
+    """当前可用内存（字节），取系统可用内存与 cgroup 剩余额度中较小者；无法获取时返回 None"""
+    values = [v for v in (_system_available_memory(), _cgroup_available_memory()) if v is not None]
+    return min(values) if values else None
+
+
+def usable_cpu_count():
+    """本进程可用的 CPU 数，考虑 CPU 亲和性与 cgroup 配额"""
+    try:
+        count = len(os.sched_getaffinity(0))
+    except AttributeError:
+        count = os.cpu_count() or 4
+
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()[:2]
+        if quota != "max":
+            count = min(count, max(1, math.ceil(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return max(1, count)
+
+
+def estimate_page_memory(width_pt, height_pt, zoom, memory_budget=0, streaming=True, channels=3):
+    """
+    估算渲染一页时单个进程的峰值内存（字节）
+
+    超过 memory_budget 的页面会分块渲染，峰值约为预算本身；
+    不支持流式写入的格式（streaming=False）还需要一张与输出等大的拼接图。
+    channels 为渲染结果每像素的字节数（灰度 1，RGB 3，带透明通道时再加 1）。
+    """
+    full_bytes = int(width_pt * zoom) * int(height_pt * zoom) * channels
+    if memory_budget and full_bytes > memory_budget:
+        return memory_budget + (0 if streaming else full_bytes)
+    return int(full_bytes * PAGE_PEAK_FACTOR)
+
+
+class ConcurrencyController:
+    """
+    根据可用内存动态决定同时处理的页数（1..max_workers）
+
+    update() 每 ADJUST_INTERVAL 秒重新读取可用内存：
+    可用内存已扣除正在运行的页面，因此目标并发 = 正在运行数 + 剩余内存还能容纳的页数。
+    无法获取内存信息时不做限制。
+    """
+
+    def __init__(self, max_workers, page_memory):
+        self.max_workers = max_workers
+        self.page_memory = max(1, page_memory)
+        self._last_check = time.monotonic()
+        self.limit = self._target(0)
+        self.history = [self.limit]
+
+    def _target(self, running):
+        available = available_memory()
+        if available is None:
+            return self.max_workers
+        extra = int(available * MEMORY_HEADROOM) // (self.page_memory + WORKER_BASE_MEMORY)
+        return max(1, min(self.max_workers, running + extra))
+
+    def update(self, running):
+        now = time.monotonic()
+        if now - self._last_check >= ADJUST_INTERVAL:
+            self._last_check = now
+            limit = self._target(running)
+            if limit != self.limit:
+                self.limit = limit
+                self.history.append(limit)
+        return self.limit
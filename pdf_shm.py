@@ -0,0 +1,153 @@
+"""
+通过共享内存在进程间零拷贝传递页面图像
+
+作为库使用、需要把页面交给 OCR / 机器学习流水线时，不必写入磁盘，也不必把数 MB 的位图
+pickle 后经管道传回父进程：
+
+    父进程   为每页分配一块 SharedMemory（allocate），把名称随任务发给子进程
+    子进程   按名称打开，逐条带把像素写入（SharedImageWriter），只返回 (模式, 宽, 高)
+    父进程   SharedImage 直接在共享内存上构造 PIL Image / NumPy 数组，用完后 release() 释放
+
+缓冲区的生命周期完全由父进程管理：子进程只是临时打开，写完即关闭，
+因此在 Windows 上（最后一个句柄关闭时共享内存即被销毁）同样有效。
+
+image() 需要 Pillow，array() 需要 NumPy，其余部分只用 multiprocessing.shared_memory。
+"""
+from multiprocessing import shared_memory
+
+# PIL 模式 -> 每像素字节数（"1" 模式按位打包，单独计算）
+MODE_BYTES = {"L": 1, "LA": 2, "RGB": 3, "RGBA": 4}
+
+
+def row_bytes(mode, width):
+    """一行像素按 PIL raw 格式打包后的字节数"""
+    if mode == "1":
+        return (width + 7) // 8
+    return width * MODE_BYTES[mode]
+
+
+def allocate(nbytes):
+    """在父进程中分配共享内存；Linux 上按需分配物理页，按上限分配不会立即占用内存"""
+    return shared_memory.SharedMemory(create=True, size=max(1, nbytes))
+
+
+class SharedImageWriter:
+    """
+    在子进程中把图像（或自上而下的各个条带）依次写入共享内存
+
+    with SharedImageWriter(name) as out:
+        out.write(band)
+    写入的字节数超过缓冲区大小时抛出 ValueError。
+    """
+
+    def __init__(self, name):
+        # 进程池的子进程与父进程共用同一个 resource_tracker，打开时的重复登记不会导致子进程退出时被删除
+        self._shm = shared_memory.SharedMemory(name=name)
+        self.offset = 0
+        self.mode = None
+        self.width = 0
+        self.height = 0
+
+    def write(self, img):
+        if self.mode is None:
+            self.mode, self.width = img.mode, img.width
+        elif (img.mode, img.width) != (self.mode, self.width):
+            raise ValueError("各条带的模式与宽度必须一致")
+        data = img.tobytes()
+        end = self.offset + len(data)
+        if end > self._shm.size:
+            raise ValueError(f"共享内存不足: 需要 {end} 字节，已分配 {self._shm.size} 字节")
+        self._shm.buf[self.offset:end] = data
+        self.offset = end
+        self.height += img.height
+
+    @property
+    def descriptor(self):
+        """(模式, 宽, 高)，随结果返回父进程"""
+        return self.mode, self.width, self.height
+
+    def close(self):
+        self._shm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class SharedImage:
+    """
+    父进程中的一页共享内存图像
+
+    array() 以及灰度图像的 image() 直接引用共享内存，不复制像素
+    （Pillow 只能直接映射每像素 1 / 4 字节的模式，RGB 与 1 位黑白图像的 image() 会复制一份）；
+    调用 release() 前须先丢弃由它们得到的对象（共享内存仍被引用时无法解除映射）。
+    也可以用作上下文管理器，退出时自动释放。
+    """
+
+    def __init__(self, shm, mode, width, height):
+        self._shm = shm
+        self.mode = mode
+        self.width = width
+        self.height = height
+
+    @property
+    def size(self):
+        return self.width, self.height
+
+    @property
+    def nbytes(self):
+        return row_bytes(self.mode, self.width) * self.height
+
+    @property
+    def released(self):
+        return self._shm is None
+
+    def _buffer(self):
+        if self._shm is None:
+            raise ValueError("共享内存已释放")
+        return self._shm.buf[:self.nbytes]
+
+    def image(self):
+        """只读的 PIL Image；灰度图像与共享内存共用像素，其余模式由 Pillow 复制"""
+        from PIL import Image
+
+        return Image.frombuffer(self.mode, self.size, self._buffer(), "raw", self.mode, 0, 1)
+
+    def array(self):
+        """形状为 (高, 宽[, 通道]) 的 uint8 NumPy 数组，与共享内存共用像素；1 位黑白图像请使用 image()"""
+        import numpy
+
+        if self.mode == "1":
+            raise ValueError("1 位黑白图像按位打包，请使用 image()")
+        shape = (self.height, self.width) if self.mode == "L" else (self.height, self.width, MODE_BYTES[self.mode])
+        return numpy.frombuffer(self._buffer(), dtype=numpy.uint8).reshape(shape)
+
+    def copy(self):
+        """复制为独立的 PIL Image，之后即可释放共享内存"""
+        return self.image().copy()
+
+    def release(self):
+        """释放共享内存；由 image() / array() 得到的对象仍存在时抛出 BufferError"""
+        if self._shm is None:
+            return
+        shm = self._shm
+        shm.close()
+        shm.unlink()
+        self._shm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+def discard(shm):
+    """释放未交给使用方的缓冲区（页面失败、任务被取消）"""
+    try:
+        shm.close()
+        shm.unlink()
+    except (OSError, BufferError):
+        pass
@@ -0,0 +1,177 @@
+"""
+转换过程的分阶段计时与运行报告
+
+子进程用 PageStats 记录每页各阶段的耗时、像素数与写入字节数，随 PageResult 返回；
+父进程用 build_report 汇总为运行报告（各阶段 p50 / p95、页/秒、MB/秒）。
+可选的 cProfile 模式为每页单独采样，只保留耗时超过阈值的页面，用于分析异常慢的页。
+"""
+import os
+import time
+import cProfile
+from contextlib import contextmanager
+
+# 报告中列出的最慢页面数
+SLOWEST_PAGES = 5
+# 报告中各阶段的排列顺序（与 process_page_task 的处理顺序一致）
+STAGE_ORDER = ("open", "load", "extract", "render", "crop", "resize", "convert", "encode", "write")
+
+
+class PageStats:
+    """
+    单页处理的分阶段统计
+
+    同名阶段多次进入时累加（如分块渲染的各条带）。
+    stage() 内抛出异常时 current 保留为出错的阶段名。
+    """
+
+    def __init__(self):
+        self.stages = {}        # 阶段名 -> 秒
+        self.pixels = 0         # 渲染的像素数
+        self.bytes_written = 0  # 写入磁盘的字节数
+        self.fingerprint = None  # 页面内容指纹，供增量转换使用
+        self.outputs = {}        # 输出文件路径 -> 字节数
+        self.shared = None       # 写入共享内存时的 (模式, 宽, 高)
+        self.extracted = False   # 直接提取了原图，未经渲染
+        self.current = None
+
+    def add_output(self, path, size):
+        self.outputs[path] = size
+        self.bytes_written += size
+
+    @contextmanager
+    def stage(self, name):
+        self.current = name
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start
+        self.current = None
+
+
+class PageProfiler:
+    """
+    逐页 cProfile 采样
+
+    每页单独启用一次 cProfile，耗时不低于 threshold 秒时保存为 profile_dir/<文件名>_page<N>.prof，
+    可用 python -m pstats 或 snakeviz 查看。
+    """
+
+    def __init__(self, profile_dir, threshold=0.0):
+        self.profile_dir = profile_dir
+        self.threshold = threshold
+
+    def run(self, pdf_path, page_index, fn, *args):
+        """执行 fn(*args)，返回 (返回值, 保存的 .prof 路径或 None)"""
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        profiler.enable()
+        try:
+            value = fn(*args)
+        finally:
+            profiler.disable()
+        if time.perf_counter() - start < self.threshold:
+            return value, None
+
+        name = os.path.splitext(os.path.basename(pdf_path))[0]
+        path = os.path.join(self.profile_dir, f"{name}_page{page_index + 1}.prof")
+        os.makedirs(self.profile_dir, exist_ok=True)
+        profiler.dump_stats(path)
+        return value, path
+
+
+def percentile(values, q):
+    """线性插值的百分位数，values 须已排序"""
+    if not values:
+        return 0.0
+    pos = (len(values) - 1) * q / 100
+    low = int(pos)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (pos - low)
+
+
+def summarize_durations(values):
+    """秒 -> 毫秒统计"""
+    values = sorted(values)
+    return {
+        "count": len(values),
+        "total_ms": sum(values) * 1000,
+        "p50_ms": percentile(values, 50) * 1000,
+        "p95_ms": percentile(values, 95) * 1000,
+        "max_ms": (values[-1] if values else 0.0) * 1000,
+    }
+
+
+def _stage_rank(name):
+    return STAGE_ORDER.index(name) if name in STAGE_ORDER else len(STAGE_ORDER)
+
+
+def build_report(documents, elapsed, time_to_first_page=None):
+    """
+    汇总多个 ConversionResult 的逐页统计
+
+    吞吐量按墙钟时间 elapsed 计算；各阶段耗时为子进程内的处理时间，多进程时总和会超过 elapsed。
+    time_to_first_page 为第一页结果返回的墙钟时间，包含子进程启动与导入的开销。
+    """
+    # 增量转换中跳过的页没有耗时数据，不计入统计
+    pages = [(doc, page) for doc in documents for page in doc.pages if not page.skipped]
+    skipped = sum(1 for doc in documents for page in doc.pages if page.skipped)
+    extracted = sum(1 for _, page in pages if page.extracted)
+    stage_values = {}
+    for _, page in pages:
+        for name, seconds in page.stages.items():
+            stage_values.setdefault(name, []).append(seconds)
+
+    failed = [(doc, page) for doc, page in pages if not page.ok]
+    errors = {}
+    for _, page in failed:
+        key = page.error_stage or "unknown"
+        errors[key] = errors.get(key, 0) + 1
+
+    bytes_written = sum(page.bytes_written for _, page in pages)
+    pixels = sum(page.pixels for _, page in pages)
+    slowest = sorted(pages, key=lambda item: item[1].elapsed, reverse=True)[:SLOWEST_PAGES]
+    return {
+        "pages": len(pages),
+        "skipped": skipped,
+        "extracted": extracted,
+        "failed": len(failed),
+        "errors_by_stage": errors,
+        "elapsed": elapsed,
+        "time_to_first_page": time_to_first_page,
+        "pages_per_sec": len(pages) / elapsed if elapsed > 0 else 0.0,
+        "mb_written": bytes_written / 1e6,
+        "mb_per_sec": bytes_written / 1e6 / elapsed if elapsed > 0 else 0.0,
+        "megapixels_per_sec": pixels / 1e6 / elapsed if elapsed > 0 else 0.0,
+        "page_time": summarize_durations([page.elapsed for _, page in pages]),
+        "stages": {name: summarize_durations(stage_values[name])
+                   for name in sorted(stage_values, key=_stage_rank)},
+        "slowest": [{"pdf_path": doc.pdf_path, "page": page.page_index + 1, "elapsed": page.elapsed,
+                     "profile": page.profile} for doc, page in slowest],
+    }
+
+
+def format_report(report):
+    """将运行报告格式化为多行文本"""
+    lines = [
+        f"共 {report['pages']} 页（失败 {report['failed']}，跳过 {report['skipped']}），用时 {report['elapsed']:.2f}s，"
+        f"{report['pages_per_sec']:.1f} 页/秒，写入 {report['mb_written']:.1f} MB "
+        f"({report['mb_per_sec']:.1f} MB/秒，{report['megapixels_per_sec']:.1f} 百万像素/秒)",
+    ]
+    if report.get("extracted"):
+        lines.append(f"直接提取原图 {report['extracted']} 页")
+    if report.get("time_to_first_page") is not None:
+        lines.append(f"首页用时 {report['time_to_first_page']:.2f}s（含子进程启动）")
+    lines.append(f"{'阶段':<8}{'次数':>6}{'合计(ms)':>12}{'p50(ms)':>10}{'p95(ms)':>10}{'最大(ms)':>10}")
+    rows = list(report["stages"].items()) + [("page", report["page_time"])]
+    for name, s in rows:
+        lines.append(f"{name:<8}{s['count']:>6}{s['total_ms']:>12.1f}{s['p50_ms']:>10.1f}"
+                     f"{s['p95_ms']:>10.1f}{s['max_ms']:>10.1f}")
+    if report["errors_by_stage"]:
+        lines.append("失败阶段: " + ", ".join(f"{k} {v}" for k, v in report["errors_by_stage"].items()))
+    for item in report["slowest"]:
+        line = f"最慢: {os.path.basename(item['pdf_path'])} 第 {item['page']} 页 {item['elapsed'] * 1000:.1f}ms"
+        if item["profile"]:
+            line += f" -> {item['profile']}"
+        lines.append(line)
+    return "\n".join(lines)
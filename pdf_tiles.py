@@ -0,0 +1,184 @@
+"""
+超大页面分块渲染所需的条带规划与流式编码器
+
+A0 图纸、长卷轴在 600 DPI 下整页渲染会分配数 GB 的 Pixmap，Image 与裁剪又各复制一份。
+分块模式下按水平条带逐段渲染，每个条带直接写入流式编码器，
+单个进程的峰值内存只与条带大小有关，而与页面尺寸无关。
+
+条带以 PIL Image 的形式传入；黑白 TIFF 的 CCITT Group 4 条带交给 Pillow 编码，其余格式用 zlib 直接压缩。
+"""
+import io
+import os
+import zlib
+import struct
+
+# 条带在内存中同时存在的份数：Pixmap、裁剪后的 Image、色彩转换结果
+BAND_COPIES = 3
+
+# PIL 模式 -> 每像素字节数（"1" 模式按 1 字节估算）
+MODE_BYTES = {"1": 1, "L": 1, "LA": 2, "RGB": 3, "RGBA": 4}
+
+
+def band_height(width, bytes_per_pixel, memory_budget):
+    """在内存预算内每个条带可容纳的行数，至少 1 行"""
+    row_bytes = max(1, width * bytes_per_pixel)
+    return max(1, memory_budget // (row_bytes * BAND_COPIES))
+
+
+def iter_bands(top, bottom, rows):
+    """将 [top, bottom) 行区间划分为每段 rows 行的条带"""
+    for y in range(top, bottom, rows):
+        yield y, min(y + rows, bottom)
+
+
+class PNGStreamWriter:
+    """
+    逐条带写入的 PNG 编码器
+
+    每行使用 None 过滤器，IDAT 由同一个 zlib 流分段输出，内存中只保留当前条带。
+    支持 1 / L / LA / RGB / RGBA 模式。
+    """
+
+    COLOR_TYPES = {"1": (1, 0), "L": (8, 0), "LA": (8, 4), "RGB": (8, 2), "RGBA": (8, 6)}
+
+    def __init__(self, path, width, height, mode, compress_level=6):
+        if mode not in self.COLOR_TYPES:
+            raise ValueError(f"PNG 流式编码不支持模式: {mode}")
+        self.path = path
+        self.width = width
+        self.height = height
+        self.mode = mode
+        self.rows_written = 0
+        self._compressor = zlib.compressobj(compress_level)
+        self._tmp_path = path + ".part"
+        self._file = open(self._tmp_path, "wb")
+        bit_depth, color_type = self.COLOR_TYPES[mode]
+        self._file.write(b"\x89PNG\r\n\x1a\n")
+        self._chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, bit_depth, color_type, 0, 0, 0))
+
+    def _chunk(self, tag, data):
+        self._file.write(struct.pack(">I", len(data)))
+        self._file.write(tag)
+        self._file.write(data)
+        self._file.write(struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF))
+
+    def write(self, band):
+        """写入一个条带（宽度与模式须与构造时一致）"""
+        raw = band.tobytes()
+        stride = len(raw) // band.height
+        rows = b"".join(b"\x00" + raw[i:i + stride] for i in range(0, len(raw), stride))
+        data = self._compressor.compress(rows)
+        if data:
+            self._chunk(b"IDAT", data)
+        self.rows_written += band.height
+
+    def close(self):
+        self._chunk(b"IDAT", self._compressor.flush())
+        self._chunk(b"IEND", b"")
+        self._file.close()
+        os.replace(self._tmp_path, self.path)
+
+    def abort(self):
+        self._file.close()
+        if os.path.exists(self._tmp_path):
+            os.remove(self._tmp_path)
+
+
+class TIFFStreamWriter:
+    """
+    逐条带写入的 TIFF 编码器
+
+    每个条带即一个 TIFF strip，IFD 在所有条带写完后追加到文件末尾。
+    除最后一个条带外，每个条带的行数必须相同（RowsPerStrip）。
+    compression 与 Pillow 的参数名一致：tiff_deflate（默认），或仅用于 "1" 模式的 group4
+    （与整页保存时相同；Group 4 的每个 strip 独立编码，可逐条带交给 Pillow 编码后取出）。
+    """
+
+    # 模式 -> (BitsPerSample, SamplesPerPixel, Photometric)
+    LAYOUTS = {"1": (1, 1, 1), "L": (8, 1, 1), "LA": (8, 2, 1), "RGB": (8, 3, 2), "RGBA": (8, 4, 2)}
+    # 压缩方式 -> Compression 标签值
+    COMPRESSIONS = {"tiff_deflate": 8, "group4": 4}
+
+    def __init__(self, path, width, height, mode, rows_per_strip, compress_level=6, compression="tiff_deflate"):
+        if mode not in self.LAYOUTS:
+            raise ValueError(f"TIFF 流式编码不支持模式: {mode}")
+        if compression not in self.COMPRESSIONS or (compression == "group4" and mode != "1"):
+            raise ValueError(f"TIFF 流式编码不支持 {mode} 模式的 {compression} 压缩")
+        self.path = path
+        self.width = width
+        self.height = height
+        self.mode = mode
+        self.rows_per_strip = rows_per_strip
+        self.compress_level = compress_level
+        self.compression = compression
+        self._offsets = []
+        self._counts = []
+        self._tmp_path = path + ".part"
+        self._file = open(self._tmp_path, "wb")
+        self._file.write(b"II*\x00" + struct.pack("<I", 0))  # IFD 偏移稍后回填
+
+    def write(self, band):
+        if self.compression == "group4":
+            data = self._encode_group4(band)
+        else:
+            data = zlib.compress(band.tobytes(), self.compress_level)
+        self._offsets.append(self._file.tell())
+        self._counts.append(len(data))
+        self._file.write(data)
+        if self._file.tell() % 2:
+            self._file.write(b"\x00")  # TIFF 要求偏移按字对齐
+
+    @staticmethod
+    def _encode_group4(band):
+        """用 Pillow 将条带编码为只有一个 strip 的 TIFF，取出其中的 Group 4 数据"""
+        from PIL import Image
+
+        buf = io.BytesIO()
+        band.save(buf, format="TIFF", compression="group4", strip_size=len(band.tobytes()) + 1)
+        with Image.open(buf) as tiff:
+            offsets, counts = tiff.tag_v2[273], tiff.tag_v2[279]
+        if len(offsets) != 1:
+            raise ValueError("Group 4 条带编码结果不是单个 strip")
+        return buf.getvalue()[offsets[0]:offsets[0] + counts[0]]
+
+    def close(self):
+        bits, samples, photometric = self.LAYOUTS[self.mode]
+        # (标签, 类型, 值列表)；类型 3 = SHORT, 4 = LONG
+        tags = [
+            (256, 4, [self.width]),
+            (257, 4, [self.height]),
+            (258, 3, [bits] * samples),
+            (259, 3, [self.COMPRESSIONS[self.compression]]),
+            (262, 3, [photometric]),
+            (273, 4, self._offsets),
+            (277, 3, [samples]),
+            (278, 4, [self.rows_per_strip]),
+            (279, 4, self._counts),
+            (284, 3, [1]),
+        ]
+        if self.mode in ("LA", "RGBA"):
+            tags.append((338, 3, [2]))  # 非预乘 alpha
+
+        ifd_offset = self._file.tell()
+        extra_offset = ifd_offset + 2 + len(tags) * 12 + 4
+        entries, extra = [], b""
+        for tag, typ, values in tags:
+            fmt = "<%d%s" % (len(values), "H" if typ == 3 else "I")
+            payload = struct.pack(fmt, *values)
+            if len(payload) <= 4:
+                value = payload.ljust(4, b"\x00")
+            else:
+                value = struct.pack("<I", extra_offset + len(extra))
+                extra += payload
+            entries.append(struct.pack("<HHI", tag, typ, len(values)) + value)
+
+        self._file.write(struct.pack("<H", len(tags)) + b"".join(entries) + struct.pack("<I", 0) + extra)
+        self._file.seek(4)
+        self._file.write(struct.pack("<I", ifd_offset))
+        self._file.close()
+        os.replace(self._tmp_path, self.path)
+
+    def abort(self):
+        self._file.close()
+        if os.path.exists(self._tmp_path):
+            os.remove(self._tmp_path)
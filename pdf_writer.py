@@ -0,0 +1,277 @@
+"""
+输出文件的写入：原子写入、后台写线程与归档输出
+
+渲染进程把编码好的数据交给写入器后即可继续渲染下一页，写入在后台线程中进行，
+网络盘、慢速磁盘上的 I/O 不再阻塞渲染。所有写入器提供相同的接口：
+
+    submit(path, data)   提交一个输出（data 为 bytes 类对象）；后台写入器队列已满时在此等待
+    stream_path(path)    分块渲染直接流式写入的目标路径
+    submit_file(path, tmp_path)   提交已写入 tmp_path 的输出（tmp_path 为 stream_path 的返回值，可能就是 path）
+    flush()              等待已提交的输出全部写完，返回 {路径: 错误信息}
+
+FileSink 同步写入单个文件，AsyncWriter 在后台线程中驱动 FileSink 或 ArchiveSink，
+MemorySink 只在内存中收集，供子进程把数据交回父进程写入归档。
+"""
+import io
+import os
+import time
+import queue
+import tarfile
+import tempfile
+import threading
+import zipfile
+from contextlib import contextmanager
+
+# fsync 策略：none 交给操作系统；file 每个文件写完后立即 fsync；batch 每批（flush 时）统一 fsync
+FSYNC_POLICIES = ("none", "file", "batch")
+ARCHIVE_FORMATS = {".zip": "zip", ".tar": "tar"}
+# 后台写入队列最多积压的输出数，超过时 submit 等待，内存占用有上限
+MAX_PENDING = 8
+
+
+def atomic_write(path, data, fsync=False):
+    """先写入 path.part 再重命名，中途失败或进程退出不会留下不完整的输出文件"""
+    tmp_path = path + ".part"
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def fsync_path(path):
+    """fsync 已关闭的文件或目录（Windows 不支持打开目录，忽略）"""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def archive_format(path):
+    """按扩展名判断归档格式，不支持时抛出 ValueError"""
+    fmt = ARCHIVE_FORMATS.get(os.path.splitext(path)[1].lower())
+    if fmt is None:
+        raise ValueError(f"不支持的归档格式: {path}（可用: {', '.join(ARCHIVE_FORMATS)}）")
+    return fmt
+
+
+def check_fsync_policy(policy):
+    if policy not in FSYNC_POLICIES:
+        raise ValueError(f"不支持的 fsync 策略: {policy}（可用: {', '.join(FSYNC_POLICIES)}）")
+
+
+class FileSink:
+    """同步、原子地写入单个文件"""
+
+    def __init__(self, fsync="none"):
+        check_fsync_policy(fsync)
+        self.fsync = fsync
+        self._unsynced = []
+
+    def submit(self, path, data):
+        atomic_write(path, data, fsync=self.fsync == "file")
+        if self.fsync == "batch":
+            self._unsynced.append(path)
+
+    def stream_path(self, path):
+        return path
+
+    def submit_file(self, path, tmp_path):
+        """流式写入的文件已在原位置完成（tmp_path 即 path），同样按 fsync 策略同步"""
+        if tmp_path != path:
+            os.replace(tmp_path, path)
+        if self.fsync == "file":
+            fsync_path(path)
+        elif self.fsync == "batch":
+            self._unsynced.append(path)
+
+    def flush(self):
+        if self._unsynced:
+            paths, self._unsynced = self._unsynced, []
+            for path in paths:
+                fsync_path(path)
+            # 重命名本身记录在目录中，目录也需要 fsync
+            for directory in {os.path.dirname(p) for p in paths}:
+                fsync_path(directory)
+        return {}
+
+    def close(self):
+        self.flush()
+
+
+class ArchiveSink:
+    """
+    把所有输出顺序写入一个 ZIP / TAR 归档，数千个小文件变为一次顺序写入
+
+    path 为归档文件路径（.zip / .tar），归档先写入 path.part，close 时重命名。
+    ZIP 不再压缩（图片本身已压缩）。submit 的 path 为归档内的名称。
+    """
+
+    def __init__(self, path, fsync="none"):
+        check_fsync_policy(fsync)
+        self.path = path
+        self.format = archive_format(path)
+        self.fsync = fsync
+        self._tmp_path = path + ".part"
+        if self.format == "zip":
+            self._archive = zipfile.ZipFile(self._tmp_path, "w", zipfile.ZIP_STORED, allowZip64=True)
+        else:
+            self._archive = tarfile.open(self._tmp_path, "w")
+
+    def submit(self, name, data):
+        if self.format == "zip":
+            self._archive.writestr(name, bytes(data))
+        else:
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mtime = time.time()
+            self._archive.addfile(info, io.BytesIO(data))
+
+    def stream_path(self, name):
+        fd, tmp_path = tempfile.mkstemp(suffix=os.path.splitext(name)[1])
+        os.close(fd)
+        return tmp_path
+
+    def submit_file(self, name, tmp_path):
+        """把临时文件写入归档后删除"""
+        try:
+            if self.format == "zip":
+                self._archive.write(tmp_path, name)
+            else:
+                self._archive.add(tmp_path, name)
+        finally:
+            os.remove(tmp_path)
+
+    def flush(self):
+        return {}
+
+    def close(self):
+        self._archive.close()
+        if self.fsync != "none":
+            fsync_path(self._tmp_path)
+        os.replace(self._tmp_path, self.path)
+
+    def abort(self):
+        self._archive.close()
+        if os.path.exists(self._tmp_path):
+            os.remove(self._tmp_path)
+
+
+class MemorySink:
+    """
+    只在内存中收集输出，take() 取出 {路径: bytes 或临时文件路径}
+    归档模式下子进程用它把编码结果随 PageResult 交回父进程，由父进程的写线程写入归档
+    """
+
+    def __init__(self):
+        self._outputs = {}
+
+    def submit(self, path, data):
+        self._outputs[path] = bytes(data)
+
+    def stream_path(self, path):
+        fd, tmp_path = tempfile.mkstemp(suffix=os.path.splitext(path)[1])
+        os.close(fd)
+        return tmp_path
+
+    def submit_file(self, path, tmp_path):
+        self._outputs[path] = tmp_path
+
+    def flush(self):
+        return {}
+
+    def take(self):
+        outputs, self._outputs = self._outputs, {}
+        return outputs
+
+
+class AsyncWriter:
+    """
+    后台写线程：从有界队列中依次取出输出交给 sink 写入
+
+    写入失败不会抛给提交方，而是按路径记录，由 flush() 返回；
+    提交方据此把对应页面标记为失败。
+    """
+
+    def __init__(self, sink, max_pending=MAX_PENDING):
+        self.sink = sink
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._errors = {}
+        self._thread = threading.Thread(target=self._run, name="pdf2image-writer", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                kind, path, data = item
+                try:
+                    if kind == "file":
+                        self.sink.submit_file(path, data)
+                    else:
+                        self.sink.submit(path, data)
+                except Exception as e:
+                    self._errors[path] = f"写入失败: {e}"
+            finally:
+                self._queue.task_done()
+
+    def submit(self, path, data):
+        self._queue.put(("data", path, data))
+
+    def stream_path(self, path):
+        return self.sink.stream_path(path)
+
+    def submit_file(self, path, tmp_path):
+        self._queue.put(("file", path, tmp_path))
+
+    def flush(self):
+        self._queue.join()
+        errors = dict(self._errors)
+        try:
+            errors.update(self.sink.flush())
+        except OSError as e:
+            errors[None] = f"写入失败: {e}"
+        self._errors.clear()
+        return errors
+
+    def close(self, abort=False):
+        """
+        写完队列中的输出并关闭 sink，返回 flush() 的错误信息
+        abort 为 True 时丢弃 sink 的输出（ArchiveSink 删除未完成的归档）
+        """
+        errors = self.flush()
+        self._queue.put(None)
+        self._thread.join()
+        close = getattr(self.sink, "abort" if abort else "close", None)
+        if close is not None:
+            close()
+        return errors
+
+
+@contextmanager
+def open_archive(path, fsync="none"):
+    """
+    打开归档写入器（后台线程驱动的 ArchiveSink），正常退出时完成归档，异常时删除未完成的归档
+    归档写入失败时在退出时抛出 OSError
+    """
+    writer = AsyncWriter(ArchiveSink(path, fsync))
+    try:
+        yield writer
+    except BaseException:
+        writer.close(abort=True)
+        raise
+    errors = writer.close()
+    if errors:
+        raise OSError(next(iter(errors.values())))
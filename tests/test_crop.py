@@ -0,0 +1,35 @@
+import unittest
+
+from pdf_crop import CropMargins, make_crop, parse_crop
+
+
+class ParseCropTest(unittest.TestCase):
+    def test_units(self):
+        self.assertEqual(parse_crop("0/50/0/50"), (0, 50, 0, 50))
+        self.assertEqual(parse_crop("0/50/0/50px"), (0, 50, 0, 50))
+        self.assertEqual(parse_crop("0 24 0 24pt"), CropMargins(0, 24, 0, 24, unit="pt"))
+        margins = parse_crop("0/5/0/5%")
+        self.assertEqual(margins.unit, "fraction")
+        self.assertAlmostEqual(margins.top, 0.05)
+
+    def test_invalid(self):
+        for text in ("1/2/3", "a/b/c/d", "-1/0/0/0", "0/60/0/50%"):
+            with self.assertRaises(ValueError, msg=text):
+                parse_crop(text)
+        with self.assertRaises(ValueError):
+            make_crop((0, 0, 0, 0), unit="mm")
+
+
+class CropMarginsTest(unittest.TestCase):
+    def test_points_scale_with_zoom(self):
+        margins = CropMargins(10, 20, 30, 40, unit="pt")
+        self.assertEqual(margins.to_pixels(1.0, 612, 792), (10, 20, 30, 40))
+        self.assertEqual(margins.to_pixels(300 / 72, 2550, 3300), (42, 83, 125, 167))
+
+    def test_fraction_uses_page_size(self):
+        margins = CropMargins(0.1, 0.25, 0, 0.5, unit="fraction")
+        self.assertEqual(margins.to_pixels(2.0, 1000, 400), (100, 100, 0, 200))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,180 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import fitz  # PyMuPDF
+from PIL import Image, ImageChops
+
+from pdf_crop import CropMargins
+from pdf_engine import EncoderSettings, RenderOptions, WorkerPool, convert_pdf, needs_tiling
+from pdf_pages import parse_page_rules
+
+PAGE_SIZE = (300, 400)  # 点
+SMALL_BUDGET = 64 * 1024  # 远小于一页的整页渲染，强制分块
+
+
+def make_pdf(path, pages=4):
+    """
+    生成含文字、矢量图形与渐变色块的测试文档
+    不含贯穿页面的长斜线：MuPDF 对这类描边的光栅化结果随 clip 矩形略有不同，clip / 分块渲染与整页渲染无法逐像素一致
+    """
+    doc = fitz.open()
+    width, height = PAGE_SIZE
+    for i in range(pages):
+        page = doc.new_page(width=width, height=height)
+        for k in range(12):
+            color = ((k * 20 % 255) / 255, (i * 60 % 255) / 255, 0.5)
+            page.draw_rect(fitz.Rect(10 + k * 20, 30 + k * 25, 40 + k * 20, 90 + k * 25), color=color, fill=color)
+        page.draw_circle((width / 2, height / 2), 80, color=(0, 0, 1), width=3)
+        page.draw_line((width / 4, 10), (width / 4, height - 10), color=(1, 0, 0), width=1.5)
+        page.insert_text((20, 20), f"Page {i + 1} - PDF2Image test", fontsize=11)
+    doc.save(path)
+    doc.close()
+
+
+def open_image(path):
+    with Image.open(path) as img:
+        img.load()
+        return img
+
+
+def assert_same_pixels(test, path_a, path_b):
+    a, b = open_image(path_a), open_image(path_b)
+    test.assertEqual(a.size, b.size, f"{path_a} / {path_b}")
+    test.assertIsNone(ImageChops.difference(a.convert("RGB"), b.convert("RGB")).getbbox(), f"{path_a} / {path_b}")
+
+
+class EngineTestCase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.pool = WorkerPool(max_workers=2)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.pool.shutdown()
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir, True)
+        self.pdf = os.path.join(self.dir, "doc.pdf")
+        make_pdf(self.pdf)
+
+    def convert(self, name, **kwargs):
+        result = convert_pdf(self.pdf, os.path.join(self.dir, name), pool=self.pool, **kwargs)
+        self.assertIsNone(result.error)
+        self.assertEqual(result.failed, [])
+        return result
+
+    def output(self, result, page, extension="png"):
+        return os.path.join(result.output_dir, f"page{page}.{extension}")
+
+
+class ResumeTest(EngineTestCase):
+    def test_unchanged_run_is_skipped(self):
+        first = self.convert("out", dpi=72)
+        self.assertEqual((first.completed, first.skipped), (4, 0))
+        second = self.convert("out", dpi=72)
+        self.assertEqual((second.completed, second.skipped), (4, 4))
+
+    def test_missing_output_is_rendered_again(self):
+        first = self.convert("out", dpi=72)
+        os.remove(self.output(first, 2))
+        second = self.convert("out", dpi=72)
+        self.assertEqual(second.skipped, 3)
+        self.assertTrue(os.path.exists(self.output(second, 2)))
+
+    def test_changed_params_invalidate_pages(self):
+        self.convert("out", dpi=72)
+        result = self.convert("out", dpi=72, page_rules=parse_page_rules("1:dpi=144"))
+        self.assertEqual(result.skipped, 3)
+        self.assertEqual(open_image(self.output(result, 1)).size, (600, 800))
+        self.assertEqual(self.convert("out", dpi=96).skipped, 0)
+
+    def test_modified_source_renders_changed_pages(self):
+        self.convert("out", dpi=72)
+        # 增量保存只修改第 3 页，其余页面的对象不变
+        doc = fitz.open(self.pdf)
+        doc[2].draw_rect(fitz.Rect(200, 300, 280, 380), color=(0, 1, 0), fill=(0, 1, 0))
+        doc.saveIncr()
+        doc.close()
+        result = self.convert("out", dpi=72)
+        self.assertEqual(sorted(p.page_index for p in result.pages if not p.skipped), [2])
+
+    def test_resume_disabled(self):
+        self.convert("out", dpi=72)
+        self.assertEqual(self.convert("out", dpi=72, resume=False).skipped, 0)
+
+
+class PageSelectionTest(EngineTestCase):
+    def test_page_range(self):
+        result = self.convert("out", dpi=72, pages="2-3")
+        self.assertEqual(result.total_pages, 2)
+        self.assertEqual(sorted(os.listdir(result.output_dir)),
+                         sorted([".pdf2image_manifest.json", "page2.png", "page3.png"]))
+
+    def test_page_rules(self):
+        rules = parse_page_rules("2:dpi=144; 3-:format=jpeg,quality=70; 4:dpi=36")
+        result = self.convert("out", dpi=72, page_rules=rules)
+        self.assertEqual(open_image(self.output(result, 1)).size, (300, 400))
+        self.assertEqual(open_image(self.output(result, 2)).size, (600, 800))
+        self.assertEqual(open_image(self.output(result, 3, "jpg")).size, (300, 400))
+        # 后面的规则优先，前面规则中未被覆盖的项仍然有效
+        page4 = open_image(self.output(result, 4, "jpg"))
+        self.assertEqual((page4.format, page4.size), ("JPEG", (150, 200)))
+
+
+class CropUnitTest(EngineTestCase):
+    def test_points_are_resolution_independent(self):
+        crop = CropMargins(10, 20, 30, 40, unit="pt")
+        low = self.convert("low", dpi=72, crop=crop, pages="1")
+        high = self.convert("high", dpi=144, crop=crop, pages="1")
+        self.assertEqual(open_image(self.output(low, 1)).size, (260, 340))
+        self.assertEqual(open_image(self.output(high, 1)).size, (520, 680))
+
+    def test_fraction(self):
+        result = self.convert("out", dpi=144, crop=CropMargins(0.1, 0, 0.1, 0.25, unit="fraction"), pages="1")
+        self.assertEqual(open_image(self.output(result, 1)).size, (480, 600))
+
+    def test_clip_matches_full_render(self):
+        full = self.convert("full", dpi=144, pages="1")
+        cropped = self.convert("cropped", dpi=144, crop=CropMargins(10, 20, 30, 40, unit="pt"), pages="1")
+        expected = open_image(self.output(full, 1)).crop((20, 40, 540, 760))
+        self.assertIsNone(ImageChops.difference(expected, open_image(self.output(cropped, 1))).getbbox())
+
+
+class TiledRenderTest(EngineTestCase):
+    def test_budget_forces_tiling(self):
+        page = fitz.open(self.pdf)[0]
+        self.assertTrue(needs_tiling(page, fitz.Matrix(2, 2), SMALL_BUDGET))
+
+    def check_equal(self, **kwargs):
+        encoder = kwargs.get("encoder")
+        extension = encoder.extension if encoder else "png"
+        whole = self.convert("whole", dpi=144, **kwargs)
+        tiled = self.convert("tiled", dpi=144, render_options=RenderOptions(memory_budget=SMALL_BUDGET), **kwargs)
+        for page in range(1, 5):
+            assert_same_pixels(self, self.output(whole, page, extension), self.output(tiled, page, extension))
+
+    def test_png(self):
+        self.check_equal()
+
+    def test_png_cropped(self):
+        self.check_equal(crop=CropMargins(7.5, 13, 21, 5, unit="pt"))
+
+    def test_pixel_crop(self):
+        self.check_equal(crop=(3, 50, 17, 9))
+
+    def test_gray_tiff(self):
+        self.check_equal(encoder=EncoderSettings(format="tiff", color="gray"))
+
+    def test_mono_tiff(self):
+        encoder = EncoderSettings(format="tiff", color="mono")
+        self.check_equal(encoder=encoder)
+        tiled = os.path.join(self.dir, "tiled", "doc", "page1.tif")
+        with Image.open(tiled) as img:
+            self.assertEqual(img.tag_v2[259], 4)  # Group 4，与整页保存一致
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,49 @@
+import unittest
+
+from pdf_crop import CropMargins
+from pdf_pages import PageRule, check_page_ranges, parse_page_ranges, parse_page_rules
+
+
+class PageRangeTest(unittest.TestCase):
+    def test_ranges(self):
+        self.assertEqual(parse_page_ranges("1-3,5,8-", 10), [0, 1, 2, 4, 7, 8, 9])
+        self.assertEqual(parse_page_ranges("-2", 10), [0, 1])
+        self.assertEqual(parse_page_ranges("2-4，3-5", 10), [1, 2, 3, 4])
+
+    def test_all_pages(self):
+        for expr in (None, "", "all", "全部"):
+            self.assertEqual(parse_page_ranges(expr, 3), [0, 1, 2])
+
+    def test_beyond_page_count_ignored(self):
+        self.assertEqual(parse_page_ranges("2-100", 4), [1, 2, 3])
+        self.assertEqual(parse_page_ranges("9", 4), [])
+
+    def test_invalid(self):
+        for expr in ("0", "3-1", "a", "1-2-3", ","):
+            with self.assertRaises(ValueError, msg=expr):
+                check_page_ranges(expr)
+
+
+class PageRuleTest(unittest.TestCase):
+    def test_parse(self):
+        rules = parse_page_rules("1-3:dpi=600; 5,8:format=JPEG,quality=80；10-:crop=0/24/0/24pt")
+        self.assertEqual(rules[0], PageRule("1-3", dpi=600))
+        self.assertEqual(rules[1], PageRule("5,8", format="jpeg", quality=80))
+        self.assertEqual(rules[2].crop, CropMargins(0, 24, 0, 24, unit="pt"))
+
+    def test_empty(self):
+        self.assertEqual(parse_page_rules(""), ())
+        self.assertEqual(parse_page_rules(None), ())
+
+    def test_invalid(self):
+        for text in ("1-3", "1-3:", "x:dpi=300", "1:size=3", "1:dpi=abc", "1:dpi=0", "1:quality=101"):
+            with self.assertRaises(ValueError, msg=text):
+                parse_page_rules(text)
+
+    def test_error_names_rule(self):
+        with self.assertRaisesRegex(ValueError, "2:dpi=-5"):
+            parse_page_rules("1:dpi=300;2:dpi=-5")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from pdf_writer import AsyncWriter, FileSink, atomic_write
+
+
+class WriterTestCase(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = tmp.name
+
+    def path(self, name):
+        return os.path.join(self.dir, name)
+
+
+class AtomicWriteTest(WriterTestCase):
+    def test_write(self):
+        atomic_write(self.path("a.bin"), b"data")
+        with open(self.path("a.bin"), "rb") as f:
+            self.assertEqual(f.read(), b"data")
+        self.assertEqual(os.listdir(self.dir), ["a.bin"])
+
+    def test_failure_leaves_nothing(self):
+        with self.assertRaises(TypeError):
+            atomic_write(self.path("a.bin"), "not bytes")
+        self.assertEqual(os.listdir(self.dir), [])
+
+
+class FileSinkFsyncTest(WriterTestCase):
+    def run_sink(self, policy):
+        """写入两个文件和一个流式输出，返回 (flush 前, flush 后) 的 fsync 次数"""
+        with mock.patch("os.fsync") as fsync:
+            sink = FileSink(policy)
+            sink.submit(self.path("page1.png"), b"1")
+            sink.submit(self.path("page2.png"), b"2")
+            stream = sink.stream_path(self.path("page3.png"))
+            with open(stream, "wb") as f:
+                f.write(b"3")
+            sink.submit_file(self.path("page3.png"), stream)
+            before = fsync.call_count
+            self.assertEqual(sink.flush(), {})
+            return before, fsync.call_count
+
+    def test_none(self):
+        self.assertEqual(self.run_sink("none"), (0, 0))
+
+    def test_file(self):
+        self.assertEqual(self.run_sink("file"), (3, 3))
+
+    def test_batch(self):
+        # 三个文件加上所在目录
+        self.assertEqual(self.run_sink("batch"), (0, 4))
+
+    def test_invalid_policy(self):
+        with self.assertRaises(ValueError):
+            FileSink("always")
+
+
+class AsyncWriterTest(WriterTestCase):
+    def test_writes_and_reports_errors(self):
+        writer = AsyncWriter(FileSink())
+        good = self.path("page1.png")
+        bad = os.path.join(self.dir, "missing", "page2.png")
+        writer.submit(good, b"ok")
+        writer.submit(bad, b"lost")
+        errors = writer.close()
+        self.assertEqual(list(errors), [bad])
+        with open(good, "rb") as f:
+            self.assertEqual(f.read(), b"ok")
+
+
+if __name__ == "__main__":
+    unittest.main()